@@ -1,10 +1,21 @@
+"""
+The baseball game's classes, importable as a library.
+
+Importing this module only defines the classes; play the interactive game
+with `python play.py`. NumPy is imported when the first roster is built,
+pandas only when a spreadsheet has to be parsed, and the batched modules
+only when simulate_batch() is called, so the import itself is quick.
+"""
 import random
-import pandas as pd
 import sys
 
-# To bold text in certain print statements.
-start = "\033[1m"
-end = "\033[0;0m"
+import streams
+from events import (start, end, Pitch, Outcome, RunScored, FieldShown,
+                    InningEnd, GameOver, Lineup, TerminalSink, NULL_SINK)
+
+__all__ = ["Files", "Pitcher", "RosterTable", "Batter", "AtBat", "Field",
+           "BitField", "Scoreboard", "Engine", "always_swing",
+           "always_watch"]
 
 class Files:
     """
@@ -13,7 +24,11 @@ class Files:
     Attributes:
         welcome (txt): Welcome screen text.
         help (txt): Help screen text.
-        data (xlsx): Batter odds data.
+        columns (dict): Batter odds data, column name to NumPy array,
+                        memory-mapped from the roster cache.
+        data (DataFrame): Batter odds data, built from columns on first use.
+        teams (dict): Team name to the rows of its players, as a slice.
+        table (obj): RosterTable of every player's odds.
     """
     def __init__(self, players="Baseball simulator.xlsx", welcome_file=\
                 "instructions.txt", help_file="help.txt"):
@@ -33,9 +48,126 @@ class Files:
         help = file2.read()
         file2.close()
         self.help = help
-        excel_file = players
-        data = pd.read_excel(excel_file)
-        self.data = data
+        import roster_cache
+        # Parsing the workbook is slow, so read it through the cache.
+        self.setup(roster_cache.load(players))
+
+    @classmethod
+    def from_columns(cls, columns, table=None, welcome="", help=""):
+        """
+        Makes Files from data already in memory, reading no files; e.g.
+        from the shared memory tables of shared.py.
+
+        Parameters:
+            columns (dict): Column name to array, as roster_cache.load().
+            table (obj): RosterTable of the columns' odds, or None to
+                         build one.
+            welcome (str): Welcome screen text.
+            help (str): Help screen text.
+
+        Returns:
+            (obj): Instance of Files.
+        """
+        files = cls.__new__(cls)
+        files.welcome = welcome
+        files.help = help
+        files.setup(columns, table)
+        return files
+
+    def setup(self, columns, table=None):
+        """Indexes the batter data by team and builds the odds table."""
+        self.columns = columns
+        self.frame = None
+        self.teams = self.team_index(self.columns["Team"])
+        if table is None:
+            import numpy as np
+            # Every player's odds in one table; rosters are views onto it.
+            odds = np.column_stack([self.columns[key + "%"] for key in
+                                    RosterTable.ODDS])
+            table = RosterTable(self.columns["Name"].tolist(), odds)
+        self.table = table
+
+    @property
+    def data(self):
+        """Returns (DataFrame) the batter odds, built on first use."""
+        if self.frame is None:
+            import pandas as pd
+            self.frame = pd.DataFrame(self.columns)
+        return self.frame
+
+    def team_index(self, teams):
+        """
+        Groups rows by team once, so rosters need no scan of the data.
+
+        Parameters:
+            teams (array): Team name of every row.
+
+        Returns:
+            (dict): Team name to its rows, as a slice when they are all next
+            to each other in the spreadsheet (as they are in the workbook)
+            or an array of row numbers otherwise.
+        """
+        import numpy as np
+        names, first, inverse, counts = np.unique(teams, return_index=True,
+                                                  return_inverse=True,
+                                                  return_counts=True)
+        grouped = np.argsort(inverse, kind="stable")
+        ends = np.cumsum(counts)
+        index = {}
+        for number, name in enumerate(names.tolist()):
+            rows = grouped[ends[number] - counts[number]:ends[number]]
+            if rows[-1] - rows[0] + 1 == len(rows):
+                index[name] = slice(int(rows[0]), int(rows[-1]) + 1)
+            else:
+                index[name] = rows
+        return index
+
+    def find_team(self, team):
+        """
+        Matches a typed team name to a team in the data.
+
+        Exact names come first, then names in any case, names with the
+        city in front ('Boston Red Sox') and finally close spellings
+        ('Redsox').
+
+        Parameters:
+            team (str): Team name typed by the user.
+
+        Returns:
+            (str): Team name as it appears in the data, or None.
+        """
+        team = " ".join(str(team).split())
+        if team.title() in self.teams:
+            return team.title()
+        lower = {name.lower() : name for name in self.teams}
+        if team.lower() in lower:
+            return lower[team.lower()]
+        for name in lower:
+            if team.lower().endswith(" " + name):
+                return lower[name]
+        import difflib
+        squashed = {name.replace(" ", "") : lower[name] for name in lower}
+        close = difflib.get_close_matches(team.lower().replace(" ", ""),
+                                          list(squashed), n=1, cutoff=0.75)
+        if close:
+            return squashed[close[0]]
+        return None
+
+    def team_roster(self, team):
+        """
+        Builds a Batter for every player on a team.
+
+        Parameters:
+            team (str): Team name, matched with find_team().
+
+        Returns:
+            (lst): Batter objects, in spreadsheet order; empty if no team
+            has that name.
+        """
+        team = self.find_team(team)
+        if team is None:
+            return []
+        return self.table.batters(self.teams[team])
 
     def __repr__(self):
         """Returns names of each file in class."""
@@ -48,11 +180,30 @@ class Pitcher:
 
     Attributes:
         name (str): The name of the pitcher.
+        ball_odds (float): Chance that a pitch is a ball; by default 0.5,
+                           an assumption rather than a measured rate.
+        table (obj): RosterTable of every batter's odds against this
+                     pitcher (see matchup.py), or None to leave the
+                     batters' own odds alone.
+        cuts (lst): The table's swing thresholds, one tuple per batter
+                    row, or None.
     """
 
-    def __init__(self, name, field):
-        """The constructor for Pitcher class."""
+    def __init__(self, name, field, ball_odds=0.5, table=None):
+        """
+        The constructor for Pitcher class.
+
+        Parameters:
+            name (str): The name of the pitcher.
+            field (obj): Field whose bullpen the pitcher joins.
+            ball_odds (float): Chance that a pitch is a ball.
+            table (obj): RosterTable of the batters' odds against the
+                         pitcher, rows matching Files.table, or None.
+        """
         self.name = name
+        self.ball_odds = ball_odds
+        self.table = table
+        self.cuts = None if table is None else table.cuts
         field.bullpen.append(self)
 
     def __repr__(self):
@@ -69,24 +220,167 @@ class Pitcher:
         Returns:
             (str): "Ball" or "Strike"
         """
-        pitch = random.randrange(0,2)
-        if pitch == 0:
+        # Even odds keep the game's coin flip, so seeded games draw the
+        # same numbers they always have.
+        if self.ball_odds == 0.5:
+            ball = atbat.rng.randrange(0,2) == 0
+        else:
+            ball = atbat.rng.random() < self.ball_odds
+        if ball:
             return 'Ball'
         else:
             return 'Strike'
 
+    def odds(self, batter):
+        """Returns (dict) a batter's odds against this pitcher, keyed like
+        Batter.odds."""
+        if self.table is None:
+            return batter.odds
+        return self.table.odds_dict(batter.row)
+
+
+class RosterTable:
+    """
+    Class to hold the odds of many batters in contiguous arrays.
+
+    One row per batter and one column per outcome, so whole rosters can be
+    handed to vectorized or compiled code without touching Batter objects.
+    Batter objects are lightweight views onto one row.
+
+    Attributes:
+        names (lst): Batter names, one per row.
+        odds (array): Shape (batters, 8); columns in ODDS order.
+        swing (array): Total of the outcomes possible on a swing.
+        thresholds (array): Shape (batters, 5); running totals of the
+                            strike, out in play, home run, single and
+                            double odds, the order AtBat.swing checks them.
+        cuts (lst): Per row, a tuple of swing followed by thresholds, as
+                    plain floats for the one-pitch-at-a-time game loop (a
+                    RowCuts for tables made with from_arrays()).
+    """
+    ODDS = ("1B", "2B", "3B", "HR", "BB", "K", "HBP", "OIP")
+
+    def __init__(self, names, odds):
+        """
+        Constructor for RosterTable class.
+
+        Parameters:
+            names (lst): Batter names.
+            odds (array): One row per batter, columns in ODDS order.
+        """
+        import numpy as np
+        self.names = list(names)
+        self.odds = np.ascontiguousarray(odds, dtype=np.float64).reshape(
+            len(self.names), len(self.ODDS))
+        single, double, triple, hr, walk, k, hbp, oip = self.odds.T
+        # Same order of additions as the game always used, so every total
+        # matches to the last bit.
+        self.swing = single + double + triple + hr + oip + k
+        self.thresholds = np.cumsum(np.stack([k, oip, hr, single, double],
+                                             axis=1), axis=1)
+        self.make_cuts()
+
+    @classmethod
+    def from_arrays(cls, names, odds, swing, thresholds):
+        """
+        Wraps arrays of another RosterTable without copying them, e.g.
+        read-only views of shared memory.
+
+        Parameters:
+            names (lst): Batter names.
+            odds (array): Shape (batters, 8).
+            swing (array): Shape (batters,).
+            thresholds (array): Shape (batters, 5).
+
+        Returns:
+            (obj): RosterTable over the same memory.
+        """
+        table = cls.__new__(cls)
+        table.names = list(names)
+        table.odds = odds
+        table.swing = swing
+        table.thresholds = thresholds
+        # Only the rows this process plays are turned into tuples.
+        table.cuts = RowCuts(table)
+        return table
+
+    def make_cuts(self):
+        """Builds cuts from swing and thresholds."""
+        import numpy as np
+        self.cuts = [tuple(row) for row in np.column_stack(
+            [self.swing, self.thresholds]).tolist()]
+
+    def __len__(self):
+        """Returns (int) number of batters in the table."""
+        return len(self.names)
+
+    def batters(self, rows=None):
+        """
+        Makes Batter views for rows of the table.
+
+        Parameters:
+            rows (lst): Row numbers (or a slice); defaults to every row.
+
+        Returns:
+            (lst): A new Batter object for each row, with empty stats.
+        """
+        numbers = range(len(self.names))
+        if rows is not None:
+            numbers = numbers[rows] if isinstance(rows, slice) else rows
+        return [Batter.view(self, int(row)) for row in numbers]
+
+    def odds_dict(self, row):
+        """Returns (dict) one batter's odds, keyed like Batter.odds."""
+        odds = dict(zip(self.ODDS, self.odds[row].tolist()))
+        odds["SWING"] = float(self.swing[row])
+        return odds
+
+
+class RowCuts:
+    """
+    Class to make a RosterTable's cuts one row at a time, when first used.
+
+    Attributes:
+        table (obj): RosterTable.
+        rows (dict): Row to its cuts tuple, for the rows used so far.
+    """
+    __slots__ = ("table", "rows")
+
+    def __init__(self, table):
+        """Constructor for RowCuts class."""
+        self.table = table
+        self.rows = {}
+
+    def __len__(self):
+        """Returns (int) number of rows in the table."""
+        return len(self.table.swing)
+
+    def __getitem__(self, row):
+        """Returns (tup) a row's swing total and thresholds."""
+        cuts = self.rows.get(row)
+        if cuts is None:
+            cuts = self.rows[row] = (float(self.table.swing[row]),) + \
+                tuple(self.table.thresholds[row].tolist())
+        return cuts
+
 
 class Batter:
     """
     Class to create MLB players capable of batting and running bases.
 
+    A Batter keeps its own stats but reads its odds from a row of a
+    RosterTable, so a whole roster shares one block of memory.
+
     Attributes:
         name (str): Player's name.
         atbats (int): Number of plate appearances that end in a hit or out.
         hits (int): Number of hits player has.
         rbis (int): Number of runs batted in by player.
+        table (obj): RosterTable holding the player's odds.
+        row (int): Player's row in table.
         odds (dict): Player-specific odds of different at bat outcomes.
     """
+    __slots__ = ("name", "atbats", "hits", "rbis", "table", "row", "cuts")
 
     def __init__(self, name, single, double, triple, hr, walk, k, hbp, oip):
         """
@@ -103,27 +397,32 @@ class Batter:
             hbp (float): % of batter's at bats ending in hit by the pitch.
             oip (float): % of batter's at bats ending in an out during a play.
         """
-        self.name = name
+        table = RosterTable([name], [[single, double, triple, hr, walk, k,
+                                      hbp, oip]])
+        self.setup(table, 0)
+
+    @classmethod
+    def view(cls, table, row):
+        """Returns (obj) a Batter for one row of a RosterTable."""
+        batter = cls.__new__(cls)
+        batter.setup(table, row)
+        return batter
+
+    def setup(self, table, row):
+        """Points the batter at a table row and clears their stats."""
+        self.name = table.names[row]
         self.atbats = 0
         self.hits = 0
         self.rbis = 0
-        self.odds = {
-            "1B" : single,
-            "2B" : double,
-            "3B" : triple,
-            "HR" : hr,
-            "BB" : walk,
-            "HBP" : hbp,
-            "OIP" : oip,
-            "K" : k,
-            # The total of potential outcomes if a batter swings.
-            "SWING" : single
-                      + double
-                      + triple
-                      + hr
-                      + oip
-                      + k
-        }
+        self.table = table
+        self.row = row
+        # The swing total and thresholds AtBat.swing compares against.
+        self.cuts = table.cuts[row]
+
+    @property
+    def odds(self):
+        """Returns (dict) the batter's odds, plus the "SWING" total."""
+        return self.table.odds_dict(self.row)
 
     def __repr__(self):
         """Returns batter name (str)."""
@@ -154,10 +453,16 @@ class AtBat:
         self.status = "Batting"
         self.balls = 0
         self.strikes = 0
-        # Set the batters base equal to 0 (at the plate).
-        field.bases[batter] = 0
-        # Remove the batter from the dugout so they have no duplicates.
-        field.dugout.remove(batter)
+        # Play-by-play events go wherever the field sends them.
+        self.sink = field.sink
+        # Draw every random number from the field's stream.
+        self.rng = field.rng
+        # The batter's swing thresholds against the pitcher on the mound,
+        # looked up once so no pitch does any arithmetic.
+        cuts = field.bullpen[0].cuts if field.bullpen else None
+        self.cuts = batter.cuts if cuts is None else cuts[batter.row]
+        # Put the batter at the plate and take them out of the dugout.
+        field.step_up(batter)
 
     def __repr__(self):
         """Returns the count of the at bat: 'X balls, Y strikes.'"""
@@ -179,36 +484,31 @@ class AtBat:
             self.status (str): "Batting" if the at bat still in progress, or
             a new outcome.
         """
+        swing, strike, out, homer, single, double = self.cuts
         # Potentials are floats between 0 and the total of all swing options.
-        x = random.uniform(0,self.batter.odds["SWING"])
+        x = self.rng.uniform(0,swing)
         # Check to see where x falls among the options.
         # Update the count and status accordingly.
-        if x <= self.batter.odds["K"]:
+        if x <= strike:
             self.strikes += 1
             self.status = "Batting"
-            prints = ["Whiff! That's a strike.", "A swing and a miss. Strike!"]
-            print(random.choice(prints))
+            if self.sink.active:
+                self.sink.emit(Pitch(self.batter.name, 's', "Strike",
+                                     self.balls, self.strikes))
             self.check_count()
-        elif x <= self.batter.odds["K"]\
-                + self.batter.odds["OIP"]:
+        elif x <= out:
             self.status = "Out in play"
-        elif x <= self.batter.odds["K"]\
-                + self.batter.odds["OIP"]\
-                + self.batter.odds["HR"]:
+        elif x <= homer:
             self.status = "Home run"
-        elif x <= self.batter.odds["K"]\
-                + self.batter.odds["OIP"]\
-                + self.batter.odds["HR"]\
-                + self.batter.odds["1B"]:
+        elif x <= single:
             self.status = "Single"
-        elif x <= self.batter.odds["K"]\
-                + self.batter.odds["OIP"]\
-                + self.batter.odds["HR"]\
-                + self.batter.odds["1B"]\
-                + self.batter.odds["2B"]:
+        elif x <= double:
             self.status = "Double"
         else:
             self.status = "Triple"
+        if self.sink.active and self.status != "Batting":
+            self.sink.emit(Pitch(self.batter.name, 's', "In play",
+                                 self.balls, self.strikes))
         return self.status
 
     def watch(self, pitch):
@@ -223,23 +523,18 @@ class AtBat:
             a new outcome.
         """
         if pitch == "Ball":
-            prints = ["Good eye! It was a ball.", "Ball! Good job.",
-                      "Way to hold - ball!"]
-            print(random.choice(prints))
             self.balls += 1
-            self.check_count()
         else:
-            prints = ["Strike!", "Darn, you watched a perfect strike!",
-                      "Right down the middle - strike!"]
-            print(random.choice(prints))
             self.strikes += 1
-            self.check_count()
+        if self.sink.active:
+            self.sink.emit(Pitch(self.batter.name, 'w', pitch, self.balls,
+                                 self.strikes))
+        self.check_count()
         return self.status
 
     def send_to_dugout(self, runner, field):
         """Function to remove runner from field and add to dugout."""
-        field.dugout.append(runner)
-        del field.bases[runner]
+        field.remove_runner(runner)
 
     def update_stats(self, scoreboard, hit, out, at_bat):
         """
@@ -258,6 +553,18 @@ class AtBat:
         if at_bat == True:
             self.batter.atbats +=1
 
+    def announce(self, scoreboard, play=None):
+        """
+        Sends how the at bat ended to the play-by-play sink.
+
+        Parameters:
+            scoreboard (obj): Instance from Scoreboard class.
+            play (str): How the runners moved, for walks and outs in play.
+        """
+        if self.sink.active:
+            self.sink.emit(Outcome(self.batter.name, self.status, play,
+                                   scoreboard.outs))
+
     def outcome_machine(self, field, scoreboard):
         """
         Function that updates player stats, the scoreboard, and the field
@@ -270,81 +577,128 @@ class AtBat:
         if self.status == "Strike out":
             self.update_stats(scoreboard, False, True, True)
             self.send_to_dugout(self.batter, field)
-            print("\nThat's 3. " + self.batter.name + " strikes out.")
+            self.announce(scoreboard)
         elif self.status == "Walk":
-            # Check to see if there is a runner on first already.
-            no_first = True
-            for item in field.bases:
-                if field.bases[item] != 1:
-                    no_first = True
-                    continue
-                else:
-                    no_first = False
-                    break
             # If no one on first, the batter gets a base but runners stay put.
-            if no_first == True:
-                field.bases[self.batter] += 1
-                print("\nThat's 4 balls. " + self.batter.name + " takes the" +
-                      " empty spot at first base.")
+            if not field.first_occupied():
+                field.take_first(self.batter)
+                self.announce(scoreboard, 'empty first')
             # If a runner is already on first, everyone moves one base.
             else:
-                print("\nThat's 4 balls - take a walk.")
+                self.announce(scoreboard, 'forced')
                 field.advance_runners(1, scoreboard, self.batter, True)
         elif self.status == "Single":
-            print(self.batter.name + " gets a single through the infield!")
+            self.announce(scoreboard)
             self.update_stats(scoreboard, True, False, True)
             field.advance_runners(1, scoreboard, self.batter)
         elif self.status == "Double":
-            print(self.batter.name + " finds a gap and hits a double!")
+            self.announce(scoreboard)
             self.update_stats(scoreboard, True, False, True)
             field.advance_runners(2, scoreboard, self.batter)
         elif self.status == "Triple":
-            print(self.batter.name + " hits it to the fence for a triple!")
+            self.announce(scoreboard)
             self.update_stats(scoreboard, True, False, True)
             field.advance_runners(3, scoreboard, self.batter)
         elif self.status == "Home run":
-            print(self.batter.name + " sends it out of the park! HOME RUN!")
+            self.announce(scoreboard)
             self.update_stats(scoreboard, True, False, True)
             field.advance_runners(4, scoreboard, self.batter)
         elif self.status == "Out in play":
             self.update_stats(scoreboard, False, True, True)
             # To determine which runner is out in the play.
-            whos_out = random.randrange(0,3)
+            whos_out = self.rng.randrange(0,3)
             # If the batter is the only runner, they hit into an out at first.
-            if len(field.bases) < 2 or scoreboard.outs == 3:
-                print(self.batter.name + " hits into an out at first.")
+            if field.runner_count() < 2 or scoreboard.outs == 3:
+                self.announce(scoreboard, 'batter')
                 self.send_to_dugout(self.batter, field)
             # If the random number is 2, the out is at first.
             elif whos_out > 1:
-                print(self.batter.name + " hits into an out at first, but" +
-                      " the runners advance.")
+                self.announce(scoreboard, 'runners advance')
                 field.advance_runners(1, scoreboard, self.batter)
                 self.send_to_dugout(self.batter, field)
             # It's more likely in baseball to get the lead runner.
             # If random number is 0 or 1, the lead runner (not batter) is out.
             else:
-                print(self.batter.name + " hits into a play, and the lead" +
-                      " runner is out.")
-                lead_runner = max(field.bases, key=field.bases.get)
+                self.announce(scoreboard, 'lead runner')
+                lead_runner = field.lead_runner()
                 self.send_to_dugout(lead_runner, field)
                 field.advance_runners(1, scoreboard, self.batter)
 
 
+def change_pitcher(bullpen, pitcher):
+    """Moves a pitcher to the front of a bullpen, adding them if new."""
+    if pitcher in bullpen:
+        bullpen.remove(pitcher)
+    bullpen.insert(0, pitcher)
+
+def make_sink(verbose, sink):
+    """Returns (obj) the given sink, or one that prints only if verbose."""
+    if sink is not None:
+        return sink
+    return TerminalSink() if verbose else NULL_SINK
+
 class Field:
     """
     Class to manage location of players.
 
     Attributes:
         dugout (list): Holds Batter objects not on base.
-        bullpen (list): Holds Pitcher objects not currently pitching.
+        bullpen (list): Holds Pitcher objects; the first one is pitching.
         bases (dict): Keys are Batter objects, value is base they are on.
+        sink (obj): Receives play-by-play events; see events.py.
+        rng (obj): Random number source for the game (see streams.py).
     """
 
-    def __init__(self):
-        """Constructor for Field class; creates an empty field."""
+    def __init__(self, verbose=True, sink=None, rng=None):
+        """
+        Constructor for Field class; creates an empty field.
+
+        Parameters:
+            verbose (bool): False to run without printing play-by-play text.
+            sink (obj): Play-by-play sink; overrides verbose if given.
+            rng (obj): Random number source; the random module if None.
+        """
         self.dugout = []
         self.bullpen = []
         self.bases = {}
+        self.sink = make_sink(verbose, sink)
+        self.rng = streams.as_random(rng)
+
+    def change_pitcher(self, pitcher):
+        """Puts a pitcher on the mound (the front of the bullpen) for the
+        next batter; the one they replace goes back to the bullpen."""
+        change_pitcher(self.bullpen, pitcher)
+
+    def step_up(self, batter):
+        """Moves a batter from the dugout to the plate (base 0)."""
+        # Set the batters base equal to 0 (at the plate).
+        self.bases[batter] = 0
+        # Remove the batter from the dugout so they have no duplicates.
+        self.dugout.remove(batter)
+
+    def remove_runner(self, runner):
+        """Takes a runner (or the batter) off the field, into the dugout."""
+        self.dugout.append(runner)
+        del self.bases[runner]
+
+    def first_occupied(self):
+        """Returns (bool) True if there is a runner on first base."""
+        for runner in self.bases:
+            if self.bases[runner] == 1:
+                return True
+        return False
+
+    def take_first(self, batter):
+        """Sends the batter to an empty first base; runners stay put."""
+        self.bases[batter] += 1
+
+    def runner_count(self):
+        """Returns (int) players on the field, counting the batter."""
+        return len(self.bases)
+
+    def lead_runner(self):
+        """Returns (obj) the Batter furthest around the bases."""
+        return max(self.bases, key=self.bases.get)
 
     def __repr__(self):
         """Returns (str) # of batters in dugout and # on base."""
@@ -355,65 +709,23 @@ class Field:
         """
         Function to print visual representation of the base runners and inning.
 
+        The picture itself is drawn by the sink (see TerminalSink).
+
         Parameters:
             bases (dict): self.bases dictionary.
             scoreboard (obj): Instance of Scoreboard class.
         """
-        # Define variables we'll be using.
-        home = False
-        first = False
-        second = False
-        third = False
+        if not self.sink.active:
+            return
         # Check dictionary and assign runners to the variable matching value.
         # This was how I got around dictionaries being unordered.
+        named = [None, None, None, None]
         for runner in bases:
-            if bases[runner] == 0:
-                home = runner
-            elif bases[runner] == 1:
-                first = runner
-            elif bases[runner] == 2:
-                second = runner
-            elif bases[runner] == 3:
-                third = runner
-            else:
-                continue
-        # Print the top border, inning number and outs above the field.
-        print("_" * 80)
-        print(start + "\nInning: " + end + str(scoreboard.inning))
-        print(start + "Outs: " + end + str(scoreboard.outs) + "\n")
-        # The field is printed in 9 rows.
-        for r in range(0, 9):
-            # The first row holds 2nd base.
-            if r == 0:
-                # If someone is on second, print row with their name.
-                if second != False:
-                    print('{:^80s}'.format(start + "2nd: " + end + \
-                          second.name))
-                # Otherwise, print 2nd as empty.
-                else:
-                    print('{:^80s}'.format(start + "2nd: " + end))
-            # Row holding 3rd and 1st base.
-            elif r == 4:
-                if third != False and first != False:
-                    print('{:<72s}'.format(start + "3rd: " + end + third.name)\
-                         + '{:>0s}'.format(start + "1st: " + end + first.name))
-                elif third != False:
-                    print('{:<80s}'.format(start + "3rd: " + end + third.name)\
-                         + '{:>0s}'.format(start + "1st: " + end))
-                elif first != False:
-                    print('{:<72s}'.format(start + "3rd: " + end) + '{:>0s}'.\
-                          format(start + "1st: " + end + first.name))
-                else:
-                    print('{:<80s}'.format(start + "3rd: " + end) + '{:>0s}'.\
-                          format(start + "1st: " + end))
-            # Home plate row.
-            elif r == 8:
-                print('{:^80s}'.format(start + "Up next: " + end + self.dugout\
-                      [0].name))
-            # Other rows are blank for spacing.
-            else:
-                print()
-        print("_" * 80)
+            if 0 <= bases[runner] <= 3:
+                named[bases[runner]] = runner.name
+        self.sink.emit(FieldShown(scoreboard.inning, scoreboard.outs,
+                                  named[1], named[2], named[3],
+                                  self.dugout[0].name))
 
     def advance_runners(self, value, scoreboard, batter, walk=False):
         """
@@ -432,7 +744,9 @@ class Field:
             # If they reach 4, they scored.
             if self.bases[base] > 3:
                 scoreboard.runs += 1
-                print(".\n.\n.\n" + base.name + " scores!")
+                if self.sink.active:
+                    self.sink.emit(RunScored(base.name, batter.name,
+                                             walk == False, scoreboard.runs))
                 # If they reached 4 and it is not from a walk, the batter gets
                 # an RBI.
                 if walk == False:
@@ -455,6 +769,147 @@ class Field:
         for item in to_remove:
             del self.bases[item]
 
+def advance_table():
+    """
+    Builds the runner moves for every base state and number of bases.
+
+    Returns:
+        (lst): Indexed [state][value], where state is the base mask plus 8
+        if a batter is at the plate and value is 1 to 4 bases. Each entry
+        is (new mask, moves); moves are (from, to) pairs, lead runner
+        first, with 0 for the plate and 4 for scoring.
+    """
+    table = []
+    for state in range(16):
+        row = [None]
+        for value in range(1, 5):
+            moves = []
+            mask = 0
+            for base in (3, 2, 1, 0):
+                occupied = state & 8 if base == 0 else state & (1 << (base-1))
+                if not occupied:
+                    continue
+                moves.append((base, min(base + value, 4)))
+                if base + value <= 3:
+                    mask |= 1 << (base + value - 1)
+            row.append((mask, tuple(moves)))
+        table.append(row)
+    return table
+
+class BitField:
+    """
+    Field with bases stored as a 3-bit mask and three runner slots.
+
+    Drop-in replacement for Field in headless games: base moves, forced
+    walks and lead runner outs are table lookups instead of scans of a
+    dictionary, and runners score and return to the dugout in the same
+    order Field uses (lead runner first).
+
+    Attributes:
+        dugout (list): Holds Batter objects not on base.
+        bullpen (list): Holds Pitcher objects; the first one is pitching.
+        slots (list): The batter at the plate, then runners on 1st to 3rd,
+                      or None where empty.
+        mask (int): Occupied bases: 1 for first, 2 second, 4 third.
+        sink (obj): Receives play-by-play events; see events.py.
+        rng (obj): Random number source for the game (see streams.py).
+    """
+    ADVANCE = advance_table()
+    # Base of the lead runner for each mask; 0 (the batter) if empty.
+    LEAD = (0, 1, 2, 2, 3, 3, 3, 3)
+    RUNNERS = (0, 1, 1, 2, 1, 2, 2, 3)
+
+    def __init__(self, verbose=True, sink=None, rng=None):
+        """Constructor for BitField class; creates an empty field."""
+        self.dugout = []
+        self.bullpen = []
+        self.slots = [None, None, None, None]
+        self.mask = 0
+        self.sink = make_sink(verbose, sink)
+        self.rng = streams.as_random(rng)
+
+    def change_pitcher(self, pitcher):
+        """Puts a pitcher on the mound for the next batter; see Field."""
+        change_pitcher(self.bullpen, pitcher)
+
+    @property
+    def bases(self):
+        """Returns (dict) runner to base, lead runner first, like Field."""
+        return {self.slots[base] : base for base in (3, 2, 1, 0)
+                if self.slots[base] is not None}
+
+    def step_up(self, batter):
+        """Moves a batter from the dugout to the plate."""
+        self.dugout.remove(batter)
+        self.slots[0] = batter
+
+    def remove_runner(self, runner):
+        """Takes a runner (or the batter) off the field, into the dugout."""
+        base = self.slots.index(runner)
+        self.slots[base] = None
+        if base:
+            self.mask &= ~(1 << (base - 1))
+        self.dugout.append(runner)
+
+    def first_occupied(self):
+        """Returns (bool) True if there is a runner on first base."""
+        return bool(self.mask & 1)
+
+    def take_first(self, batter):
+        """Sends the batter to an empty first base; runners stay put."""
+        self.slots[1] = self.slots[0]
+        self.slots[0] = None
+        self.mask |= 1
+
+    def runner_count(self):
+        """Returns (int) players on the field, counting the batter."""
+        return self.RUNNERS[self.mask] + (self.slots[0] is not None)
+
+    def lead_runner(self):
+        """Returns (obj) the Batter furthest around the bases."""
+        return self.slots[self.LEAD[self.mask]]
+
+    def print_field(self, bases, scoreboard):
+        """Prints the field the same way Field.print_field does."""
+        Field.print_field(self, self.bases, scoreboard)
+
+    def advance_runners(self, value, scoreboard, batter, walk=False):
+        """
+        Function move runners around the bases.
+
+        Parameters:
+            value (int): Number of bases everyone needs to move.
+            scoreboard (obj): Instance of Scoreboard class.
+            batter (obj): Instance of Batter class; batter who triggered
+                          movement.
+            walk (bool): True if the Batter walked.
+        """
+        slots = self.slots
+        state = self.mask | (8 if slots[0] is not None else 0)
+        self.mask, moves = self.ADVANCE[state][min(value, 4)]
+        # Lead runner first, so each runner's new base is already empty.
+        for old, new in moves:
+            runner = slots[old]
+            slots[old] = None
+            if new == 4:
+                scoreboard.runs += 1
+                if self.sink.active:
+                    self.sink.emit(RunScored(runner.name, batter.name,
+                                             walk == False, scoreboard.runs))
+                if walk == False:
+                    batter.rbis += 1
+                self.dugout.append(runner)
+            else:
+                slots[new] = runner
+
+    def clear_bases(self):
+        """Function to remove all runners from bases and add them to dugout."""
+        for base in (3, 2, 1, 0):
+            if self.slots[base] is not None:
+                self.dugout.append(self.slots[base])
+                self.slots[base] = None
+        self.mask = 0
+
 class Scoreboard:
     """
     Class to manage game stats, batting order and the opponent.
@@ -467,23 +922,34 @@ class Scoreboard:
         home (str): Name of home team.
         inning (int): Current inning of game.
         max (int): User defined length of game (in innings).
+        rng (obj): Random number source for the opponent's innings.
     """
 
-    def __init__(self, game):
-        """Constructor for Scoreboard class."""
+    def __init__(self, game, innings=None):
+        """
+        Constructor for Scoreboard class.
+
+        Parameters:
+            game (obj): Instance of Engine class.
+            innings (int): Length of game; if None, the user is asked.
+        """
         self.outs = 0
         self.runs = 0
         self.opponentruns = 0
         self.opponent = ''
         self.home = ''
         self.inning = 1
-        # Error check user input for the length of the game.
-        try:
-            self.max = int(game.help_quit("How many innings do you want to" +
-                           " play? "))
-        except ValueError:
-            print("That's not a valid number. Let's go with 9.")
-            self.max = 9
+        self.rng = random
+        if innings is not None:
+            self.max = innings
+        else:
+            # Error check user input for the length of the game.
+            try:
+                self.max = int(game.help_quit("How many innings do you want" +
+                               " to play? "))
+            except ValueError:
+                print("That's not a valid number. Let's go with 9.")
+                self.max = 9
 
     def __repr__(self):
         """Returns score of the game (Opponent: runs, User: runs)"""
@@ -514,9 +980,8 @@ class Scoreboard:
             game (obj): Instance of Engine class.
         """
         # Show the user player options.
-        for player in lineup:
-            print('{:^80s}'.format(f"{str(lineup.index(player))}: " +
-                  f"{player.name}"))
+        for number, player in enumerate(lineup):
+            print('{:^80s}'.format(f"{str(number)}: " + f"{player.name}"))
         order = game.help_quit("\nTime to pick the batting order. Using the" +\
                                " numbers above, enter the order you \nwould" +\
                                " like players to bat as a set of numbers" +\
@@ -565,7 +1030,7 @@ class Scoreboard:
         Returns:
             (str): The 'opponent' scored 'x' runs at the top of inning '#.'
         """
-        x = random.uniform(0,1)
+        x = self.rng.uniform(0,1)
         # Odds: https://gregstoll.com/~gregstoll/baseball/runsperinning.html
         if x <= .7315:
             return ("The " + self.opponent + " scored 0 runs at the" +
@@ -613,23 +1078,97 @@ class Scoreboard:
             if extras == 'y':
                 self.max +=1
 
+def always_swing(atbat, field, scoreboard):
+    """Swing/watch policy for headless games that swings at every pitch."""
+    return 's'
+
+def always_watch(atbat, field, scoreboard):
+    """Swing/watch policy for headless games that watches every pitch."""
+    return 'w'
+
 class Engine:
     """
     Class for creating a game, making a roster, and managing user choices.
 
+    Called with no arguments, the Engine plays the interactive game. Given a
+    policy, it runs headless: no input() or print(), and simulate() returns
+    the results of each game.
+
     Attributes:
         files (obj): Instance from Files class.
         field (obj): Instance from Field class.
         scoreboard (obj): Instance from Scoreboard class.
         lineup (lst): Empty list to hold players.
+        policy (func): Swing/watch policy for headless games, or None.
+        order (lst): Batter objects in batting order for headless games.
+        extras (bool): True if headless games play extra innings when tied.
+        visitors (obj): Headless Engine of the opposing team when it is a
+                        real roster, or None to use Scoreboard.other_team.
     """
-    def __init__(self):
-        """Constructor for Engine class."""
-        self.files = Files()
-        print(self.files.welcome)
-        self.field = Field()
-        self.scoreboard = Scoreboard(self)
+    def __init__(self, team=None, order=None, innings=9, opponent=\
+                 "Opponents", policy=None, files=None, extras=True,
+                 field_type=Field, sink=None, rng=None, opponent_team=None,
+                 opponent_order=None):
+        """
+        Constructor for Engine class.
+
+        Parameters:
+            team (str): Team name for a headless game, e.g. 'Red Sox'.
+            order (lst): Indices into the team's players, 5 to 9 batters.
+                         Defaults to the first nine.
+            innings (int): Length of a headless game.
+            opponent (str): Name of the opposing team in a headless game.
+            policy (func): Called as policy(atbat, field, scoreboard) before
+                           every pitch; returns 's' to swing or 'w' to watch.
+                           If None, the user plays the interactive game.
+            files (obj): Instance from Files class, to share loaded data
+                         between engines.
+            extras (bool): True to keep playing headless games while tied.
+            field_type (class): Field, or BitField for faster headless
+                                games.
+            sink (obj): Play-by-play sink for headless games, e.g. a
+                        JsonlSink; nothing is reported by default. A real
+                        opponent's half innings go to sink.opponent(), if
+                        the sink has that method.
+            rng (obj): Random number source for headless games: a
+                       numpy.random.Generator, a streams.StreamRandom, an
+                       int seed, or None for the random module.
+            opponent_team (str): Team whose batters play the top of each
+                                 inning in a headless game, with the same
+                                 at bat rules. If None, the opponent's runs
+                                 come from Scoreboard.other_team.
+            opponent_order (lst): Indices into the opponent's players.
+        """
+        if files is None:
+            files = Files()
+        self.files = files
+        self.policy = policy
+        self.innings = innings
+        self.extras = extras
         self.lineup = []
+        self.order = []
+        self.visitors = None
+        if policy is None:
+            print(self.files.welcome)
+            self.field = Field()
+            self.scoreboard = Scoreboard(self)
+        else:
+            self.field = field_type(verbose=False, sink=sink, rng=rng)
+            self.scoreboard = Scoreboard(self, innings)
+            self.scoreboard.rng = self.field.rng
+            self.scoreboard.opponent = opponent
+            self.headless_roster(team, order)
+            if opponent_team is not None:
+                # The opponent's half innings go to the sink's opponent()
+                # sink, if it has one, so a log can tell the teams apart.
+                opponent_sink = getattr(sink, "opponent", None)
+                self.visitors = Engine(opponent_team, opponent_order,
+                                       innings, policy=policy, files=files,
+                                       field_type=field_type,
+                                       sink=opponent_sink and opponent_sink())
+                self.visitors.set_rng(self.field.rng)
+                if opponent == "Opponents":
+                    self.scoreboard.opponent = self.visitors.scoreboard.home
 
     def __repr__(self):
         """Returns game explanation."""
@@ -675,34 +1214,294 @@ class Engine:
                                    "? Type a team name, without the city.\n" +\
                                    "Examples include 'Astros' and 'Red Sox." +\
                                    "'\n")
-        # Filter to user's input.
-        team_batters = self.files.data[self.files.data['Team'] == \
-                       home_team.title()]
+        # Look the team up in the index built when the data loaded.
+        team = self.files.find_team(home_team)
+        if team is not None:
+            self.lineup = self.files.team_roster(team)
         # Check for error.
-        if len(team_batters) < 5:
+        if team is None or len(self.lineup) < 5:
             print("Oops... Looks like there was a typo. We're going to " +
                  "default you to the Baltimore Orioles (sorry!). Enter 'q'" +\
                  " if you \nwant to quit and start over with a new selection.")
-            home_team = "Orioles"
-            team_batters = self.files.data[self.files.data['Team'] == \
-                           home_team.title()]
-        self.scoreboard.home = home_team.title()
+            team = "Orioles"
+            self.lineup = self.files.team_roster(team)
+        self.scoreboard.home = team
         pitcher = Pitcher("Benny 'The Jet' Rodriguez", self.field)
-        roster = {}
-        # Append all players to the lineup.
-        for index, row in team_batters.iterrows():
-            name = 'obj_{}'.format(index)
-            roster[name] = Batter(row['Name'], row['1B%'], row['2B%'], \
-                           row['3B%'], row['HR%'], row['BB%'], row['K%'], \
-                           row['HBP%'], row['OIP%'])
-            self.lineup.append(roster[name])
+
+    def headless_roster(self, team, order=None):
+        """
+        Builds the roster and batting order for a headless game.
+
+        Parameters:
+            team (str): Team name, without the city.
+            order (lst): Indices into the team's players, 5 to 9 batters.
+
+        Raises:
+            ValueError: If the team or the batting order is not valid.
+        """
+        found = self.files.find_team(team)
+        self.lineup = self.files.team_roster(found) if found else []
+        if len(self.lineup) < 5:
+            raise ValueError("No team with at least 5 batters named " +
+                             repr(team) + ".")
+        self.scoreboard.home = found
+        Pitcher("Benny 'The Jet' Rodriguez", self.field)
+        if order is None:
+            order = range(min(9, len(self.lineup)))
+        order = list(order)
+        if len(order) < 5 or len(order) > 9:
+            raise ValueError("A batting order needs between 5 and 9 batters.")
+        if len(order) != len(set(order)):
+            raise ValueError("The batting order has a duplicate batter.")
+        try:
+            self.order = [self.lineup[int(number)] for number in order]
+        except IndexError:
+            raise ValueError("The batting order has a number outside the " +
+                             "range of potential batters.")
+
+    def reset(self):
+        """Function to clear the field, scoreboard and stats for a new game."""
+        self.field.clear_bases()
+        self.field.dugout = list(self.order)
+        self.scoreboard.outs = 0
+        self.scoreboard.runs = 0
+        self.scoreboard.opponentruns = 0
+        self.scoreboard.inning = 1
+        self.scoreboard.max = self.innings
+        for batter in self.order:
+            batter.atbats = 0
+            batter.hits = 0
+            batter.rbis = 0
+        if self.visitors is not None:
+            self.visitors.reset()
+
+    def set_rng(self, rng):
+        """
+        Function to change the random number source of a headless engine.
+
+        Parameters:
+            rng (obj): Anything streams.as_random() accepts.
+        """
+        self.field.rng = self.scoreboard.rng = streams.as_random(rng)
+        if self.visitors is not None:
+            self.visitors.set_rng(self.field.rng)
+
+    def half_inning(self, lead=None):
+        """
+        Function to play the team's half of an inning without input or
+        printing. The runners are left on base for the caller to clear.
+
+        Parameters:
+            lead (int): Runs the other team has. If given, the half ends as
+                        soon as this team goes ahead, like a walk-off.
+        """
+        field = self.field
+        scoreboard = self.scoreboard
+        policy = self.policy
+        scoreboard.outs = 0
+        while scoreboard.outs < 3:
+            if field.sink.active:
+                field.print_field(field.bases, scoreboard)
+            # Read each time, so a pitching change takes the next batter.
+            current_pitcher = field.bullpen[0]
+            atbat = AtBat(field.dugout[0], field)
+            while atbat.status == "Batting":
+                if policy(atbat, field, scoreboard) == 's':
+                    atbat.swing()
+                else:
+                    atbat.watch(current_pitcher.throw_pitch(atbat))
+            atbat.outcome_machine(field, scoreboard)
+            if lead is not None and scoreboard.runs > lead:
+                break
+
+    def play_headless(self, rng=None):
+        """
+        Function to play a full game without user input or printing.
+
+        Parameters:
+            rng (obj): Random number source for this game and the ones
+                       after it; keeps the engine's current source if None.
+
+        Returns:
+            (dict): The results of the game; see results().
+        """
+        field = self.field
+        scoreboard = self.scoreboard
+        if rng is not None:
+            self.set_rng(rng)
+        self.reset()
+        visitors = self.visitors
+        # Every batter in the order, even ones a short game never reaches.
+        for engine in (self, visitors):
+            if engine is not None and engine.field.sink.active:
+                names = [batter.name for batter in engine.order]
+                engine.field.sink.emit(Lineup(engine.scoreboard.home, names))
+        while scoreboard.inning <= scoreboard.max:
+            if visitors is None:
+                scoreboard.other_team()
+            else:
+                visitors.half_inning()
+                visitors.field.clear_bases()
+                scoreboard.opponentruns = visitors.scoreboard.runs
+            self.half_inning()
+            if field.sink.active:
+                field.sink.emit(InningEnd(scoreboard.inning, scoreboard.runs,
+                                          scoreboard.opponentruns))
+            field.clear_bases()
+            # Play extra innings until the tie is broken.
+            if self.extras and scoreboard.inning == scoreboard.max and \
+                    scoreboard.runs == scoreboard.opponentruns:
+                scoreboard.max += 1
+            scoreboard.inning += 1
+        if field.sink.active:
+            field.sink.emit(GameOver(scoreboard.home, scoreboard.opponent,
+                                     scoreboard.runs, scoreboard.opponentruns,
+                                     scoreboard.inning - 1))
+        return self.results()
+
+    def results(self):
+        """
+        Returns the results of the last game.
+
+        Returns:
+            (dict): Team names, runs for each team, innings played and a
+            list of each batter's name, hits, at bats and RBIs in batting
+            order; against a real opponent, their batters are listed under
+            "opponent_batters" too.
+        """
+        results = {
+            "home" : self.scoreboard.home,
+            "opponent" : self.scoreboard.opponent,
+            "runs" : self.scoreboard.runs,
+            "opponent_runs" : self.scoreboard.opponentruns,
+            "innings" : self.scoreboard.inning - 1,
+            "batters" : [{"name" : batter.name, "hits" : batter.hits,
+                          "atbats" : batter.atbats, "rbis" : batter.rbis}
+                         for batter in self.order]
+        }
+        if self.visitors is not None:
+            results["opponent_batters"] = self.visitors.results()["batters"]
+        return results
+
+    def simulate(self, games=1, seed=None, first=0):
+        """
+        Function to play many headless games in a row.
+
+        Parameters:
+            games (int): Number of games to play.
+            seed (int): Root seed of the batch. If given, game number i
+                        draws from its own stream, streams.game_rng(seed,
+                        i), so it can be replayed alone with replay().
+            first (int): Number of the first game, so a batch split across
+                         workers can use first=0, first=games, and so on.
+
+        Returns:
+            (lst): One results dictionary per game.
+        """
+        if seed is None:
+            return [self.play_headless() for game in range(games)]
+        return [self.play_headless(streams.game_rng(seed, game))
+                for game in range(first, first + games)]
+
+    def simulate_batch(self, games, seed=None, swing=None):
+        """
+        Function to play many games against the real opponent at once,
+        with both halves of every inning drawn by one batched sampler.
+        Each team faces the pitcher on the mound when it starts, for the
+        whole game.
+
+        Parameters:
+            games (int): Number of games to play.
+            seed (obj): Int seed, numpy.random.Generator or None.
+            swing (array): True to swing in each of the 12 counts, or one
+                           bool; defaults to what the policy does if it is
+                           always_swing or always_watch.
+
+        Returns:
+            (dict): Arrays of results; see batch.play_games().
+
+        Raises:
+            ValueError: If there is no real opponent, or the swing choices
+                        can't be worked out from the policy.
+        """
+        import batch
+        import sampler
+        if self.visitors is None:
+            raise ValueError("Batched games need a real opponent; pass " +
+                             "opponent_team.")
+        if swing is None:
+            if self.policy not in (always_swing, always_watch):
+                raise ValueError("Pass swing choices for this policy.")
+            swing = self.policy is always_swing
+        table = self.files.table
+        lineups = [[batter.row for batter in self.order],
+                   [batter.row for batter in self.visitors.order]]
+        pitchers = [self.field.bullpen[0], self.visitors.field.bullpen[0]]
+        thresholds = sampler.table_thresholds(table)
+        ball_odds = pitchers[0].ball_odds
+        if pitchers[0].table is not None or pitchers[1].table is not None \
+                or pitchers[1].ball_odds != ball_odds:
+            import numpy as np
+            # Each lineup faces its own starter: stack the two matchup
+            # tables and point the visitors at the second one.
+            thresholds = np.concatenate([sampler.table_thresholds(
+                table if pitcher.table is None else pitcher.table)
+                for pitcher in pitchers])
+            ball_odds = np.repeat([pitcher.ball_odds for pitcher in
+                                   pitchers], len(table))
+            lineups[1] = [row + len(table) for row in lineups[1]]
+            if np.ndim(swing) == 2:
+                swing = np.concatenate([swing, swing])
+        return batch.play_games(thresholds, lineups, [(0, 1)] * games,
+                                streams.as_generator(seed), self.innings,
+                                walk_off=False, extras=self.extras,
+                                swing=swing, ball_odds=ball_odds)
+
+    def replay(self, seed, game):
+        """
+        Plays one game of a seeded batch again, exactly as it went.
+
+        Parameters:
+            seed (int): Root seed the batch was simulated with.
+            game (int): Number of the game within the batch.
+
+        Returns:
+            (dict): The results of the game; see results().
+        """
+        return self.play_headless(streams.game_rng(seed, game))
 
     def play(self):
         """Function to play a full game."""
-        self.make_roster()
-        self.scoreboard.batting_order(self.lineup, self.field, self)
-        current_pitcher = self.field.bullpen[0]
-        self.scoreboard.pick_opponent(self)
+        steps = self.game()
+        result = None
+        # Answer each step's question at the terminal, by just calling it.
+        while True:
+            try:
+                method, args = steps.send(result)
+            except StopIteration:
+                return
+            result = method(*args)
+
+    def game(self):
+        """
+        Generator of the interactive game, from the roster to the box score.
+
+        Every step that may ask the player a question is yielded as a
+        (method, args) pair rather than called, and whoever drives the
+        game sends back what method(*args) returned. play() calls it
+        straight away; server.Session awaits the player's line first. Only
+        files, field, scoreboard, lineup, make_roster(), make_choice() and
+        help_quit() are used, so a stand-in for the Engine can run it too.
+
+        Yields:
+            (tuple): A function and a tuple of its arguments.
+        """
+        yield self.make_roster, ()
+        yield self.scoreboard.batting_order, (self.lineup, self.field, self)
+        yield self.scoreboard.pick_opponent, (self,)
+        self.field.sink.emit(Lineup(self.scoreboard.home,
+                                    [batter.name for batter in
+                                     self.field.dugout]))
         print("\nYou're all set, let's play!\n\n")
         # Checks length of game.
         while self.scoreboard.inning <= self.scoreboard.max:
@@ -715,6 +1514,7 @@ class Engine:
             while self.scoreboard.outs < 3:
                 # At the start of every new batter, print field.
                 self.field.print_field(self.field.bases, self.scoreboard)
+                current_pitcher = self.field.bullpen[0]
                 # Send a new batter to the plate.
                 atbat = AtBat(self.field.dugout[0], self.field)
                 print("\nBatter up! " + atbat.batter.name +
@@ -723,7 +1523,7 @@ class Engine:
                 while atbat.status == "Batting":
                     print(str(atbat.balls) + " balls, " + str(atbat.strikes) +
                           " strikes.\n")
-                    new_choice = self.make_choice()
+                    new_choice = yield self.make_choice, ()
                     if new_choice.lower() == 's':
                         atbat.swing()
                     elif new_choice.lower() == 'w':
@@ -733,14 +1533,22 @@ class Engine:
                               " Let's try again!")
                 atbat.outcome_machine(self.field, self.scoreboard)
             # Inning is over. Clear the bases for next inning and fix dugout.
-            print("\n" + '{:^80s}'.format("3 OUTS"))
+            self.field.sink.emit(InningEnd(self.scoreboard.inning,
+                                           self.scoreboard.runs,
+                                           self.scoreboard.opponentruns))
             self.field.clear_bases()
-            self.scoreboard.extra_innings(self)
+            yield self.scoreboard.extra_innings, (self,)
             self.scoreboard.inning += 1
         # Game is over.
+        self.field.sink.emit(GameOver(self.scoreboard.home,
+                                      self.scoreboard.opponent,
+                                      self.scoreboard.runs,
+                                      self.scoreboard.opponentruns,
+                                      self.scoreboard.inning - 1))
         print("\n" + '{:^80s}'.format("GAME OVER."))
         print(start + "\nFinal score: \n" + end + str(self.scoreboard))
         self.scoreboard.box_score(self.field.dugout)
 
-game = Engine()
-game.play()
+if __name__ == "__main__":
+    import play
+    play.main()
@@ -0,0 +1,262 @@
+"""
+Batched head-to-head games: both halves of every inning through one sampler.
+
+play_games() plays many games between real lineups at once with NumPy.
+Each step draws one whole at bat for every game still going, whether its
+away team is batting in the top of the inning or its home team in the
+bottom, with a single call to sampler.sample_at_bats(). The runners then
+move with the same rules as AtBat.outcome_machine(), for every game at
+once.
+
+Each team's dugout is kept as a ring buffer of batting order slots, so
+batters who score or are put out rejoin the end of the line exactly as
+they do in Field.dugout.
+"""
+import numpy as np
+
+import sampler
+from sampler import STRIKE_OUT, WALK, OUT_IN_PLAY, HOME_RUN, SINGLE, \
+    DOUBLE, TRIPLE
+
+# Columns of a batting line: at bats, hits and RBIs.
+LINE = ("atbats", "hits", "rbis")
+# Bases moved by each at bat status; a walk moves runners only if forced.
+BASES = np.zeros(len(sampler.STATUSES), dtype=np.int64)
+BASES[[WALK, SINGLE, DOUBLE, TRIPLE, HOME_RUN]] = (1, 1, 2, 3, 4)
+# Bases of the runner columns used by advance(): lead runner first.
+ORDER = np.array([3, 2, 1, 0])
+
+def advance(runners, value):
+    """
+    Moves every runner, and the batter, forward.
+
+    Parameters:
+        runners (array): Shape (games, 4), batting order slots on third,
+                         second, first and at the plate, or -1 if empty.
+        value (array): Bases to move in each game.
+
+    Returns:
+        bases (array): Shape (games, 3), slots on first, second and third.
+        scored (array): Shape (games, 4), slots that scored, lead runner
+                        first, or -1.
+    """
+    new = ORDER + value[:, None]
+    occupied = runners >= 0
+    home = occupied & (new >= 4)
+    scored = np.where(home, runners, -1)
+    bases = np.full((len(runners), 5), -1, dtype=np.int64)
+    row, column = np.nonzero(occupied & ~home)
+    bases[row, new[row, column]] = runners[row, column]
+    return bases[:, 1:4], scored
+
+class Games:
+    """
+    Class to hold the state of a batch of games between the steps.
+
+    Attributes:
+        teams (array): Team of each side.
+        size (array): Batters in each side's lineup.
+        rows (array): Shape (sides, 9), table row of each lineup slot.
+        queue (array): Shape (sides, 9), ring buffer of each dugout.
+        head (array): Position of the next batter in each queue.
+        tail (array): Position where the next runner rejoins each queue.
+        bases (array): Shape (sides, 3), slots on first, second, third.
+        runs (array): Runs of each side.
+        appearances (array): Plate appearances of each side.
+        lines (array): Shape (sides, 9, 3), batting line of every slot.
+    """
+
+    def __init__(self, lineups, teams):
+        """
+        Constructor for Games class.
+
+        Parameters:
+            lineups (lst): Table rows of each team's batting order.
+            teams (array): Team of each side, away then home per game.
+        """
+        sizes = np.array([len(lineup) for lineup in lineups])
+        rows = np.zeros((len(lineups), 9), dtype=np.int64)
+        for team, lineup in enumerate(lineups):
+            rows[team, :len(lineup)] = lineup
+        sides = len(teams)
+        self.teams = teams
+        self.size = sizes[teams]
+        self.rows = rows[teams]
+        self.queue = np.tile(np.arange(9), (sides, 1))
+        self.head = np.zeros(sides, dtype=np.int64)
+        self.tail = self.size.copy()
+        self.bases = np.full((sides, 3), -1, dtype=np.int64)
+        self.runs = np.zeros(sides, dtype=np.int64)
+        self.appearances = np.zeros(sides, dtype=np.int64)
+        self.lines = np.zeros((sides, 9, len(LINE)), dtype=np.int64)
+
+    def up(self, side):
+        """Takes the next batter off the front of each side's queue."""
+        slot = self.queue[side, self.head[side] % self.size[side]]
+        self.head[side] += 1
+        self.appearances[side] += 1
+        return slot
+
+    def rejoin(self, side, slots):
+        """
+        Puts players back at the end of their dugouts, in column order.
+
+        Parameters:
+            side (array): Side of each row; no side appears twice.
+            slots (array): Shape (rows, columns), slots to add, or -1.
+        """
+        for column in range(slots.shape[1]):
+            back = slots[:, column] >= 0
+            which = side[back]
+            self.queue[which, self.tail[which] % self.size[which]] = \
+                slots[back, column]
+            self.tail[which] += 1
+
+    def situation(self, side, outs):
+        """Returns (array) each side's outs * 8 + base mask, 0 to 23."""
+        occupied = self.bases[side] >= 0
+        return outs * 8 + occupied[:, 0] + 2 * occupied[:, 1] + \
+            4 * occupied[:, 2]
+
+    def clear_bases(self, side):
+        """Sends runners left on base back to the dugout, lead first."""
+        self.rejoin(side, self.bases[side][:, ::-1])
+        self.bases[side] = -1
+
+    def at_bats(self, side, batter, status, whos_out, outs):
+        """
+        Moves the runners after one at bat in each game, like
+        AtBat.outcome_machine().
+
+        Parameters:
+            side (array): Side batting in each game.
+            batter (array): Batting order slot of each batter, from up().
+            status (array): STATUSES code each at bat ended with.
+            whos_out (array): Random 0, 1 or 2 for each at bat, used on
+                              outs in play like AtBat's whos_out.
+            outs (array): Outs in each game, updated in place.
+        """
+        bases = self.bases[side]
+        runners = np.column_stack([bases[:, ::-1], batter])
+        new = bases.copy()
+        rejoin = np.full((len(side), 5), -1, dtype=np.int64)
+        rbis = np.zeros(len(side), dtype=np.int64)
+        strike_out = status == STRIKE_OUT
+        in_play = status == OUT_IN_PLAY
+        hit = status >= HOME_RUN
+        outs += strike_out | in_play
+        # Outs in play: the batter if alone or for the third out, else the
+        # runners advance (whos_out 2) or the lead runner is out.
+        alone = in_play & (((bases >= 0).sum(axis=1) == 0) | (outs == 3))
+        moved = in_play & ~alone & (whos_out > 1)
+        lead = in_play & ~alone & (whos_out < 2)
+        rejoin[strike_out | alone, 4] = batter[strike_out | alone]
+        if lead.any():
+            first = np.argmax(runners[lead, :3] >= 0, axis=1)
+            rejoin[lead, 0] = runners[lead, first]
+            runners[np.flatnonzero(lead), first] = -1
+        # Walks with first base empty put the batter on first only.
+        walk = status == WALK
+        empty = walk & (bases[:, 0] < 0)
+        new[empty, 0] = batter[empty]
+        # Everything else moves every runner the same number of bases.
+        forward = hit | walk & ~empty | moved | lead
+        value = np.where(in_play, 1, BASES[status])[forward]
+        moved_bases, scored = advance(runners[forward], value)
+        new[forward] = moved_bases
+        rejoin[forward, :4] = np.maximum(rejoin[forward, :4], scored)
+        runs = (scored >= 0).sum(axis=1)
+        self.runs[side[forward]] += runs
+        rbis[forward] = np.where(walk[forward], 0, runs)
+        # The batter is out at first after the runners advance.
+        new[moved, 0] = -1
+        rejoin[moved, 4] = batter[moved]
+        self.bases[side] = new
+        self.rejoin(side, rejoin)
+        self.lines[side, batter, 0] += status != WALK
+        self.lines[side, batter, 1] += hit
+        self.lines[side, batter, 2] += rbis
+
+def play_games(table, lineups, pairs, rng, innings=9, walk_off=True,
+               extras=True, swing=None, ball_odds=0.5):
+    """
+    Plays a batch of head-to-head games with every at bat drawn at once.
+
+    Parameters:
+        table (array): Swing thresholds from sampler.table_thresholds().
+        lineups (lst): Each team's batting order, as rows of the table
+                       (5 to 9 per team).
+        pairs (array): (home, away) index into lineups for each game.
+        rng (obj): numpy.random.Generator.
+        innings (int): Length of the games before extra innings.
+        walk_off (bool): True to skip or stop the bottom of the last
+                         inning once the home team is ahead, as in
+                         baseball; False to always play it, like Engine.
+        extras (bool): True to keep playing while tied.
+        swing (array): True to swing in each count, shape (12,) or (table
+                       rows, 12), or one bool; defaults to swinging. Shape
+                       (teams, 9, 3, 8, 12) gives each team's choices by
+                       lineup slot, outs and base mask, e.g. from
+                       strategy.plan().
+        ball_odds (float): Chance a watched pitch is a ball, or an array
+                           of one per table row.
+
+    Returns:
+        (dict): Arrays "runs" and "opponent_runs" for the home and away
+        teams, "innings" played, "plate_appearances" by both teams, and
+        "lines" of shape (games, 2, 9, 3) with each slot's at bats, hits
+        and RBIs, home team first.
+    """
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    games = len(pairs)
+    if swing is not None and np.ndim(swing) == 0:
+        swing = np.full(sampler.COUNTS, bool(swing))
+    situations = swing is not None and np.ndim(swing) == 5
+    if situations:
+        swing = np.asarray(swing, dtype=bool).reshape(-1, sampler.COUNTS)
+    plan = None
+    # Side 2 * game is the away team and 2 * game + 1 the home team.
+    state = Games(lineups, pairs[:, ::-1].ravel())
+    outs = np.zeros(games, dtype=np.int64)
+    inning = np.ones(games, dtype=np.int64)
+    half = np.zeros(games, dtype=np.int64)
+    live = np.arange(games)
+    while len(live):
+        side = 2 * live + half[live]
+        batter = state.up(side)
+        if situations:
+            plan = (state.teams[side] * 9 + batter) * 24 + \
+                state.situation(side, outs[live])
+        status = sampler.sample_at_bats(table, state.rows[side, batter],
+                                        rng, swing, ball_odds, plan)[0]
+        whos_out = rng.integers(0, 3, len(live))
+        now = outs[live]
+        state.at_bats(side, batter, status, whos_out, now)
+        outs[live] = now
+        home, away = state.runs[2 * live + 1], state.runs[2 * live]
+        last = inning[live] >= innings
+        done = np.zeros(len(live), dtype=bool)
+        if walk_off:
+            done = last & (half[live] == 1) & (home > away)
+        over = (now == 3) & ~done
+        if over.any():
+            ended = live[over]
+            state.clear_bases(side[over])
+            outs[ended] = 0
+            top = half[ended] == 0
+            tied = home[over] == away[over]
+            if walk_off:
+                finished = np.where(top, home[over] > away[over], ~tied)
+            else:
+                finished = ~top & ~tied
+            finished &= last[over]
+            if not extras:
+                finished |= ~top & last[over]
+            done[over] = finished
+            inning[ended] += ~top & ~finished
+            half[ended] = np.where(finished, half[ended], 1 - half[ended])
+        live = live[~done]
+    return {"runs" : state.runs[1::2], "opponent_runs" : state.runs[0::2],
+            "innings" : inning,
+            "plate_appearances" : state.appearances.reshape(games, 2).sum(1),
+            "lines" : state.lines.reshape(games, 2, 9, len(LINE))[:, ::-1]}
@@ -0,0 +1,429 @@
+"""
+Benchmark suite for the simulation hot paths.
+
+Every benchmark runs headless with fixed seeds, on a synthetic league of
+made-up batters and, when it is present, on the real workbook too. Rates
+are the best of a few repeats:
+    swing            AtBat.swing() calls per second (pitches/s)
+    plate_appearance whole at bats with AtBat.outcome_machine() (PA/s)
+    advance_runners  Field.advance_runners() calls per second
+    make_roster      Engine.make_roster() team look ups per second
+    game             full headless games per second, Field and BitField
+    batch_game       head-to-head games per second with batch.play_games()
+    startup          seconds to import the game and load the roster in a
+                     fresh interpreter (cold_startup: with no roster cache)
+    import           seconds to import the game's classes alone
+    game_fast        full headless games per second with fastloop.FastGame
+    peak_memory      KiB allocated at the peak of a batch of games
+    pitch_allocation bytes allocated per pitch by the game loop, Engine and
+                     FastGame (measured with tracemalloc between pitches)
+
+Results can be saved as JSON and compared with an earlier run; any
+benchmark that got worse by more than the threshold is reported as a
+regression, and the exit status is 1.
+
+Example:
+    python benchmark.py --output new.json --compare old.json --threshold 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import batch
+import sampler
+from fastloop import FastGame
+from Smith_BaseballSim import AtBat, BitField, Engine, Field, Files, \
+    Scoreboard, always_swing
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKBOOK = os.path.join(HERE, "Baseball simulator.xlsx")
+# Average odds of the real batters, used to make synthetic ones.
+AVERAGE = {"1B%" : 0.148, "2B%" : 0.041, "3B%" : 0.004, "HR%" : 0.020,
+           "BB%" : 0.070, "K%" : 0.224, "HBP%" : 0.009, "OIP%" : 0.485}
+SEED = 2015
+
+def synthetic_roster(folder, teams=30, players=15, seed=SEED):
+    """
+    Writes a made-up league of batters as a .csv file Files can load.
+
+    Parameters:
+        folder (str): Folder to write the file in.
+        teams (int): Number of teams.
+        players (int): Batters per team.
+        seed (int): Seed for the batters' odds.
+
+    Returns:
+        (str): Path of the .csv file.
+    """
+    rng = np.random.default_rng(seed)
+    keys = list(AVERAGE)
+    rows = ["Name,Age,Team,PA,BABIP," + ",".join(keys)]
+    for team in range(teams):
+        for player in range(players):
+            odds = np.array([AVERAGE[key] for key in keys]) * \
+                rng.lognormal(0.0, 0.25, len(keys))
+            odds /= odds.sum()
+            rows.append("Player {} {},{},Team {},{},0.3,".format(
+                team, player, rng.integers(20, 40), team,
+                rng.integers(50, 700)) +
+                ",".join("{:.4f}".format(value) for value in odds))
+    path = os.path.join(folder, "synthetic.csv")
+    with open(path, "w") as file:
+        file.write("\n".join(rows) + "\n")
+    return path
+
+def load_files(path):
+    """Returns (obj) Files for a roster, with the text files found here."""
+    return Files(path, os.path.join(HERE, "instructions.txt"),
+                 os.path.join(HERE, "help.txt"))
+
+def best_rate(run, repeat):
+    """
+    Times a benchmark a few times and keeps the fastest run.
+
+    Parameters:
+        run (func): Does the work and returns (int) operations done.
+        repeat (int): Number of runs.
+
+    Returns:
+        (float): Operations per second of the fastest run.
+    """
+    best = 0.0
+    for number in range(repeat):
+        begin = time.perf_counter()
+        operations = run()
+        seconds = time.perf_counter() - begin
+        best = max(best, operations / seconds)
+    return best
+
+def new_field(files, team, field_type=Field):
+    """Returns (tup) a seeded Field and Scoreboard with a team's batters."""
+    field = field_type(verbose=False, rng=SEED)
+    field.dugout = files.team_roster(team)[:9]
+    scoreboard = Scoreboard(None, 9)
+    scoreboard.rng = field.rng
+    return field, scoreboard
+
+def bench_swing(files, team, size):
+    """Returns (int) swings taken by one batter, resetting the count."""
+    field = new_field(files, team)[0]
+    atbat = AtBat(field.dugout[0], field)
+    for number in range(size):
+        atbat.status = "Batting"
+        atbat.strikes = 0
+        atbat.swing()
+    return size
+
+def bench_plate_appearance(files, team, size):
+    """Returns (int) whole at bats played, clearing the bases at 3 outs."""
+    field, scoreboard = new_field(files, team)
+    for number in range(size):
+        atbat = AtBat(field.dugout[0], field)
+        while atbat.status == "Batting":
+            atbat.swing()
+        atbat.outcome_machine(field, scoreboard)
+        if scoreboard.outs == 3:
+            field.clear_bases()
+            scoreboard.outs = 0
+    return size
+
+def bench_advance_runners(files, team, size):
+    """Returns (int) runner advances of 1 to 4 bases, one batter each."""
+    field, scoreboard = new_field(files, team)
+    for number in range(size):
+        batter = field.dugout[0]
+        field.step_up(batter)
+        field.advance_runners(number % 4 + 1, scoreboard, batter)
+    return size
+
+def bench_make_roster(files, team, size):
+    """Returns (int) rosters made, answering the prompt with the team."""
+    engine = Engine(team=team, policy=always_swing, files=files)
+    engine.help_quit = lambda question: team
+    bullpen = engine.field.bullpen
+    for number in range(size):
+        # Each roster brings a Pitcher into the bullpen; start it empty so
+        # the list doesn't grow with the run.
+        bullpen.clear()
+        engine.make_roster()
+    return size
+
+def bench_game(files, team, size, field_type=Field):
+    """Returns (int) headless games played on a seeded stream."""
+    engine = Engine(team=team, policy=always_swing, files=files,
+                    field_type=field_type)
+    engine.simulate(size, seed=SEED)
+    return size
+
+def bench_fast_game(files, team, size):
+    """Returns (int) headless games played with fastloop.FastGame."""
+    engine = Engine(team=team, policy=always_swing, files=files)
+    FastGame(engine).simulate(size, seed=SEED)
+    return size
+
+def bench_batch_game(files, team, size):
+    """Returns (int) head-to-head games played with batch.play_games()."""
+    engine = Engine(team=team, policy=always_swing, files=files,
+                    opponent_team=team)
+    engine.simulate_batch(size, seed=SEED)
+    return size
+
+def startup(path, cold=False):
+    """
+    Times importing the game and loading a roster in a new interpreter.
+
+    Parameters:
+        path (str): Roster file to load.
+        cold (bool): True to delete the roster's cache first.
+
+    Returns:
+        (float): Seconds taken.
+    """
+    if cold:
+        shutil.rmtree(os.path.join(os.path.dirname(path), ".roster_cache"),
+                      ignore_errors=True)
+    code = ("import time; begin = time.perf_counter(); "
+            "import Smith_BaseballSim as game; game.Files({!r}); "
+            "print(time.perf_counter() - begin)").format(path)
+    output = subprocess.run([sys.executable, "-c", code], cwd=HERE,
+                            capture_output=True, text=True, check=True)
+    return float(output.stdout.split()[-1])
+
+def import_time():
+    """Returns (float) seconds to import the game in a new interpreter."""
+    code = ("import time; begin = time.perf_counter(); "
+            "import Smith_BaseballSim; print(time.perf_counter() - begin)")
+    output = subprocess.run([sys.executable, "-c", code], cwd=HERE,
+                            capture_output=True, text=True, check=True)
+    return float(output.stdout.split()[-1])
+
+def peak_memory(files, team, games):
+    """Returns (float) KiB allocated at the peak of a batch of games."""
+    engine = Engine(team=team, policy=always_swing, files=files)
+    tracemalloc.start()
+    engine.simulate(games, seed=SEED)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+class AllocationMeter:
+    """
+    Swing/watch policy that measures what the game allocates between
+    pitches.
+
+    Every call reads the tracemalloc peak since the last call, less the
+    level then, and takes off the same reading for the meter alone (the
+    numbers tracemalloc returns are allocated too).
+
+    Attributes:
+        policy (func): Policy that makes the choices.
+        level (int): Traced bytes after the last reading.
+        bytes (float): Bytes allocated between pitches so far.
+        pitches (float): Pitches measured so far.
+    """
+
+    def __init__(self, policy):
+        """Constructor for AllocationMeter class."""
+        self.policy = policy
+        self.level = 0
+        self.bytes = 0.0
+        self.pitches = 0.0
+
+    def sample(self):
+        """Returns (int) the peak since the last sample, less the level."""
+        peak = tracemalloc.get_traced_memory()[1]
+        allocated = peak - self.level
+        tracemalloc.reset_peak()
+        self.level = tracemalloc.get_traced_memory()[0]
+        return allocated
+
+    def __call__(self, atbat, field, scoreboard):
+        """Measures the pitch just played, then asks the policy."""
+        allocated = self.sample()
+        self.bytes += allocated - self.sample()
+        self.pitches += 1.0
+        return self.policy(atbat, field, scoreboard)
+
+def pitch_allocation(files, team, innings, fast=False):
+    """
+    Returns (float) bytes allocated per pitch in headless half innings.
+
+    The game draws from a random.Random, so the block refills of a seeded
+    stream (see streams.py) are not counted against the game loop.
+    """
+    meter = AllocationMeter(always_swing)
+    engine = Engine(team=team, policy=meter, files=files,
+                    rng=random.Random(SEED))
+    game = FastGame(engine) if fast else engine
+    clear = game.clear_bases if fast else engine.field.clear_bases
+    # One game first, so nothing is measured the first time it is made.
+    game.play() if fast else engine.play_headless()
+    tracemalloc.start()
+    meter.sample()
+    meter.bytes = meter.pitches = 0.0
+    for number in range(innings):
+        game.half_inning()
+        clear()
+        engine.scoreboard.runs = 0
+    tracemalloc.stop()
+    return meter.bytes / meter.pitches
+
+def run_suite(path, label, scale=1.0, repeat=3, cold=False):
+    """
+    Runs every benchmark on one roster.
+
+    Parameters:
+        path (str): Roster file.
+        label (str): Prefix for the result names, e.g. "synthetic".
+        scale (float): Multiplies the amount of work in each benchmark.
+        repeat (int): Runs of each timed benchmark.
+        cold (bool): True to also time a start with no roster cache.
+
+    Returns:
+        (dict): Result name to {"value", "unit", "higher_is_better"}.
+    """
+    random.seed(SEED)
+    files = load_files(path)
+    team = max(files.teams, key=lambda name: len(files.team_roster(name)))
+    size = lambda amount: max(1, int(amount * scale))
+    rates = [
+        ("swing", "pitches/s", lambda: bench_swing(files, team,
+                                                   size(200000))),
+        ("plate_appearance", "PA/s",
+         lambda: bench_plate_appearance(files, team, size(50000))),
+        ("advance_runners", "calls/s",
+         lambda: bench_advance_runners(files, team, size(100000))),
+        ("make_roster", "rosters/s",
+         lambda: bench_make_roster(files, team, size(2000))),
+        ("game", "games/s", lambda: bench_game(files, team, size(1000))),
+        ("game_bitfield", "games/s",
+         lambda: bench_game(files, team, size(1000), BitField)),
+        ("game_fast", "games/s",
+         lambda: bench_fast_game(files, team, size(1000))),
+        ("batch_game", "games/s",
+         lambda: bench_batch_game(files, team, size(20000)))
+    ]
+    results = {}
+    for name, unit, run in rates:
+        results[label + "." + name] = {"value" : best_rate(run, repeat),
+                                       "unit" : unit,
+                                       "higher_is_better" : True}
+    results[label + ".startup"] = {"value" : min(startup(path) for number
+                                                 in range(repeat)),
+                                   "unit" : "s", "higher_is_better" : False}
+    if cold:
+        results[label + ".cold_startup"] = {"value" : startup(path, True),
+                                            "unit" : "s",
+                                            "higher_is_better" : False}
+    results[label + ".peak_memory"] = {
+        "value" : peak_memory(files, team, size(200)), "unit" : "KiB",
+        "higher_is_better" : False}
+    for name, fast in (("pitch_allocation", False),
+                       ("pitch_allocation_fast", True)):
+        results[label + "." + name] = {
+            "value" : pitch_allocation(files, team, size(2000), fast),
+            "unit" : "B/pitch", "higher_is_better" : False}
+    return results
+
+def environment():
+    """Returns (dict) the Python, NumPy, machine and commit of the run."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                cwd=HERE, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"python" : platform.python_version(), "numpy" : np.__version__,
+            "machine" : platform.platform(), "cpus" : os.cpu_count(),
+            "commit" : commit, "time" : time.strftime("%Y-%m-%d %H:%M:%S")}
+
+def compare(old, new, threshold=0.1):
+    """
+    Compares two sets of results.
+
+    Parameters:
+        old (dict): "results" of the earlier run.
+        new (dict): "results" of this run.
+        threshold (float): Fraction a benchmark may get worse by.
+
+    Returns:
+        (lst): (name, old value, new value, change) for each benchmark in
+        both runs, where change is the fraction it got better (negative
+        if worse), and (lst) the names of the regressions.
+    """
+    rows = []
+    regressions = []
+    for name in new:
+        if name not in old or not old[name]["value"]:
+            continue
+        before, after = old[name]["value"], new[name]["value"]
+        change = (after - before) / before
+        if not new[name]["higher_is_better"]:
+            change = -change
+        rows.append((name, before, after, change))
+        if change < -threshold:
+            regressions.append(name)
+    return rows, regressions
+
+def main():
+    """Command line entry point; runs the suite and prints the results."""
+    parser = argparse.ArgumentParser(description="Benchmark the " +
+                                     "simulation hot paths.")
+    parser.add_argument("--roster", choices=("synthetic", "real", "both"),
+                        default="both")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply the work in each benchmark.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Save the results as JSON.")
+    parser.add_argument("--compare", help="Earlier results to compare to.")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Allowed slowdown before it is a regression.")
+    args = parser.parse_args()
+
+    results = {"import" : {"value" : min(import_time() for number in
+                                         range(args.repeat)),
+                           "unit" : "s", "higher_is_better" : False}}
+    if args.roster in ("synthetic", "both"):
+        folder = tempfile.mkdtemp()
+        try:
+            results.update(run_suite(synthetic_roster(folder), "synthetic",
+                                     args.scale, args.repeat, cold=True))
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    if args.roster in ("real", "both"):
+        if os.path.exists(WORKBOOK):
+            results.update(run_suite(WORKBOOK, "real", args.scale,
+                                     args.repeat))
+        else:
+            print("No workbook at " + WORKBOOK + "; skipping real roster.")
+    for name, result in results.items():
+        print('{:<34s}{:>16,.3f} {}'.format(name, result["value"],
+                                             result["unit"]))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"environment" : environment(), "results" : results},
+                      file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            old = json.load(file)["results"]
+        rows, regressions = compare(old, results, args.threshold)
+        print("\nCompared with " + args.compare + ":")
+        for name, before, after, change in rows:
+            flag = "  REGRESSION" if name in regressions else ""
+            print('{:<34s}{:>14,.3f}{:>14,.3f}{:>+9.1%}{}'.format(
+                  name, before, after, change, flag))
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Play-by-play events and the sinks that receive them.
+
+The game describes every change of state as a small event instead of
+printing it. Where the events go is up to the sink the Field was given:
+    TerminalSink prints the same commentary the game always has.
+    NullSink drops everything; it is inactive, so the game does not even
+        build the events.
+    JsonlSink writes one JSON object per event to a file, in large
+        buffered blocks.
+
+Any object with an `active` attribute and an emit(event) method can be a
+sink. A sink that also has an opponent() method is asked for a second
+sink for a real opponent's half innings (see gamelog.GameLogSink); other
+sinks only hear about the engine's own team.
+"""
+import json
+import random
+from collections import namedtuple
+
+# To bold text in certain print statements.
+start = "\033[1m"
+end = "\033[0;0m"
+
+# A pitch. action is 's' or 'w'; result is "Strike", "Ball" or "In play";
+# balls and strikes are the count after the pitch.
+Pitch = namedtuple("Pitch", "batter action result balls strikes")
+# The end of an at bat. status is the AtBat status; play says how the
+# runners moved: "forced" or "empty first" for walks, and "batter",
+# "runners advance" or "lead runner" for outs in play.
+Outcome = namedtuple("Outcome", "batter status play outs")
+# A runner crossing home plate. runs is the team's new total.
+RunScored = namedtuple("RunScored", "runner batter rbi runs")
+# The field at the start of an at bat: names on each base or None.
+FieldShown = namedtuple("FieldShown",
+                        "inning outs first second third up_next")
+# A team's batting order as a game starts: its name and the batters' names.
+Lineup = namedtuple("Lineup", "team batters")
+# Three outs. runs and opponent_runs are the score after the inning.
+InningEnd = namedtuple("InningEnd", "inning runs opponent_runs")
+# The final score of a game and the number of innings played.
+GameOver = namedtuple("GameOver", "home opponent runs opponent_runs innings")
+
+class NullSink:
+    """Sink that throws every event away at no cost."""
+    active = False
+
+    def emit(self, event):
+        """Ignores an event."""
+        pass
+
+    def close(self):
+        """Nothing to close."""
+        pass
+
+NULL_SINK = NullSink()
+
+class TerminalSink:
+    """
+    Sink that prints the game's commentary to the terminal.
+
+    Attributes:
+        rng (obj): Source of random choices between phrases.
+    """
+    active = True
+
+    def __init__(self, rng=random):
+        """
+        Constructor for TerminalSink class.
+
+        Parameters:
+            rng (obj): Object with a choice() method for picking phrases;
+                       the random module by default.
+        """
+        self.rng = rng
+        self.show = {Pitch : self.pitch, Outcome : self.outcome,
+                     RunScored : self.run_scored,
+                     FieldShown : self.field_shown,
+                     InningEnd : self.inning_end,
+                     GameOver : self.game_over, Lineup : self.lineup}
+
+    def emit(self, event):
+        """Prints an event."""
+        self.show[type(event)](event)
+
+    def close(self):
+        """Nothing to close."""
+        pass
+
+    def pitch(self, event):
+        """Prints the call on a pitch the batter did not put in play."""
+        if event.result == "In play":
+            return
+        if event.action == 's':
+            prints = ["Whiff! That's a strike.", "A swing and a miss. Strike!"]
+        elif event.result == "Ball":
+            prints = ["Good eye! It was a ball.", "Ball! Good job.",
+                      "Way to hold - ball!"]
+        else:
+            prints = ["Strike!", "Darn, you watched a perfect strike!",
+                      "Right down the middle - strike!"]
+        print(self.rng.choice(prints))
+
+    def outcome(self, event):
+        """Prints how an at bat ended."""
+        name = event.batter
+        if event.status == "Strike out":
+            print("\nThat's 3. " + name + " strikes out.")
+        elif event.status == "Walk":
+            if event.play == "empty first":
+                print("\nThat's 4 balls. " + name +
+                      " takes the empty spot at first base.")
+            else:
+                print("\nThat's 4 balls - take a walk.")
+        elif event.status == "Single":
+            print(name + " gets a single through the infield!")
+        elif event.status == "Double":
+            print(name + " finds a gap and hits a double!")
+        elif event.status == "Triple":
+            print(name + " hits it to the fence for a triple!")
+        elif event.status == "Home run":
+            print(name + " sends it out of the park! HOME RUN!")
+        elif event.play == "batter":
+            print(name + " hits into an out at first.")
+        elif event.play == "runners advance":
+            print(name + " hits into an out at first, but the runners" +
+                  " advance.")
+        else:
+            print(name + " hits into a play, and the lead runner is out.")
+
+    def run_scored(self, event):
+        """Prints a runner scoring."""
+        print(".\n.\n.\n" + event.runner + " scores!")
+
+    def inning_end(self, event):
+        """Prints the end of an inning."""
+        print("\n" + '{:^80s}'.format("3 OUTS"))
+
+    def game_over(self, event):
+        """Prints nothing; the Engine prints the final score itself."""
+        pass
+
+    def lineup(self, event):
+        """Prints nothing; the batting order was just picked."""
+        pass
+
+    def field_shown(self, event):
+        """Prints a picture of the bases, inning and outs."""
+        first, second, third = event.first, event.second, event.third
+        # Print the top border, inning number and outs above the field.
+        print("_" * 80)
+        print(start + "\nInning: " + end + str(event.inning))
+        print(start + "Outs: " + end + str(event.outs) + "\n")
+        # The field is printed in 9 rows.
+        for r in range(0, 9):
+            # The first row holds 2nd base.
+            if r == 0:
+                # If someone is on second, print row with their name.
+                if second is not None:
+                    print('{:^80s}'.format(start + "2nd: " + end + second))
+                # Otherwise, print 2nd as empty.
+                else:
+                    print('{:^80s}'.format(start + "2nd: " + end))
+            # Row holding 3rd and 1st base.
+            elif r == 4:
+                if third is not None and first is not None:
+                    print('{:<72s}'.format(start + "3rd: " + end + third)\
+                         + '{:>0s}'.format(start + "1st: " + end + first))
+                elif third is not None:
+                    print('{:<80s}'.format(start + "3rd: " + end + third)\
+                         + '{:>0s}'.format(start + "1st: " + end))
+                elif first is not None:
+                    print('{:<72s}'.format(start + "3rd: " + end) + '{:>0s}'.\
+                          format(start + "1st: " + end + first))
+                else:
+                    print('{:<80s}'.format(start + "3rd: " + end) + '{:>0s}'.\
+                          format(start + "1st: " + end))
+            # Home plate row.
+            elif r == 8:
+                print('{:^80s}'.format(start + "Up next: " + end +
+                                       event.up_next))
+            # Other rows are blank for spacing.
+            else:
+                print()
+        print("_" * 80)
+
+class JsonlSink:
+    """
+    Sink that writes each event as a line of JSON, in buffered blocks.
+
+    Attributes:
+        file (obj): Open text file the lines are written to.
+        buffer (lst): Lines waiting to be written.
+        block (int): Number of lines to collect before writing.
+        game (int): Game number added to every line; counts up after
+                    each GameOver, and the caller may set it.
+    """
+    active = True
+
+    def __init__(self, path, block=65536):
+        """
+        Constructor for JsonlSink class.
+
+        Parameters:
+            path (str): File to write; appended to if it exists.
+            block (int): Number of events to collect before each write.
+        """
+        self.file = open(path, "a", buffering=1 << 20)
+        self.buffer = []
+        self.block = block
+        self.game = 0
+        self.encode = json.JSONEncoder(separators=(",", ":")).encode
+
+    def emit(self, event):
+        """Adds an event to the buffer, writing the buffer when full."""
+        line = dict(event._asdict(), event=type(event).__name__,
+                    game=self.game)
+        self.buffer.append(self.encode(line))
+        if type(event) is GameOver:
+            self.game += 1
+        if len(self.buffer) >= self.block:
+            self.flush()
+
+    def flush(self):
+        """Writes every buffered line to the file."""
+        if self.buffer:
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.buffer = []
+
+    def close(self):
+        """Writes what is left and closes the file."""
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        """Returns the sink for use in a with block."""
+        return self
+
+    def __exit__(self, *args):
+        """Closes the sink at the end of a with block."""
+        self.close()
@@ -0,0 +1,366 @@
+"""
+Allocation-free game loop for headless engines.
+
+Engine.play_headless() makes a new AtBat for every plate appearance, and
+Field moves Batter objects in and out of a dugout list, with a linear
+remove() every time a batter steps up. FastGame plays the same games on
+state it makes once:
+    dugout     a ring buffer of batting order slots, as in batch.py, so a
+               batter steps up and rejoins the line in constant time
+    at bat     one PlateState, reset for every plate appearance
+    stats      at bats, hits and RBIs in lists indexed by slot, copied to
+               the Batter objects when the game ends
+    runners    slots on the bases, moved with BitField's base mask table
+so a pitch allocates nothing. It draws the same random numbers in the
+same order as the Engine does, so every game has exactly the same result:
+    FastGame(engine).simulate(1000, seed=42) == engine.simulate(1000, seed=42)
+
+Policies are called as before, policy(atbat, field, scoreboard): atbat is
+the PlateState (batter, balls, strikes), field is the FastGame (mask,
+bases, dugout, bullpen, change_pitcher()) and scoreboard is the engine's.
+Games with an active play-by-play sink are left to the Engine.
+
+Example:
+    engine = Engine(team="Red Sox", policy=always_swing, files=files)
+    results = FastGame(engine).simulate(100000, seed=7)
+"""
+import streams
+from Smith_BaseballSim import BitField, change_pitcher
+
+# Ways a plate appearance ends, and the AtBat status for each.
+STRIKE_OUT, WALK, OUT_IN_PLAY, HOME_RUN, SINGLE, DOUBLE, TRIPLE = range(7)
+STATUSES = ("Strike out", "Walk", "Out in play", "Home run", "Single",
+            "Double", "Triple")
+# Bases moved on each hit.
+BASES = (0, 0, 0, 4, 1, 2, 3)
+
+class PlateState:
+    """
+    Class for the at bat a FastGame reuses for every plate appearance;
+    policies read it like an AtBat.
+
+    Attributes:
+        batter (obj): The Batter at the plate.
+        status (str): "Batting" while the at bat is in progress, then how
+                      it ended.
+        balls (int): Pitch count, balls.
+        strikes (int): Pitch count, strikes.
+        rng (obj): Random number source of the game.
+    """
+    __slots__ = ("batter", "status", "balls", "strikes", "rng")
+
+    def __init__(self, rng):
+        """Constructor for PlateState class; no one is at the plate."""
+        self.batter = None
+        self.status = "Batting"
+        self.balls = 0
+        self.strikes = 0
+        self.rng = rng
+
+    def reset(self, batter):
+        """Starts a new at bat for a batter."""
+        self.batter = batter
+        self.status = "Batting"
+        self.balls = 0
+        self.strikes = 0
+
+
+class FastGame:
+    """
+    Class to play a headless Engine's games without making objects.
+
+    Attributes:
+        engine (obj): Headless Engine whose team, policy, scoreboard and
+                      random stream are used.
+        visitors (obj): FastGame of the engine's real opponent, or None.
+        order (lst): Batter objects in batting order.
+        size (int): Batters in the order.
+        queue (lst): Ring buffer of the slots in the dugout.
+        head (int): Index in queue of the next batter up.
+        tail (int): Index in queue where the next batter back goes.
+        slots (lst): Slot at the plate, then on 1st to 3rd, or -1.
+        mask (int): Occupied bases: 1 for first, 2 second, 4 third.
+        atbats (lst): At bats of each slot this game.
+        hits (lst): Hits of each slot this game.
+        rbis (lst): RBIs of each slot this game.
+        state (obj): The PlateState.
+        bullpen (lst): The engine's bullpen; the first one is pitching.
+        sink (obj): The engine's play-by-play sink.
+        rng (obj): Random number source of the game.
+    """
+    ADVANCE = BitField.ADVANCE
+    LEAD = BitField.LEAD
+    RUNNERS = BitField.RUNNERS
+
+    def __init__(self, engine):
+        """
+        Constructor for FastGame class.
+
+        Parameters:
+            engine (obj): Headless Engine (made with a policy).
+
+        Raises:
+            ValueError: If the engine plays the interactive game.
+        """
+        if engine.policy is None:
+            raise ValueError("FastGame needs a headless Engine; pass a " +
+                             "policy.")
+        self.engine = engine
+        self.visitors = None if engine.visitors is None else \
+            FastGame(engine.visitors)
+        self.order = engine.order
+        self.size = len(self.order)
+        self.queue = list(range(self.size))
+        self.head = 0
+        self.tail = 0
+        self.slots = [-1, -1, -1, -1]
+        self.mask = 0
+        self.atbats = [0] * self.size
+        self.hits = [0] * self.size
+        self.rbis = [0] * self.size
+        self.bullpen = engine.field.bullpen
+        self.sink = engine.field.sink
+        self.rng = engine.field.rng
+        self.state = PlateState(self.rng)
+
+    def __repr__(self):
+        """Returns (str) the team and batters on the field."""
+        return ("{FastGame: " + str(self.engine.scoreboard.home) + ", " +
+                str(self.RUNNERS[self.mask]) + " on base}")
+
+    @property
+    def bases(self):
+        """Returns (dict) runner to base, lead runner first, like Field."""
+        return {self.order[self.slots[base]] : base for base in (3, 2, 1, 0)
+                if self.slots[base] >= 0}
+
+    @property
+    def dugout(self):
+        """Returns (lst) the Batter objects in the dugout, next up first."""
+        waiting = self.size - self.RUNNERS[self.mask] - (self.slots[0] >= 0)
+        return [self.order[self.queue[(self.head + number) % self.size]]
+                for number in range(waiting)]
+
+    def change_pitcher(self, pitcher):
+        """Puts a pitcher on the mound for the next batter; see Field."""
+        change_pitcher(self.bullpen, pitcher)
+
+    def reset(self):
+        """Function to clear the field and stats for a new game."""
+        self.queue[:] = range(self.size)
+        self.head = self.tail = 0
+        self.slots[:] = (-1, -1, -1, -1)
+        self.mask = 0
+        for number in range(self.size):
+            self.atbats[number] = self.hits[number] = self.rbis[number] = 0
+        # Engine.set_rng() swaps the stream between games.
+        self.rng = self.state.rng = self.engine.field.rng
+        if self.visitors is not None:
+            self.visitors.reset()
+
+    def to_dugout(self, base):
+        """Sends the player on a base (0 for the batter) to the dugout."""
+        self.queue[self.tail] = self.slots[base]
+        self.tail = (self.tail + 1) % self.size
+        self.slots[base] = -1
+        if base:
+            self.mask &= ~(1 << (base - 1))
+
+    def advance(self, value, batter, rbi):
+        """
+        Moves every runner, and the batter, forward.
+
+        Parameters:
+            value (int): Number of bases everyone needs to move.
+            batter (int): Slot of the batter who triggered the movement.
+            rbi (bool): True if runs that score are the batter's RBIs.
+        """
+        slots = self.slots
+        scoreboard = self.engine.scoreboard
+        state = self.mask | (8 if slots[0] >= 0 else 0)
+        self.mask, moves = self.ADVANCE[state][value]
+        # Lead runner first, so each runner's new base is already empty.
+        # Indexed rather than iterated, so no iterator object is made.
+        number = 0
+        while number < len(moves):
+            old, new = moves[number]
+            number += 1
+            runner = slots[old]
+            slots[old] = -1
+            if new == 4:
+                scoreboard.runs += 1
+                if rbi:
+                    self.rbis[batter] += 1
+                self.queue[self.tail] = runner
+                self.tail = (self.tail + 1) % self.size
+            else:
+                slots[new] = runner
+
+    def clear_bases(self):
+        """Function to send all runners back to the dugout, lead first."""
+        base = 3
+        while base >= 0:
+            if self.slots[base] >= 0:
+                self.to_dugout(base)
+            base -= 1
+
+    def half_inning(self, lead=None):
+        """
+        Function to play the team's half of an inning, like
+        Engine.half_inning(). The runners are left on base for the caller
+        to clear.
+
+        Parameters:
+            lead (int): Runs the other team has. If given, the half ends as
+                        soon as this team goes ahead, like a walk-off.
+        """
+        scoreboard = self.engine.scoreboard
+        policy = self.engine.policy
+        state = self.state
+        order = self.order
+        queue = self.queue
+        slots = self.slots
+        bullpen = self.bullpen
+        rng = self.rng
+        scoreboard.outs = 0
+        while scoreboard.outs < 3:
+            # The next batter steps up from the front of the dugout.
+            slot = queue[self.head]
+            self.head = (self.head + 1) % self.size
+            slots[0] = slot
+            batter = order[slot]
+            state.reset(batter)
+            # Read each time, so a pitching change takes the next batter.
+            pitcher = bullpen[0] if bullpen else None
+            cuts = None if pitcher is None else pitcher.cuts
+            swing, strike, out, homer, single, double = \
+                batter.cuts if cuts is None else cuts[batter.row]
+            # Same draws as AtBat.swing() and Pitcher.throw_pitch().
+            result = -1
+            while result < 0:
+                if policy(state, self, scoreboard) == 's':
+                    x = rng.uniform(0, swing)
+                    if x <= strike:
+                        state.strikes += 1
+                        if state.strikes >= 3:
+                            result = STRIKE_OUT
+                    elif x <= out:
+                        result = OUT_IN_PLAY
+                    elif x <= homer:
+                        result = HOME_RUN
+                    elif x <= single:
+                        result = SINGLE
+                    elif x <= double:
+                        result = DOUBLE
+                    else:
+                        result = TRIPLE
+                else:
+                    ball_odds = pitcher.ball_odds
+                    if ball_odds == 0.5:
+                        ball = rng.randrange(0,2) == 0
+                    else:
+                        ball = rng.random() < ball_odds
+                    if ball:
+                        state.balls += 1
+                    else:
+                        state.strikes += 1
+                    if state.strikes >= 3:
+                        result = STRIKE_OUT
+                    elif state.balls >= 4:
+                        result = WALK
+            state.status = STATUSES[result]
+            # The rules of AtBat.outcome_machine().
+            if result == STRIKE_OUT:
+                self.atbats[slot] += 1
+                scoreboard.outs += 1
+                self.to_dugout(0)
+            elif result == WALK:
+                if not self.mask & 1:
+                    slots[1] = slot
+                    slots[0] = -1
+                    self.mask |= 1
+                else:
+                    self.advance(1, slot, False)
+            elif result == OUT_IN_PLAY:
+                self.atbats[slot] += 1
+                scoreboard.outs += 1
+                whos_out = rng.randrange(0,3)
+                if not self.mask or scoreboard.outs == 3:
+                    self.to_dugout(0)
+                elif whos_out > 1:
+                    self.advance(1, slot, True)
+                    self.to_dugout(1)
+                else:
+                    self.to_dugout(self.LEAD[self.mask])
+                    self.advance(1, slot, True)
+            else:
+                self.atbats[slot] += 1
+                self.hits[slot] += 1
+                self.advance(BASES[result], slot, True)
+            if lead is not None and scoreboard.runs > lead:
+                break
+
+    def finish(self):
+        """Copies the game's stats and dugout back to the engine."""
+        for slot, batter in enumerate(self.order):
+            batter.atbats = self.atbats[slot]
+            batter.hits = self.hits[slot]
+            batter.rbis = self.rbis[slot]
+        self.engine.field.dugout = self.dugout
+        if self.visitors is not None:
+            self.visitors.finish()
+
+    def play(self, rng=None):
+        """
+        Function to play a full game, like Engine.play_headless().
+
+        Parameters:
+            rng (obj): Random number source for this game and the ones
+                       after it; keeps the engine's current source if None.
+
+        Returns:
+            (dict): The results of the game; see Engine.results().
+        """
+        engine = self.engine
+        if rng is not None:
+            engine.set_rng(rng)
+        if self.sink.active:
+            return engine.play_headless()
+        engine.reset()
+        self.reset()
+        scoreboard = engine.scoreboard
+        visitors = self.visitors
+        while scoreboard.inning <= scoreboard.max:
+            if visitors is None:
+                scoreboard.other_team()
+            else:
+                visitors.half_inning()
+                visitors.clear_bases()
+                scoreboard.opponentruns = visitors.engine.scoreboard.runs
+            self.half_inning()
+            self.clear_bases()
+            # Play extra innings until the tie is broken.
+            if engine.extras and scoreboard.inning == scoreboard.max and \
+                    scoreboard.runs == scoreboard.opponentruns:
+                scoreboard.max += 1
+            scoreboard.inning += 1
+        self.finish()
+        return engine.results()
+
+    def simulate(self, games=1, seed=None, first=0):
+        """
+        Function to play many games in a row, like Engine.simulate().
+
+        Parameters:
+            games (int): Number of games to play.
+            seed (int): Root seed of the batch; game number i draws from
+                        streams.game_rng(seed, i).
+            first (int): Number of the first game.
+
+        Returns:
+            (lst): One results dictionary per game.
+        """
+        if seed is None:
+            return [self.play() for game in range(games)]
+        return [self.play(streams.game_rng(seed, game))
+                for game in range(first, first + games)]
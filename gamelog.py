@@ -0,0 +1,381 @@
+"""
+Compact binary log of every pitch, with fast replay and random access.
+
+GameLogSink is an event sink (see events.py) that writes one fixed-width
+19 byte record per pitch, in large buffered blocks:
+
+    game      game number, counting up from the first one logged
+    inning    inning of the pitch
+    half      0 for the top of the inning (a real opponent batting), 1
+              for the bottom (the engine's own team)
+    slot      batter's spot in the batting order, from 0
+    balls     balls after the pitch
+    strikes   strikes after the pitch
+    action    0 for a swing, 1 for a watch
+    result    0 strike, 1 ball, 2 in play
+    outcome   at bat status after the pitch, as in sampler.STATUSES (0 if
+              the at bat goes on)
+    play      how the runners moved, as in PLAYS
+    bases     runners when the batter came up: 1 first, 2 second, 4 third
+    outs      outs after the pitch
+    rbis      runs batted in on the pitch
+    runs      batting team's runs after the pitch
+
+Against a real opponent (Engine(opponent_team=...)), the visitors' engine
+gets the sink's opponent() sink, so both halves of every inning are in the
+log. When the log is closed, an offset index (first record, number of
+records, final score and innings of each game) is saved next to it as
+.index.npy, and the format VERSION with the names of each game's teams
+and both lineups as .json. The lineups come from the Lineup event at the
+start of each game, so batters a short game never reaches still get a
+(blank) line in the box score.
+
+GameLog memory-maps the records and hands out NumPy arrays, a whole column
+or a single game at a time. replay() rebuilds a game's Scoreboard and box
+score straight from the log, without simulating anything.
+
+Example:
+    python gamelog.py games.bin 17
+"""
+import json
+import sys
+
+import numpy as np
+
+from events import Pitch, Outcome, RunScored, FieldShown, InningEnd, \
+    GameOver, Lineup
+from sampler import STATUSES
+
+# Bump when the record layout or lineup files change.
+VERSION = 2
+RECORD = np.dtype([("game", "<u4"), ("inning", "<u2"), ("half", "u1"),
+                   ("slot", "u1"), ("balls", "u1"), ("strikes", "u1"),
+                   ("action", "u1"), ("result", "u1"), ("outcome", "u1"),
+                   ("play", "u1"), ("bases", "u1"), ("outs", "u1"),
+                   ("rbis", "u1"), ("runs", "<u2")])
+# Values of the half field.
+TOP, BOTTOM = 0, 1
+INDEX = np.dtype([("game", "<u4"), ("start", "<u8"), ("count", "<u4"),
+                  ("runs", "<u2"), ("opponent_runs", "<u2"),
+                  ("innings", "<u2"), ("lineup", "<u4")])
+ACTIONS = ("s", "w")
+RESULTS = ("Strike", "Ball", "In play")
+# Plays named by AtBat.announce(), in the order they are coded.
+PLAYS = (None, "empty first", "forced", "batter", "runners advance",
+         "lead runner")
+# Outcome codes that count as an at bat, and that are hits.
+AT_BATS = [STATUSES.index(status) for status in ("Strike out",
+           "Out in play", "Home run", "Single", "Double", "Triple")]
+HITS = [STATUSES.index(status) for status in ("Home run", "Single",
+        "Double", "Triple")]
+
+class GameLogSink:
+    """
+    Sink that writes every pitch as a fixed-width binary record.
+
+    Events sent to emit() are the bottom of the inning; the opponent()
+    sink sends the top.
+
+    Attributes:
+        file (obj): Open binary file the records are written to.
+        path (str): Path of the log.
+        buffer (lst): Records waiting to be written, as tuples.
+        block (int): Number of records to collect before writing.
+        game (int): Number of the game being logged.
+        written (int): Records written to the file or buffer so far.
+        index (lst): Index entries of the finished games.
+        lineups (lst): Distinct [home, opponent, batter names, opponent
+                       batter names] entries.
+        half (int): TOP or BOTTOM, for the event being handled.
+    """
+    active = True
+
+    def __init__(self, path, block=65536, first=0):
+        """
+        Constructor for GameLogSink class.
+
+        Parameters:
+            path (str): Log file to write; replaced if it exists.
+            block (int): Number of records to collect before each write.
+            first (int): Number of the first game logged.
+        """
+        self.path = path
+        self.file = open(path, "wb")
+        self.buffer = []
+        self.block = block
+        self.game = first
+        self.written = 0
+        self.index = []
+        self.lineups = []
+        self.lineup_ids = {}
+        self.half = BOTTOM
+        self.start_game()
+        self.show = {Pitch : self.pitch, Outcome : self.outcome,
+                     RunScored : self.run_scored,
+                     FieldShown : self.field_shown,
+                     InningEnd : self.inning_end, GameOver : self.game_over,
+                     Lineup : self.lineup}
+
+    def start_game(self):
+        """Clears what the sink knows about the game in progress."""
+        self.start = self.written
+        # Per half: batter slots, outs and runs.
+        self.slots = [{}, {}]
+        self.inning = 1
+        self.bases = 0
+        self.outs = [0, 0]
+        self.runs = [0, 0]
+        self.pending = None
+
+    def opponent(self):
+        """Returns (obj) the sink for a real opponent's half innings."""
+        return OpponentSink(self)
+
+    def emit(self, event, half=BOTTOM):
+        """Updates the record in progress, or writes it, for an event."""
+        self.half = half
+        self.show[type(event)](event)
+
+    def finish(self):
+        """Adds the record in progress to the buffer."""
+        if self.pending is not None:
+            self.buffer.append(tuple(self.pending))
+            self.written += 1
+            self.pending = None
+            if len(self.buffer) >= self.block:
+                self.flush()
+
+    def lineup(self, event):
+        """Numbers the batting order's slots as the game starts."""
+        self.slots[self.half] = {name : slot for slot, name in
+                                 enumerate(event.batters)}
+
+    def field_shown(self, event):
+        """Remembers the inning and runners as a batter comes up."""
+        self.finish()
+        # The opponent's engine does not count innings; the sink does.
+        if self.half == BOTTOM:
+            self.inning = event.inning
+        self.bases = (event.first is not None) | \
+            (event.second is not None) << 1 | (event.third is not None) << 2
+
+    def pitch(self, event):
+        """Starts a new record for a pitch."""
+        self.finish()
+        half = self.half
+        # Without a Lineup event, batters first come up in batting order,
+        # so that is their slot.
+        slots = self.slots[half]
+        slot = slots.setdefault(event.batter, len(slots))
+        self.pending = [self.game, self.inning, half, slot, event.balls,
+                        event.strikes, ACTIONS.index(event.action),
+                        RESULTS.index(event.result), 0, 0, self.bases,
+                        self.outs[half], 0, self.runs[half]]
+
+    def outcome(self, event):
+        """Adds how the at bat ended to the pitch that ended it."""
+        self.outs[self.half] = event.outs
+        if self.pending is not None:
+            self.pending[8] = STATUSES.index(event.status)
+            self.pending[9] = PLAYS.index(event.play)
+            self.pending[11] = event.outs
+
+    def run_scored(self, event):
+        """Adds a run, and an RBI if earned, to the pitch that drove it."""
+        self.runs[self.half] = event.runs
+        if self.pending is not None:
+            self.pending[12] += event.rbi
+            self.pending[13] = event.runs
+
+    def inning_end(self, event):
+        """Writes the inning's last pitch and resets the outs."""
+        self.finish()
+        self.outs = [0, 0]
+        self.bases = 0
+        self.inning = event.inning + 1
+
+    def game_over(self, event):
+        """Writes the game's last pitch and its index entry."""
+        self.finish()
+        names = (event.home, event.opponent, tuple(self.slots[BOTTOM]),
+                 tuple(self.slots[TOP]))
+        lineup = self.lineup_ids.setdefault(names, len(self.lineups))
+        if lineup == len(self.lineups):
+            self.lineups.append([event.home, event.opponent,
+                                 list(self.slots[BOTTOM]),
+                                 list(self.slots[TOP])])
+        self.index.append((self.game, self.start, self.written - self.start,
+                           event.runs, event.opponent_runs, event.innings,
+                           lineup))
+        self.game += 1
+        self.start_game()
+
+    def flush(self):
+        """Writes every buffered record to the file."""
+        if self.buffer:
+            self.file.write(np.array(self.buffer, dtype=RECORD).tobytes())
+            self.buffer = []
+
+    def close(self):
+        """Writes what is left, then the index and lineup files."""
+        self.finish()
+        self.flush()
+        self.file.close()
+        np.save(self.path + ".index.npy", np.array(self.index, dtype=INDEX))
+        with open(self.path + ".json", "w") as file:
+            json.dump({"version" : VERSION, "lineups" : self.lineups}, file)
+
+    def __enter__(self):
+        """Returns the sink for use in a with block."""
+        return self
+
+    def __exit__(self, *args):
+        """Closes the sink at the end of a with block."""
+        self.close()
+
+class OpponentSink:
+    """
+    Sink for a real opponent's engine: passes its events to a GameLogSink
+    as the top of the inning.
+
+    Attributes:
+        log (obj): The GameLogSink.
+    """
+    active = True
+
+    def __init__(self, log):
+        """Constructor for OpponentSink class."""
+        self.log = log
+
+    def emit(self, event):
+        """Sends an event to the log as the top of the inning."""
+        self.log.emit(event, TOP)
+
+    def close(self):
+        """The log is closed by its own owner."""
+        pass
+
+class GameLog:
+    """
+    Class to read a log written by GameLogSink.
+
+    Attributes:
+        records (array): Every record, memory-mapped from the log.
+        index (array): One INDEX entry per game, in game number order.
+        lineups (lst): [home, opponent, batter names, opponent batter
+                       names] entries.
+    """
+
+    def __init__(self, path):
+        """
+        Constructor for GameLog class.
+
+        Parameters:
+            path (str): Log file written by GameLogSink.
+
+        Raises:
+            ValueError: If the log was written in another format version.
+        """
+        with open(path + ".json") as file:
+            meta = json.load(file)
+        if meta.get("version") != VERSION:
+            raise ValueError(path + " is a version " +
+                             str(meta.get("version", 1)) + " game log; " +
+                             "this reads version " + str(VERSION) + ".")
+        self.lineups = meta["lineups"]
+        self.records = np.memmap(path, dtype=RECORD, mode="r")
+        self.index = np.load(path + ".index.npy")
+
+    def __len__(self):
+        """Returns (int) the number of games in the log."""
+        return len(self.index)
+
+    def column(self, name):
+        """Returns (array) one field of every record, e.g. "outcome"."""
+        return self.records[name]
+
+    def entry(self, game):
+        """Returns (obj) the index entry of a game, by game number."""
+        spot = np.searchsorted(self.index["game"], game)
+        if spot == len(self.index) or self.index["game"][spot] != game:
+            raise KeyError("Game " + str(game) + " is not in the log.")
+        return self.index[spot]
+
+    def game(self, game):
+        """Returns (array) the records of one game, by game number."""
+        entry = self.entry(game)
+        start = int(entry["start"])
+        return self.records[start:start + int(entry["count"])]
+
+    def box_score(self, records, batters=9):
+        """
+        Adds up each batting order slot's line from a game's records.
+
+        Returns:
+            (array): Shape (batters, 3), at bats, hits and RBIs per slot.
+        """
+        slot = records["slot"].astype(np.int64)
+        outcome = records["outcome"]
+        atbats = np.bincount(slot, np.isin(outcome, AT_BATS), batters)
+        hits = np.bincount(slot, np.isin(outcome, HITS), batters)
+        rbis = np.bincount(slot, records["rbis"], batters)
+        return np.column_stack([atbats, hits, rbis]).astype(np.int64)
+
+    def replay(self, game):
+        """
+        Rebuilds the final Scoreboard and box scores of a logged game.
+
+        Parameters:
+            game (int): Game number.
+
+        Returns:
+            scoreboard (obj): Scoreboard with both teams' names and runs,
+                              and the innings played.
+            batters (lst): Batter objects with their hits, at bats and RBIs,
+                           in batting order.
+            opponent_batters (lst): The same for a real opponent's lineup;
+                                    empty against the generic opponent.
+        """
+        from Smith_BaseballSim import Scoreboard
+        entry = self.entry(game)
+        home, opponent, names, opponent_names = \
+            self.lineups[int(entry["lineup"])]
+        scoreboard = Scoreboard(None, int(entry["innings"]))
+        scoreboard.home = home
+        scoreboard.opponent = opponent
+        scoreboard.runs = int(entry["runs"])
+        scoreboard.opponentruns = int(entry["opponent_runs"])
+        scoreboard.inning = int(entry["innings"]) + 1
+        records = self.game(game)
+        halves = records["half"]
+        return scoreboard, self.batters(records[halves == BOTTOM], names), \
+            self.batters(records[halves == TOP], opponent_names)
+
+    def batters(self, records, names):
+        """Returns (lst) Batter objects with the lines of one team's
+        records, in batting order."""
+        from Smith_BaseballSim import Batter
+        lines = self.box_score(records, len(names))
+        batters = []
+        for name, (atbats, hits, rbis) in zip(names, lines):
+            batter = Batter(name, 0, 0, 0, 0, 0, 0, 0, 0)
+            batter.atbats, batter.hits, batter.rbis = int(atbats), \
+                int(hits), int(rbis)
+            batters.append(batter)
+        return batters
+
+def main():
+    """Command line entry point; prints the final score and box score."""
+    if len(sys.argv) != 3:
+        print("Usage: python gamelog.py LOG GAME")
+        sys.exit(1)
+    log = GameLog(sys.argv[1])
+    scoreboard, batters, opponent_batters = log.replay(int(sys.argv[2]))
+    print("Final score after " + str(scoreboard.max) + " innings:")
+    print(scoreboard)
+    if opponent_batters:
+        scoreboard.box_score(opponent_batters)
+    scoreboard.box_score(batters)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Streaming ingest of plate appearance data into batter odds tables.
+
+The odds in the workbook (1B%, 2B%, 3B%, HR%, BB%, K%, HBP%, OIP%) are
+fixed 2003-2013 numbers. This module rebuilds them from event data: CSV
+files with one row per plate appearance, giving the player, their team,
+the season and what happened. Files are read in chunks with pandas and
+folded into counts per (player, team, season), so memory grows with the
+number of players, not the number of rows.
+
+A Store keeps the counts in a folder:
+    totals.npz      counts of every (player, team, season) so far, and the
+                    manifest: size, time and SHA-256 hash of every file
+                    ingested, in the same file so the two are replaced
+                    together and a crash can't leave them out of step
+    parts/          each file's own counts, so a file that changes can be
+                    swapped out without reading the others again
+update() only reads files that are new or changed since the last run, and
+takes away the counts of files that have since been deleted.
+export() writes the odds as a .csv file with the columns Files reads, so
+the game can play with them right away:
+    Files("odds.csv")
+
+Events are matched without case: the odds names themselves ("1B", "K",
+"OIP", ...) and common play-by-play names ("single", "strikeout",
+"field_out", ...) are known; see EVENTS. Rows with other events (catcher's
+interference, for example) are skipped and counted.
+
+Example:
+    python ingest.py store/ events-2014.csv events-2015.csv --export odds.csv
+"""
+import argparse
+import csv
+import json
+import os
+
+import numpy as np
+
+import roster_cache
+from Smith_BaseballSim import RosterTable
+
+# Rows read from a file at a time.
+CHUNK = 1000000
+# Column names in the event files, by what they hold.
+COLUMNS = {"player" : "player", "team" : "team", "season" : "season",
+           "event" : "event"}
+# Event names to their column of RosterTable.ODDS.
+EVENTS = {}
+for _code, _names in enumerate([
+        ("1b", "single"),
+        ("2b", "double", "ground_rule_double"),
+        ("3b", "triple"),
+        ("hr", "home_run", "homer"),
+        ("bb", "walk", "ibb", "intent_walk", "intentional_walk"),
+        ("k", "so", "strikeout", "strike_out", "strikeout_double_play"),
+        ("hbp", "hit_by_pitch"),
+        ("oip", "out", "field_out", "force_out", "double_play",
+         "grounded_into_double_play", "triple_play", "fielders_choice",
+         "fielders_choice_out", "sac_fly", "sac_bunt", "field_error",
+         "sac_fly_double_play")]):
+    for _name in _names:
+        EVENTS[_name] = _code
+# Workbook players have at least this many plate appearances.
+MIN_PA = 50
+
+class Counts:
+    """
+    Class to hold outcome counts per (player, team, season) key.
+
+    Attributes:
+        keys (dict): (player, team, season) to its row in counts.
+        counts (array): Shape (rows, 8), outcomes in RosterTable.ODDS order.
+    """
+
+    def __init__(self):
+        """Constructor for Counts class; starts empty."""
+        self.keys = {}
+        self.counts = np.zeros((1024, len(RosterTable.ODDS)), dtype=np.int64)
+
+    def __len__(self):
+        """Returns (int) the number of keys."""
+        return len(self.keys)
+
+    def rows(self, keys):
+        """Returns (array) the row of each key, adding new ones."""
+        rows = np.empty(len(keys), dtype=np.int64)
+        for number, key in enumerate(keys):
+            row = self.keys.get(key)
+            if row is None:
+                row = self.keys[key] = len(self.keys)
+            rows[number] = row
+        if len(self.keys) > len(self.counts):
+            grown = np.zeros((2 * len(self.keys), self.counts.shape[1]),
+                             dtype=np.int64)
+            grown[:len(self.counts)] = self.counts
+            self.counts = grown
+        return rows
+
+    def add(self, keys, counts, sign=1):
+        """
+        Adds (or with sign=-1, takes away) counts for some keys.
+
+        Parameters:
+            keys (lst): (player, team, season) tuples.
+            counts (array): Shape (keys, 8).
+            sign (int): 1 to add, -1 to subtract.
+        """
+        if len(keys):
+            np.add.at(self.counts, self.rows(keys), sign * counts)
+
+    def arrays(self):
+        """Returns (tup) keys as three string arrays, and their counts."""
+        keys = list(self.keys)
+        columns = [np.array([key[number] for key in keys], dtype=str)
+                   for number in range(3)]
+        return columns, self.counts[:len(keys)]
+
+    def save(self, path, **extra):
+        """Saves the counts, and any extra arrays, as a .npz file,
+        replacing it at once."""
+        (players, teams, seasons), counts = self.arrays()
+        temporary = path + ".tmp.npz"
+        np.savez(temporary, players=players, teams=teams, seasons=seasons,
+                 counts=counts, **extra)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns (obj) Counts saved with save(), or empty if none."""
+        counts = cls()
+        if os.path.exists(path):
+            with np.load(path) as data:
+                keys = list(zip(data["players"].tolist(),
+                                data["teams"].tolist(),
+                                data["seasons"].tolist()))
+                counts.add(keys, data["counts"])
+        return counts
+
+def read_events(path, columns=None, chunk=CHUNK):
+    """
+    Counts the outcomes in an event file, a chunk of rows at a time.
+
+    Parameters:
+        path (str): CSV file, one row per plate appearance.
+        columns (dict): Column names for "player", "team", "season" and
+                        "event"; COLUMNS by default.
+        chunk (int): Rows to read at a time.
+
+    Returns:
+        counts (obj): Counts of the file's outcomes.
+        rows (int): Rows read.
+        skipped (int): Rows with an unknown event or a missing value.
+    """
+    import pandas as pd
+    names = dict(COLUMNS, **(columns or {}))
+    order = [names[key] for key in ("player", "team", "season")]
+    counts = Counts()
+    rows = skipped = 0
+    for frame in pd.read_csv(path, usecols=order + [names["event"]],
+                             dtype=str, chunksize=chunk):
+        rows += len(frame)
+        code = frame[names["event"]].str.strip().str.lower().map(EVENTS)
+        keep = code.notna() & frame[order].notna().all(axis=1)
+        skipped += int((~keep).sum())
+        frame = frame[keep]
+        # One row per key, one column per outcome.
+        table = frame.groupby(order + [code[keep].astype(int)]).size() \
+            .unstack(fill_value=0) \
+            .reindex(columns=range(len(RosterTable.ODDS)), fill_value=0)
+        counts.add([tuple(str(value).strip() for value in key)
+                    for key in table.index], table.to_numpy(np.int64))
+    return counts, rows, skipped
+
+class Store:
+    """
+    Class to keep outcome counts on disk and update them file by file.
+
+    Attributes:
+        folder (str): Folder holding the counts.
+        totals (obj): Counts of every file ingested.
+        manifest (dict): Path of each file ingested to its "size",
+                         "mtime_ns", "sha256", "rows", "skipped" and "part".
+        touched (bool): True if changed() has updated the manifest since it
+                        was last saved.
+    """
+
+    def __init__(self, folder):
+        """
+        Constructor for Store class.
+
+        Parameters:
+            folder (str): Folder for the counts; made if it does not exist.
+        """
+        self.folder = folder
+        os.makedirs(os.path.join(folder, "parts"), exist_ok=True)
+        path = os.path.join(folder, "totals.npz")
+        self.totals = Counts.load(path)
+        self.manifest = None
+        self.touched = False
+        if os.path.exists(path):
+            with np.load(path) as data:
+                if "manifest" in data:
+                    self.manifest = json.loads(str(data["manifest"]))
+        if self.manifest is None:
+            # Stores from before kept the manifest in its own file.
+            try:
+                with open(os.path.join(folder, "manifest.json")) as file:
+                    self.manifest = json.load(file)
+            except OSError:
+                self.manifest = {}
+
+    def changed(self, path):
+        """Returns (str) the file's SHA-256 if it is new or changed, or
+        None if it was ingested as it is now."""
+        info = os.stat(path)
+        entry = self.manifest.get(os.path.abspath(path))
+        if entry is not None and entry["mtime_ns"] == info.st_mtime_ns and \
+                entry["size"] == info.st_size:
+            return None
+        digest = roster_cache.file_hash(path)
+        if entry is not None and entry["sha256"] == digest:
+            # Touched but the same; remember the time so it isn't hashed
+            # again next run.
+            entry["mtime_ns"] = info.st_mtime_ns
+            self.touched = True
+            return None
+        return digest
+
+    def update(self, paths, columns=None, chunk=CHUNK, progress=None):
+        """
+        Folds new and changed event files into the totals.
+
+        A changed file's old counts are taken away before its new ones
+        are added, so history never has to be read again. Files ingested
+        before that no longer exist have their counts taken away too.
+
+        Parameters:
+            paths (lst): Event files.
+            columns (dict): Column names, as in read_events().
+            chunk (int): Rows to read at a time.
+            progress (func): Called as progress(path, rows) after each
+                             file is read.
+
+        Returns:
+            (dict): "files" read, "rows" read, rows "skipped" and files
+            "removed".
+        """
+        summary = {"files" : 0, "rows" : 0, "skipped" : 0, "removed" : 0}
+        for name in [name for name in self.manifest
+                     if not os.path.exists(name)]:
+            self.remove(name)
+            summary["removed"] += 1
+        if summary["removed"]:
+            self.save()
+        for path in paths:
+            digest = self.changed(path)
+            if digest is None:
+                continue
+            counts, rows, skipped = read_events(path, columns, chunk)
+            name = os.path.abspath(path)
+            old = self.manifest.get(name)
+            counts.save(self.part_path(digest))
+            if old is not None:
+                self.remove(name)
+            self.totals.add(*self.flat(counts))
+            info = os.stat(path)
+            self.manifest[name] = {"size" : info.st_size,
+                                   "mtime_ns" : info.st_mtime_ns,
+                                   "sha256" : digest, "rows" : rows,
+                                   "skipped" : skipped, "part" : digest}
+            summary["files"] += 1
+            summary["rows"] += rows
+            summary["skipped"] += skipped
+            self.save()
+            if progress is not None:
+                progress(path, rows)
+        if self.touched:
+            self.save()
+        return summary
+
+    def remove(self, name):
+        """
+        Takes a file's counts out of the totals and drops it from the
+        manifest; the caller saves.
+
+        Parameters:
+            name (str): Absolute path of the file, as in the manifest.
+        """
+        entry = self.manifest.pop(name)
+        part = Counts.load(self.part_path(entry["part"]))
+        self.totals.add(*self.flat(part), sign=-1)
+
+    def part_path(self, digest):
+        """Returns (str) the file holding one event file's counts."""
+        return os.path.join(self.folder, "parts", digest + ".npz")
+
+    def flat(self, counts):
+        """Returns (tup) the keys and counts of a Counts, for add()."""
+        return list(counts.keys), counts.counts[:len(counts)]
+
+    def save(self):
+        """Saves the totals and the manifest together, in one replace."""
+        self.totals.save(os.path.join(self.folder, "totals.npz"),
+                         manifest=np.array(json.dumps(self.manifest)))
+        self.touched = False
+        # Only now that the manifest no longer points at them can parts
+        # of removed and changed files go; so can an older store's
+        # manifest.json, which would be out of date.
+        used = {entry["part"] + ".npz" for entry in self.manifest.values()}
+        folder = os.path.join(self.folder, "parts")
+        for name in os.listdir(folder):
+            if name not in used:
+                os.remove(os.path.join(folder, name))
+        old = os.path.join(self.folder, "manifest.json")
+        if os.path.exists(old):
+            os.remove(old)
+
+    def table(self, seasons=None, min_pa=MIN_PA):
+        """
+        Turns the counts into odds, one row per player and team.
+
+        Parameters:
+            seasons (lst): Seasons to add up, as strings; all if None.
+            min_pa (int): Fewest plate appearances to be listed.
+
+        Returns:
+            (dict): Column name to array: "Name", "Team", "PA", "BABIP"
+            and the odds columns, in team then name order.
+        """
+        (players, teams, years), counts = self.totals.arrays()
+        keep = np.ones(len(players), dtype=bool)
+        if seasons is not None:
+            keep = np.isin(years, [str(season) for season in seasons])
+        # Add seasons up for each player on each team.
+        pairs = {}
+        for player, team, row in zip(players[keep].tolist(),
+                                     teams[keep].tolist(),
+                                     counts[keep]):
+            pairs.setdefault((team, player), np.zeros_like(row))
+            pairs[(team, player)] += row
+        keys = sorted(pairs)
+        totals = np.array([pairs[key] for key in keys], dtype=np.float64
+                          ).reshape(-1, len(RosterTable.ODDS))
+        appearances = totals.sum(axis=1)
+        listed = appearances >= max(min_pa, 1)
+        totals, appearances = totals[listed], appearances[listed]
+        keys = [key for key, keep in zip(keys, listed) if keep]
+        single, double, triple, hr, walk, k, hbp, oip = totals.T
+        in_play = single + double + triple + oip
+        with np.errstate(divide="ignore", invalid="ignore"):
+            babip = np.where(in_play > 0, (single + double + triple) /
+                             np.maximum(in_play, 1), 0.0)
+        columns = {"Name" : np.array([key[1] for key in keys], dtype=str),
+                   "Team" : np.array([key[0] for key in keys], dtype=str),
+                   "PA" : appearances.astype(np.int64), "BABIP" : babip}
+        for number, name in enumerate(RosterTable.ODDS):
+            columns[name + "%"] = totals[:, number] / appearances
+        return columns
+
+    def export(self, path, seasons=None, min_pa=MIN_PA):
+        """
+        Writes the odds as a .csv file Files can load.
+
+        Parameters:
+            path (str): File to write.
+            seasons (lst): Seasons to add up; all if None.
+            min_pa (int): Fewest plate appearances to be listed.
+
+        Returns:
+            (int): Players written.
+        """
+        columns = self.table(seasons, min_pa)
+        names = list(columns)
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(names)
+            writer.writerows(zip(*[columns[name].tolist()
+                                   for name in names]))
+        return len(columns["Name"])
+
+def main():
+    """Command line entry point; ingests event files and exports odds."""
+    parser = argparse.ArgumentParser(description="Fold plate appearance " +
+                                     "event files into batter odds.")
+    parser.add_argument("store", help="Folder to keep the counts in.")
+    parser.add_argument("files", nargs="*", help="Event .csv files.")
+    parser.add_argument("--export", help="Write the odds to this .csv.")
+    parser.add_argument("--seasons", default=None,
+                        help="Seasons to export, e.g. 2014,2015.")
+    parser.add_argument("--min-pa", type=int, default=MIN_PA)
+    parser.add_argument("--chunk", type=int, default=CHUNK)
+    for key in COLUMNS:
+        parser.add_argument("--" + key + "-column", default=COLUMNS[key])
+    args = parser.parse_args()
+
+    columns = {key : getattr(args, key + "_column") for key in COLUMNS}
+    store = Store(args.store)
+    summary = store.update(args.files, columns, args.chunk,
+                           lambda path, rows: print("{}: {:,} rows".format(
+                               path, rows)))
+    print("Read {:,} new or changed files, {:,} rows ({:,} skipped), "
+          "removed {:,} deleted files; {:,} player seasons in all.".format(
+              summary["files"], summary["rows"], summary["skipped"],
+              summary["removed"], len(store.totals)))
+    if args.export:
+        seasons = args.seasons.split(",") if args.seasons else None
+        count = store.export(args.export, seasons, args.min_pa)
+        print("Wrote odds for {:,} players to {}.".format(count,
+                                                          args.export))
+
+if __name__ == "__main__":
+    main()
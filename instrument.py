@@ -0,0 +1,287 @@
+"""
+Optional counters, timers and profiling for simulation runs.
+
+Nothing here runs unless it is turned on. enable() wraps the Engine
+phases and the AtBat, Field and sink methods in timers; disable() puts the
+original methods back, so a normal run pays nothing at all. Phases:
+    load data        Files()
+    build roster     Engine.headless_roster() and make_roster()
+    opponent         Scoreboard.other_team()
+    pitch            AtBat.swing(), AtBat.watch(), Pitcher.throw_pitch()
+    outcome          AtBat.outcome_machine(), advance_runners()
+    output           emit() of the terminal, JSON lines and game log sinks
+    game             Engine.play_headless(), half_inning() and
+                     simulate_batch()
+Times are inclusive, so a game's time includes its pitches. The counters
+and timers only cover this process, not pool workers.
+
+Example:
+    with instrument.enabled() as stats:
+        engine.simulate(1000)
+    print(stats.table())
+
+For a closer look, profile() runs cProfile around a block of code, and
+profile_on_signal() / stack_on_signal() start a cProfile dump or print the
+current stack when the process gets a signal (kill -USR1 / -USR2 PID).
+"""
+import cProfile
+import contextlib
+import faulthandler
+import functools
+import json
+import signal
+import sys
+import time
+
+# (module, class, method, phase) of every method that gets a timer.
+TARGETS = [
+    ("Smith_BaseballSim", "Files", "__init__", "load data"),
+    ("Smith_BaseballSim", "Engine", "headless_roster", "build roster"),
+    ("Smith_BaseballSim", "Engine", "make_roster", "build roster"),
+    ("Smith_BaseballSim", "Scoreboard", "other_team", "opponent"),
+    ("Smith_BaseballSim", "AtBat", "swing", "pitch"),
+    ("Smith_BaseballSim", "AtBat", "watch", "pitch"),
+    ("Smith_BaseballSim", "Pitcher", "throw_pitch", "pitch"),
+    ("Smith_BaseballSim", "AtBat", "outcome_machine", "outcome"),
+    ("Smith_BaseballSim", "Field", "advance_runners", "outcome"),
+    ("Smith_BaseballSim", "BitField", "advance_runners", "outcome"),
+    ("events", "TerminalSink", "emit", "output"),
+    ("events", "JsonlSink", "emit", "output"),
+    ("gamelog", "GameLogSink", "emit", "output"),
+    ("Smith_BaseballSim", "Engine", "play_headless", "game"),
+    ("Smith_BaseballSim", "Engine", "half_inning", "game"),
+    ("Smith_BaseballSim", "Engine", "simulate_batch", "game")
+]
+
+class Stats:
+    """
+    Class to hold the counters and timers of an instrumented run.
+
+    Attributes:
+        calls (dict): "Class.method" to number of calls.
+        seconds (dict): "Class.method" to total seconds, inclusive.
+        phases (dict): "Class.method" to its phase.
+        runs (int): Runs scored in outcome_machine() calls.
+        batched_games (int): Games played by simulate_batch().
+        started (float): time.perf_counter() when the stats were made.
+    """
+
+    def __init__(self):
+        """Constructor for Stats class."""
+        self.calls = {}
+        self.seconds = {}
+        self.phases = {}
+        self.runs = 0
+        self.batched_games = 0
+        self.started = time.perf_counter()
+
+    def count(self, name):
+        """Returns (int) the calls of a "Class.method", 0 if never seen."""
+        return self.calls.get(name, 0)
+
+    def counters(self):
+        """Returns (dict) pitches, plate appearances, runs and games."""
+        return {
+            "pitches" : self.count("AtBat.swing") + self.count("AtBat.watch"),
+            "plate_appearances" : self.count("AtBat.outcome_machine"),
+            "runs" : self.runs,
+            "games" : self.count("Engine.play_headless"),
+            "batched_games" : self.batched_games
+        }
+
+    def as_dict(self):
+        """Returns (dict) everything, ready to save as JSON."""
+        methods = {name : {"phase" : self.phases[name],
+                           "calls" : self.calls[name],
+                           "seconds" : self.seconds[name]}
+                   for name in self.calls if self.calls[name]}
+        return {"counters" : self.counters(), "methods" : methods,
+                "wall_seconds" : time.perf_counter() - self.started}
+
+    def to_json(self, path=None):
+        """
+        Exports the stats as JSON.
+
+        Parameters:
+            path (str): File to write; if None, the text is returned.
+
+        Returns:
+            (str): The JSON text.
+        """
+        text = json.dumps(self.as_dict(), indent=2)
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(text)
+        return text
+
+    def table(self):
+        """Returns (str) the counters and a table of time per method."""
+        data = self.as_dict()
+        lines = [name + ": " + "{:,}".format(value) for name, value in
+                 data["counters"].items()]
+        lines.append('\n{:<14s}{:<30s}{:>12s}{:>12s}{:>12s}'.format(
+                     "Phase", "Method", "Calls", "Seconds", "us/call"))
+        methods = sorted(data["methods"].items(),
+                         key=lambda item: -item[1]["seconds"])
+        for name, method in methods:
+            lines.append('{:<14s}{:<30s}{:>12,}{:>12.3f}{:>12.2f}'.format(
+                         method["phase"], name, method["calls"],
+                         method["seconds"],
+                         1e6 * method["seconds"] / method["calls"]))
+        lines.append("Wall time: {:.3f} s".format(data["wall_seconds"]))
+        return "\n".join(lines)
+
+def timer(function, name, stats):
+    """Returns (func) function wrapped to count its calls and time."""
+    calls, seconds = stats.calls, stats.seconds
+    calls.setdefault(name, 0)
+    seconds.setdefault(name, 0.0)
+    clock = time.perf_counter
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        begin = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            seconds[name] += clock() - begin
+            calls[name] += 1
+
+    return timed
+
+def outcome_timer(function, stats):
+    """Returns (func) outcome_machine wrapped to also count runs."""
+
+    @functools.wraps(function)
+    def counted(self, field, scoreboard):
+        before = scoreboard.runs
+        function(self, field, scoreboard)
+        stats.runs += scoreboard.runs - before
+
+    return counted
+
+def batch_timer(function, stats):
+    """Returns (func) simulate_batch wrapped to also count its games."""
+
+    @functools.wraps(function)
+    def counted(*args, **kwargs):
+        results = function(*args, **kwargs)
+        stats.batched_games += len(results["runs"])
+        return results
+
+    return counted
+
+# Original methods while instrumented, to put back in disable().
+_originals = []
+_active = []
+
+def enable(stats=None):
+    """
+    Wraps every target method in timers.
+
+    Parameters:
+        stats (obj): Stats to add to; a new one if None.
+
+    Returns:
+        (obj): The Stats being filled in.
+    """
+    # Already on: keep the same timers until the matching disable().
+    if _active:
+        _active.append(_active[-1])
+        return _active[-1]
+    if stats is None:
+        stats = Stats()
+    for module_name, class_name, method, phase in TARGETS:
+        module = sys.modules.get(module_name)
+        if module is None:
+            module = __import__(module_name)
+        owner = getattr(module, class_name)
+        original = owner.__dict__[method]
+        name = class_name + "." + method
+        wrapped = original
+        if name == "AtBat.outcome_machine":
+            wrapped = outcome_timer(wrapped, stats)
+        elif name == "Engine.simulate_batch":
+            wrapped = batch_timer(wrapped, stats)
+        stats.phases[name] = phase
+        setattr(owner, method, timer(wrapped, name, stats))
+        _originals.append((owner, method, original))
+    _active.append(stats)
+    return stats
+
+def disable():
+    """Puts every original method back; returns (obj) the last Stats."""
+    if len(_active) > 1:
+        return _active.pop()
+    while _originals:
+        owner, method, original = _originals.pop()
+        setattr(owner, method, original)
+    return _active.pop() if _active else None
+
+@contextlib.contextmanager
+def enabled(stats=None):
+    """Instruments the code in a with block and yields the Stats."""
+    stats = enable(stats)
+    try:
+        yield stats
+    finally:
+        disable()
+
+@contextlib.contextmanager
+def profile(path, enabled=True):
+    """
+    Runs cProfile over the code in a with block and dumps the results.
+
+    Parameters:
+        path (str): File for the pstats dump, e.g. "run.prof".
+        enabled (bool): False to skip profiling, so callers can leave the
+                        with block in place.
+    """
+    if not enabled:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+def profile_on_signal(path, signum=None):
+    """
+    Lets a running process be profiled on demand: the first signal starts
+    cProfile, the next one stops it and dumps the stats to path.
+
+    Parameters:
+        path (str): File for the pstats dump.
+        signum (int): Signal to use; SIGUSR1 by default.
+    """
+    if signum is None:
+        signum = signal.SIGUSR1
+    running = []
+
+    def toggle(number, frame):
+        if running:
+            profiler = running.pop()
+            profiler.disable()
+            profiler.dump_stats(path)
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            running.append(profiler)
+
+    signal.signal(signum, toggle)
+
+def stack_on_signal(signum=None, file=None):
+    """
+    Prints the stack of every thread when the process gets a signal, a
+    cheap sample of where a slow run is spending its time.
+
+    Parameters:
+        signum (int): Signal to use; SIGUSR2 by default.
+        file (obj): Open file to write to; sys.stderr by default.
+    """
+    if signum is None:
+        signum = signal.SIGUSR2
+    faulthandler.register(signum, file=file or sys.stderr, all_threads=True)
@@ -0,0 +1,496 @@
+"""
+Exact run expectancy for a batting order, solved as a Markov chain.
+
+The rules in AtBat and Field make every half inning a finite Markov chain.
+Each plate appearance walks the 12 ball/strike counts until it ends, which
+gives the odds of each outcome for the batter in that base/out situation.
+Those outcomes then move the chain between base/out states until the third
+out. Nothing is sampled: the run distribution comes from pushing probability
+through the chain, one run total at a time.
+
+Two views of the batting order are available:
+    RunExpectancy.inning() tracks the dugout exactly the way Field does,
+    including batters who rejoin the end of the line after making an out
+    while teammates are still on base. This is the ground truth for the
+    first inning of a headless game, but its state space grows quickly.
+    RunExpectancy.slot_inning() and game() keep the batting order fixed
+    (the usual 24 base/out states times the lineup slot), which is small
+    enough to solve full games in milliseconds.
+
+Bases are a 3-bit mask: 1 for first, 2 for second and 4 for third.
+
+A watched pitch is a ball with chance Pitcher.ball_odds.
+"""
+import numpy as np
+
+# Plate appearance outcomes and the number of bases a hit is worth.
+OUTCOMES = ("K", "BB", "OIP", "HR", "1B", "2B", "3B")
+HIT_BASES = {"1B" : 1, "2B" : 2, "3B" : 3, "HR" : 4}
+# Out in play with runners on: the batter is out 1 in 3 times, otherwise
+# the lead runner is.
+BATTER_OUT = 1 / 3
+
+def swing_policy(balls, strikes, outs, bases):
+    """Solver policy that swings at every pitch."""
+    return 's'
+
+def plate_appearance(odds, policy=None, outs=0, bases=0, ball_odds=0.5):
+    """
+    Odds of each way a plate appearance can end, over the 12 counts.
+
+    Parameters:
+        odds (dict): Batter.odds of the batter at the plate.
+        policy (func): Called as policy(balls, strikes, outs, bases);
+                       returns 's' to swing or 'w' to watch. Defaults to
+                       swinging at every pitch.
+        outs (int): Outs before the plate appearance.
+        bases (int): Base mask before the plate appearance.
+        ball_odds (float): Chance a watched pitch is a ball.
+
+    Returns:
+        (dict): Probability of each key in OUTCOMES.
+    """
+    if policy is None:
+        policy = swing_policy
+    swing = odds["SWING"]
+    ends = {key : 0.0 for key in OUTCOMES}
+    # Chance of reaching each count, visited in order of pitches thrown.
+    reach = {(0, 0) : 1.0}
+    for pitches in range(6):
+        for balls in range(4):
+            strikes = pitches - balls
+            if strikes < 0 or strikes > 2 or (balls, strikes) not in reach:
+                continue
+            p = reach.pop((balls, strikes))
+            if policy(balls, strikes, outs, bases) == 's':
+                strike = p * odds["K"] / swing
+                for key in ("OIP", "HR", "1B", "2B", "3B"):
+                    ends[key] += p * odds[key] / swing
+                ball = 0.0
+            else:
+                strike = p * (1 - ball_odds)
+                ball = p * ball_odds
+            if strikes == 2:
+                ends["K"] += strike
+            else:
+                key = (balls, strikes + 1)
+                reach[key] = reach.get(key, 0.0) + strike
+            if balls == 3:
+                ends["BB"] += ball
+            elif ball:
+                key = (balls + 1, strikes)
+                reach[key] = reach.get(key, 0.0) + ball
+    return ends
+
+def advance(runners, value, queue):
+    """
+    Moves runners like Field.advance_runners and returns who scored.
+
+    Parameters:
+        runners (tup): (player, base) pairs, lead runner first.
+        value (int): Number of bases everyone moves.
+        queue (tup): Dugout order; runners who score join the end.
+
+    Returns:
+        (tup): New runners, new queue and runs scored.
+    """
+    moved = []
+    scored = []
+    for player, base in runners:
+        if base + value > 3:
+            scored.append(player)
+        else:
+            moved.append((player, base + value))
+    return tuple(moved), queue + tuple(scored), len(scored)
+
+def dugout_moves(outs, runners, queue, ends):
+    """
+    Every state a plate appearance can lead to when tracking the dugout.
+
+    Parameters:
+        outs (int): Outs before the plate appearance.
+        runners (tup): (player, base) pairs, lead runner first.
+        queue (tup): Dugout order; the first player is at the plate.
+        ends (dict): Outcome odds from plate_appearance().
+
+    Returns:
+        (lst): (probability, outs, runners, queue, runs) for each move.
+    """
+    batter = queue[0]
+    rest = queue[1:]
+    at_plate = runners + ((batter, 0),)
+    moves = [(ends["K"], outs + 1, runners, rest + (batter,), 0)]
+    # A walk only pushes runners along if someone is on first.
+    if any(base == 1 for player, base in runners):
+        moved, line, runs = advance(at_plate, 1, rest)
+        moves.append((ends["BB"], outs, moved, line, runs))
+    else:
+        moves.append((ends["BB"], outs, runners + ((batter, 1),), rest, 0))
+    for key, value in HIT_BASES.items():
+        moved, line, runs = advance(at_plate, value, rest)
+        moves.append((ends[key], outs, moved, line, runs))
+    if not runners or outs + 1 == 3:
+        moves.append((ends["OIP"], outs + 1, runners, rest + (batter,), 0))
+    else:
+        # Runners advance and the batter is out at first.
+        moved, line, runs = advance(at_plate, 1, rest)
+        moved = moved[:-1]
+        moves.append((ends["OIP"] * BATTER_OUT, outs + 1, moved,
+                      line + (batter,), runs))
+        # The lead runner is out and everyone else moves up.
+        moved, line, runs = advance(at_plate[1:], 1, rest + (runners[0][0],))
+        moves.append((ends["OIP"] * (1 - BATTER_OUT), outs + 1, moved, line,
+                      runs))
+    return moves
+
+def slot_moves(outs, bases, ends):
+    """
+    Every base/out state a plate appearance can lead to, by base mask.
+
+    Parameters:
+        outs (int): Outs before the plate appearance.
+        bases (int): Base mask before the plate appearance.
+        ends (dict): Outcome odds from plate_appearance().
+
+    Returns:
+        (lst): (probability, outs, bases, runs) for each move.
+    """
+    moves = [(ends["K"], outs + 1, bases, 0)]
+    if bases & 1:
+        moves.append((ends["BB"], outs, ((bases << 1) & 7) | 1, bases >> 2))
+    else:
+        moves.append((ends["BB"], outs, bases | 1, 0))
+    for key, value in HIT_BASES.items():
+        moved = (bases << value) | (1 << (value - 1))
+        moves.append((ends[key], outs, moved & 7, bin(moved >> 3).count("1")))
+    if bases == 0 or outs + 1 == 3:
+        moves.append((ends["OIP"], outs + 1, bases, 0))
+    else:
+        moves.append((ends["OIP"] * BATTER_OUT, outs + 1, (bases << 1) & 7,
+                      bases >> 2))
+        lead = 1 << (bases.bit_length() - 1)
+        moves.append((ends["OIP"] * (1 - BATTER_OUT), outs + 1,
+                      (((bases ^ lead) << 1) & 7) | 1, 0))
+    return moves
+
+class Chain:
+    """
+    Class to hold a half inning as arrays of weighted moves between states.
+
+    Moves that score no runs always add an out or a runner, so ordering
+    states by (outs, runners on base) lets probability be pushed forward one
+    run total at a time without solving a linear system.
+
+    Attributes:
+        size (int): Number of states before the third out.
+        ends (int): Number of distinct ways the inning can end.
+        levels (lst): Per level, per runs scored, (src, dst, prob) arrays.
+    """
+
+    def __init__(self, states, ends, moves, level):
+        """
+        Constructor for Chain class.
+
+        Parameters:
+            states (int): Number of states before the third out.
+            ends (int): Number of end states, numbered after the states.
+            moves (lst): (src, dst, probability, runs) for every move.
+            level (lst): Level of each state.
+        """
+        self.size = states
+        self.ends = ends
+        src, dst, prob, runs = (np.array(column) for column in zip(*moves))
+        level = np.asarray(level)[src]
+        self.levels = []
+        for value in range(int(level.max()) + 1):
+            by_runs = []
+            for scored in range(int(runs.max()) + 1):
+                keep = (level == value) & (runs == scored) & (prob > 0)
+                by_runs.append((src[keep], dst[keep], prob[keep]))
+            self.levels.append(by_runs)
+
+    def push(self, start, max_runs):
+        """
+        Pushes probability from one start state to the end of the inning.
+
+        Parameters:
+            start (int): State the inning begins in.
+            max_runs (int): Highest run total to follow.
+
+        Returns:
+            (array): Probability of ending in each end state with each run
+            total, shape (max_runs + 1, ends).
+        """
+        total = self.size + self.ends
+        mass = np.zeros((max_runs + 1, total))
+        mass[0, start] = 1.0
+        for runs in range(max_runs + 1):
+            for by_runs in self.levels:
+                for scored, (src, dst, prob) in enumerate(by_runs):
+                    if runs + scored > max_runs or len(src) == 0:
+                        continue
+                    mass[runs + scored] += np.bincount(
+                        dst, weights=mass[runs, src] * prob, minlength=total)
+        return mass[:, self.size:]
+
+class RunExpectancy:
+    """
+    Class to solve expected runs and run distributions for a batting order.
+
+    Attributes:
+        batters (lst): Batter objects in batting order.
+        policy (func): Called as policy(balls, strikes, outs, bases).
+        ball_odds (float): Chance a watched pitch is a ball.
+        max_runs (int): Highest run total tracked in one inning.
+    """
+
+    def __init__(self, batters, policy=None, ball_odds=0.5, max_runs=30):
+        """
+        Constructor for RunExpectancy class.
+
+        Parameters:
+            batters (lst): Batter objects in batting order (5 to 9).
+            policy (func): Called as policy(balls, strikes, outs, bases);
+                           returns 's' or 'w'. Defaults to always swinging.
+            ball_odds (float): Chance a watched pitch is a ball; use the
+                               Pitcher.ball_odds of the opposing pitcher.
+            max_runs (int): Highest run total tracked in one inning.
+        """
+        self.batters = list(batters)
+        self.policy = policy
+        self.ball_odds = ball_odds
+        self.max_runs = max_runs
+        self.pa = {}
+        self.slot_chain = None
+        self.slot_ends = None
+
+    def ends(self, slot, outs, bases):
+        """Returns (dict) plate appearance odds, cached by situation."""
+        key = (slot, outs, bases)
+        if key not in self.pa:
+            self.pa[key] = plate_appearance(self.batters[slot].odds,
+                                            self.policy, outs, bases,
+                                            self.ball_odds)
+        return self.pa[key]
+
+    def summary(self, distribution):
+        """Returns (dict) expected runs, distribution and untracked mass."""
+        runs = np.arange(len(distribution))
+        return {"expected" : float(runs @ distribution),
+                "distribution" : distribution,
+                "tail" : max(0.0, 1.0 - float(distribution.sum()))}
+
+    def inning(self, order=None):
+        """
+        Exact run distribution for one inning, tracking the dugout.
+
+        Parameters:
+            order (lst): Slots in dugout order, first batter up first.
+                         Defaults to the batting order.
+
+        Returns:
+            (dict): "expected" runs, "distribution" (array of probability
+            by runs scored), "tail" (probability above max_runs), and
+            "next" (dict of dugout order at the end of the inning to its
+            probability).
+        """
+        if order is None:
+            order = range(len(self.batters))
+        start = (0, (), tuple(order))
+        index = {start : 0}
+        ends = {}
+        moves = []
+        level = [0]
+        todo = [start]
+        while todo:
+            outs, runners, queue = state = todo.pop()
+            mask = 0
+            for player, base in runners:
+                mask |= 1 << (base - 1)
+            src = index[state]
+            for prob, new_outs, moved, line, runs in dugout_moves(
+                    outs, runners, queue, self.ends(queue[0], outs, mask)):
+                if new_outs == 3:
+                    # Runners left on base go back to the dugout in order.
+                    line += tuple(player for player, base in moved)
+                    dst = ends.setdefault(line, len(ends))
+                    moves.append((src, -1 - dst, prob, runs))
+                    continue
+                new = (new_outs, moved, line)
+                if new not in index:
+                    index[new] = len(index)
+                    level.append(new_outs * 4 + len(moved))
+                    todo.append(new)
+                moves.append((src, index[new], prob, runs))
+        # End states are numbered after the live states.
+        moves = [(src, dst if dst >= 0 else len(index) - 1 - dst, prob, runs)
+                 for src, dst, prob, runs in moves]
+        level.extend([12] * len(ends))
+        chain = Chain(len(index), len(ends), moves, level)
+        mass = chain.push(0, self.max_runs)
+        result = self.summary(mass.sum(axis=1))
+        finished = mass.sum(axis=0)
+        result["next"] = {line : float(finished[number])
+                          for line, number in ends.items()}
+        return result
+
+    def build_slots(self):
+        """Builds the fixed-order chain over base, out and lineup slot."""
+        n = len(self.batters)
+        size = 24 * n
+        moves = []
+        level = []
+        for outs in range(3):
+            for bases in range(8):
+                for slot in range(n):
+                    src = (outs * 8 + bases) * n + slot
+                    level.append(outs * 4 + bin(bases).count("1"))
+                    following = (slot + 1) % n
+                    for prob, new_outs, moved, runs in slot_moves(
+                            outs, bases, self.ends(slot, outs, bases)):
+                        if new_outs == 3:
+                            dst = size + following
+                        else:
+                            dst = (new_outs * 8 + moved) * n + following
+                        moves.append((src, dst, prob, runs))
+        level.extend([12] * n)
+        self.slot_chain = Chain(size, n, moves, level)
+        self.slot_ends = [self.slot_chain.push(slot, self.max_runs)
+                          for slot in range(n)]
+
+    def slot_inning(self, leadoff=0):
+        """
+        Run distribution for one inning with a fixed batting order.
+
+        Parameters:
+            leadoff (int): Slot of the first batter of the inning.
+
+        Returns:
+            (dict): "expected", "distribution" and "tail" as in inning(),
+            plus "next" (array of probability for each next leadoff slot).
+        """
+        if self.slot_chain is None:
+            self.build_slots()
+        mass = self.slot_ends[leadoff]
+        result = self.summary(mass.sum(axis=1))
+        result["next"] = mass.sum(axis=0)
+        return result
+
+    def game(self, innings=9):
+        """
+        Run distribution for a whole game with a fixed batting order.
+
+        Parameters:
+            innings (int): Number of innings the team bats.
+
+        Returns:
+            (dict): "expected", "distribution" and "tail" for the game and
+            "by_inning" (array of expected runs in each inning).
+        """
+        if self.slot_chain is None:
+            self.build_slots()
+        n = len(self.batters)
+        cap = self.max_runs * innings
+        # Probability of each (leadoff slot, runs so far).
+        joint = np.zeros((n, cap + 1))
+        joint[0, 0] = 1.0
+        by_inning = []
+        for inning in range(innings):
+            after = np.zeros_like(joint)
+            expected = 0.0
+            for slot in range(n):
+                if not joint[slot].any():
+                    continue
+                mass = self.slot_ends[slot]
+                expected += joint[slot].sum() * \
+                    float(np.arange(len(mass)) @ mass.sum(axis=1))
+                for following in range(n):
+                    after[following] += np.convolve(
+                        joint[slot], mass[:, following])[:cap + 1]
+            by_inning.append(expected)
+            joint = after
+        result = self.summary(joint.sum(axis=0))
+        result["expected"] = float(sum(by_inning))
+        result["by_inning"] = np.array(by_inning)
+        return result
+
+def slot_matrices(batters, policy=None, ball_odds=0.5):
+    """
+    Plate appearance moves between the 24 base/out states for each batter.
+
+    States are numbered outs * 8 + bases. These tables are all
+    batch_games() needs, so they can be built once for a roster and shared.
+
+    Parameters:
+        batters (lst): Batter objects.
+        policy (func): Called as policy(balls, strikes, outs, bases).
+        ball_odds (float): Chance a watched pitch is a ball.
+
+    Returns:
+        moves (array): Shape (batters, 24, 25); probability of moving from
+                       each state to each other, with the third out last.
+        runs (array): Shape (batters, 24); expected runs scored by the
+                      plate appearance in each state.
+    """
+    moves = np.zeros((len(batters), 24, 25))
+    runs = np.zeros((len(batters), 24))
+    for row, batter in enumerate(batters):
+        for outs in range(3):
+            for bases in range(8):
+                src = outs * 8 + bases
+                ends = plate_appearance(batter.odds, policy, outs, bases,
+                                        ball_odds)
+                for prob, new_outs, moved, scored in slot_moves(outs, bases,
+                                                                ends):
+                    dst = 24 if new_outs == 3 else new_outs * 8 + moved
+                    moves[row, src, dst] += prob
+                    runs[row, src] += prob * scored
+    return moves, runs
+
+def batch_games(moves, runs, orders, innings=9, tol=1e-12):
+    """
+    Expected runs per game for many fixed batting orders at once.
+
+    Starting from each leadoff slot, the batter at the plate after k plate
+    appearances is known, so every inning is a walk over the 24 base/out
+    states that runs for all orders and leadoffs in step.
+
+    Parameters:
+        moves (array): From slot_matrices().
+        runs (array): From slot_matrices().
+        orders (array): Shape (lineups, size); rows of moves for each
+                        batting order.
+        innings (int): Number of innings the team bats.
+        tol (float): Stop following an inning once less probability than
+                     this is still live.
+
+    Returns:
+        (array): Expected runs per game for each order.
+    """
+    orders = np.atleast_2d(np.asarray(orders, dtype=np.int64))
+    lineups, size = orders.shape
+    slots = np.arange(size)
+    # Expected runs and next leadoff for an inning led off by each slot.
+    expected = np.zeros((lineups, size))
+    following = np.zeros((lineups, size, size))
+    mass = np.zeros((lineups, size, 24))
+    mass[:, :, 0] = 1.0
+    step = 0
+    while mass.sum(axis=2).max() > tol:
+        up = orders[:, (slots + step) % size]
+        after = np.empty((lineups, size, 25))
+        for player in np.unique(up):
+            at_plate = up == player
+            live = mass[at_plate]
+            expected[at_plate] += live @ runs[player]
+            after[at_plate] = live @ moves[player]
+        following[:, slots, (slots + step + 1) % size] += after[:, :, 24]
+        mass = after[:, :, :24]
+        step += 1
+    lead = np.zeros((lineups, size))
+    lead[:, 0] = 1.0
+    total = np.zeros(lineups)
+    for inning in range(innings):
+        total += (lead * expected).sum(axis=1)
+        lead = np.einsum("ls,lst->lt", lead, following)
+    return total
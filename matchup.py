@@ -0,0 +1,208 @@
+"""
+Pitcher odds and the batter-vs-pitcher matchup table.
+
+The workbook only has batters; every game is pitched by Benny 'The Jet'
+Rodriguez, who throws a ball half the time and leaves the batter's odds
+alone. This module adds real pitchers. A PitcherTable holds, for each
+pitcher, the rate of each outcome (the RosterTable.ODDS columns) against
+them, and the chance a pitch they throw is a ball.
+
+A batter's odds against a pitcher come from the log5 method, in its
+odds-ratio form for many outcomes: each outcome's chance is
+    batter rate * pitcher rate / league rate
+scaled so the batter's total stays what it was. A pitcher who allows
+league rates leaves the batter as they are; one who gives up twice the
+league's home runs doubles every batter's home run odds, before scaling.
+If the pitcher data has no "Ball%" column, the ball odds come from the
+same formula applied to the pitcher's walk rate against a 50% base.
+
+Matchups works out every batter against every pitcher at once with
+NumPy, and keeps one RosterTable per pitcher of the results. A Pitcher
+made from it carries that table, and AtBat looks up the batter's row once
+per plate appearance, so no pitch does any arithmetic. Relief pitchers
+wait in Field.bullpen, and Field.change_pitcher() brings one in for the
+next batter.
+
+Pitcher data is a .csv or workbook with Name, Team and the odds columns,
+e.g. made by ingest.py with --player-column set to the pitcher's column.
+
+Example:
+    matchups = Matchups(files, PitcherTable.load("pitchers.csv"))
+    engine = Engine(team="Red Sox", policy=always_swing, files=files)
+    starter = matchups.pitcher("Gerrit Cole", engine.field, start=True)
+    reliever = matchups.pitcher("Aroldis Chapman", engine.field)
+"""
+import numpy as np
+
+import roster_cache
+from Smith_BaseballSim import Pitcher, RosterTable
+
+# Chance a pitch is a ball for a pitcher with league walk rates.
+BALL_ODDS = 0.5
+
+def league_odds(files):
+    """
+    Returns (array) the league's rate of each outcome: the average of the
+    batters' odds, weighted by their plate appearances if known.
+    """
+    weights = files.columns.get("PA")
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+        if not weights.sum() > 0:
+            weights = None
+    return np.average(files.table.odds, axis=0, weights=weights)
+
+def log5(batter, pitcher, league):
+    """
+    Combines batter and pitcher rates with the log5 method.
+
+    Parameters:
+        batter (array): Shape (batters, 8); RosterTable.ODDS columns.
+        pitcher (array): Shape (pitchers, 8).
+        league (array): Shape (8,).
+
+    Returns:
+        (array): Shape (batters, pitchers, 8); each batter's odds against
+        each pitcher, with the batter's own total.
+    """
+    scale = np.divide(1.0, league, out=np.zeros_like(league),
+                      where=league > 0)
+    odds = batter[:, None, :] * (pitcher * scale)[None, :, :]
+    total = odds.sum(axis=2, keepdims=True)
+    odds *= np.divide(batter.sum(axis=1)[:, None, None], total,
+                      out=np.zeros_like(total), where=total > 0)
+    return odds
+
+def ball_odds(walk, league_walk, base=BALL_ODDS):
+    """Returns (array) each pitcher's ball odds from their walk rate."""
+    ratio = base * walk / league_walk
+    return ratio / (ratio + (1 - base) * (1 - walk) / (1 - league_walk))
+
+class PitcherTable:
+    """
+    Class to hold the odds of many pitchers in contiguous arrays.
+
+    Attributes:
+        names (lst): Pitcher names, one per row.
+        teams (lst): Pitcher teams, or None.
+        odds (array): Shape (pitchers, 8); outcome rates against each
+                      pitcher, in RosterTable.ODDS order.
+        ball_odds (array): Chance each pitcher's pitch is a ball, or None
+                           to work it out from their walk rate.
+    """
+
+    def __init__(self, names, odds, ball_odds=None, teams=None):
+        """
+        Constructor for PitcherTable class.
+
+        Parameters:
+            names (lst): Pitcher names.
+            odds (array): One row per pitcher, RosterTable.ODDS columns.
+            ball_odds (array): One per pitcher, or None.
+            teams (lst): One per pitcher, or None.
+        """
+        self.names = list(names)
+        self.teams = None if teams is None else list(teams)
+        self.odds = np.ascontiguousarray(odds, dtype=np.float64).reshape(
+            len(self.names), len(RosterTable.ODDS))
+        self.ball_odds = None if ball_odds is None else \
+            np.asarray(ball_odds, dtype=np.float64)
+        self.rows = {name : row for row, name in enumerate(self.names)}
+
+    def __len__(self):
+        """Returns (int) number of pitchers in the table."""
+        return len(self.names)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads pitcher odds through the roster cache.
+
+        Parameters:
+            path (str): .csv or workbook with Name, the odds columns and
+                        optionally Team and Ball%.
+
+        Returns:
+            (obj): PitcherTable.
+        """
+        columns = roster_cache.load(path)
+        odds = np.column_stack([columns[key + "%"] for key in
+                                RosterTable.ODDS])
+        teams = columns.get("Team")
+        return cls(columns["Name"].tolist(), odds, columns.get("Ball%"),
+                   None if teams is None else teams.tolist())
+
+class Matchups:
+    """
+    Class to hold every batter's odds against every pitcher.
+
+    Attributes:
+        batters (obj): RosterTable of the batters, e.g. Files.table.
+        pitchers (obj): PitcherTable.
+        league (array): League rate of each outcome.
+        odds (array): Shape (batters, pitchers, 8); log5 odds.
+        ball_odds (array): Chance each pitcher's pitch is a ball.
+        tables (dict): Pitcher row to the RosterTable of the batters'
+                       odds against them, made on first use.
+    """
+
+    def __init__(self, files, pitchers, league=None):
+        """
+        Constructor for Matchups class; computes the whole table.
+
+        Parameters:
+            files (obj): Instance of Files class.
+            pitchers (obj): PitcherTable.
+            league (array): League rates; by default league_odds(files).
+        """
+        self.batters = files.table
+        self.pitchers = pitchers
+        if league is None:
+            league = league_odds(files)
+        self.league = np.asarray(league, dtype=np.float64)
+        self.odds = log5(self.batters.odds, pitchers.odds, self.league)
+        if pitchers.ball_odds is not None:
+            self.ball_odds = pitchers.ball_odds
+        else:
+            walk = RosterTable.ODDS.index("BB")
+            self.ball_odds = ball_odds(pitchers.odds[:, walk],
+                                       self.league[walk])
+        self.tables = {}
+
+    def row(self, pitcher):
+        """Returns (int) a pitcher's row, from their name or row."""
+        if isinstance(pitcher, str):
+            try:
+                return self.pitchers.rows[pitcher]
+            except KeyError:
+                raise ValueError("No pitcher named " + repr(pitcher) + ".")
+        return int(pitcher)
+
+    def table(self, pitcher):
+        """Returns (obj) the RosterTable of every batter against a
+        pitcher, given by name or row."""
+        row = self.row(pitcher)
+        if row not in self.tables:
+            self.tables[row] = RosterTable(self.batters.names,
+                                           self.odds[:, row])
+        return self.tables[row]
+
+    def pitcher(self, pitcher, field, start=False):
+        """
+        Makes a Pitcher who uses the matchup odds, in a field's bullpen.
+
+        Parameters:
+            pitcher (str): Name (or row) of the pitcher.
+            field (obj): Field or BitField the batters facing them are on.
+            start (bool): True to put them on the mound now; otherwise they
+                          wait in the bullpen for Field.change_pitcher().
+
+        Returns:
+            (obj): The Pitcher.
+        """
+        row = self.row(pitcher)
+        made = Pitcher(self.pitchers.names[row], field,
+                       float(self.ball_odds[row]), self.table(row))
+        if start:
+            field.change_pitcher(made)
+        return made
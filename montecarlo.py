@@ -0,0 +1,468 @@
+"""
+Monte Carlo runs that play games until the answer is precise enough.
+
+Instead of a game count chosen up front, estimate() plays headless games a
+chunk at a time and keeps streaming accumulators of what comes out:
+    runs      home runs per game
+    allowed   opponent runs per game
+    win       chance the home team wins (a tie counts as half a win)
+    average   each batter's hits per at bat
+    rbis      each batter's RBIs per game
+Means and variances are updated with Welford's method (merged a chunk at
+a time), so memory does not grow with the number of games. After each
+chunk the confidence interval of every target is checked; the run stops
+as soon as they are all narrower than the precision asked for, or when
+the time budget or game limit runs out.
+
+compare() does the same for the difference between two lineups, with
+common random numbers: game i of both lineups is played on the same
+random stream, so much of the luck they share cancels out of the
+difference.
+
+Example:
+    python montecarlo.py "Red Sox" --precision 0.02 --budget 60
+    python montecarlo.py "Red Sox" --compare 8,7,6,5,4,3,2,1,0
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import streams
+from Smith_BaseballSim import Engine, Files, always_swing, always_watch
+
+# Games played between checks of the confidence intervals.
+CHUNK = 1000
+
+class Running:
+    """
+    Class to keep the running mean and variance of a stream of values.
+
+    Attributes:
+        count (int): Values added so far.
+        mean (array): Mean of the values, one per output.
+        m2 (array): Sum of squared differences from the mean.
+    """
+
+    def __init__(self, shape=()):
+        """
+        Constructor for Running class.
+
+        Parameters:
+            shape (tup): Shape of each value, e.g. (9,) for one per batter.
+        """
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def add(self, values):
+        """
+        Adds a batch of values, merging its mean and variance into the
+        running ones (Chan et al.'s form of Welford's update).
+
+        Parameters:
+            values (array): Shape (values,) + shape.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        count = len(values)
+        if not count:
+            return
+        mean = values.mean(axis=0)
+        self.merge(count, mean, ((values - mean) ** 2).sum(axis=0))
+
+    def merge(self, count, mean, m2):
+        """Adds another accumulator's count, mean and m2 into this one."""
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / total
+        self.mean = self.mean + delta * count / total
+        self.count = total
+
+    def variance(self):
+        """Returns (array) the sample variance; NaN before two values."""
+        if self.count < 2:
+            return np.full(np.shape(self.mean), np.nan)
+        return self.m2 / (self.count - 1)
+
+    def error(self):
+        """Returns (array) the standard error of the mean."""
+        return np.sqrt(self.variance() / max(self.count, 1))
+
+class RunningRatio:
+    """
+    Class to keep a running ratio of two totals, like hits per at bat,
+    with its standard error by the delta method.
+
+    Attributes:
+        top (obj): Running of the numerator, e.g. hits per game.
+        bottom (obj): Running of the denominator, e.g. at bats per game.
+        comoment (array): Sum of products of both differences from the
+                          mean, for their covariance.
+    """
+
+    def __init__(self, shape=()):
+        """
+        Constructor for RunningRatio class.
+
+        Parameters:
+            shape (tup): Shape of each value, e.g. (9,) for one per batter.
+        """
+        self.top = Running(shape)
+        self.bottom = Running(shape)
+        self.comoment = np.zeros(shape)
+
+    def add(self, top, bottom):
+        """
+        Adds a batch of numerators and denominators.
+
+        Parameters:
+            top (array): Shape (values,) + shape.
+            bottom (array): Same shape as top.
+        """
+        top = np.asarray(top, dtype=np.float64)
+        bottom = np.asarray(bottom, dtype=np.float64)
+        count = len(top)
+        if not count:
+            return
+        top_mean, bottom_mean = top.mean(axis=0), bottom.mean(axis=0)
+        before = self.top.count
+        total = before + count
+        self.comoment = self.comoment + ((top - top_mean) *
+                                         (bottom - bottom_mean)).sum(axis=0) \
+            + (top_mean - self.top.mean) * (bottom_mean - self.bottom.mean) \
+            * before * count / total
+        self.top.merge(count, top_mean, ((top - top_mean) ** 2).sum(axis=0))
+        self.bottom.merge(count, bottom_mean,
+                          ((bottom - bottom_mean) ** 2).sum(axis=0))
+
+    @property
+    def count(self):
+        """Returns (int) values added so far."""
+        return self.top.count
+
+    @property
+    def mean(self):
+        """Returns (array) the ratio of the totals."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.top.mean / self.bottom.mean
+
+    def error(self):
+        """Returns (array) the standard error of the ratio."""
+        if self.count < 2:
+            return np.full(np.shape(self.top.mean), np.nan)
+        ratio = self.mean
+        covariance = self.comoment / (self.count - 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = (self.top.variance() - 2 * ratio * covariance +
+                        ratio ** 2 * self.bottom.variance()) / \
+                (self.count * self.bottom.mean ** 2)
+        return np.sqrt(np.maximum(variance, 0.0))
+
+class Tally:
+    """
+    Class to hold the accumulators of every output for one lineup.
+
+    Attributes:
+        names (lst): Batter names in batting order.
+        outputs (dict): Output name to its Running or RunningRatio.
+    """
+
+    def __init__(self, names):
+        """
+        Constructor for Tally class.
+
+        Parameters:
+            names (lst): Batter names in batting order.
+        """
+        self.names = list(names)
+        size = (len(self.names),)
+        self.outputs = {"runs" : Running(), "allowed" : Running(),
+                        "win" : Running(), "average" : RunningRatio(size),
+                        "rbis" : Running(size)}
+
+    @property
+    def games(self):
+        """Returns (int) games added so far."""
+        return self.outputs["runs"].count
+
+    def add(self, played):
+        """Adds the arrays of a chunk of games, from play()."""
+        runs, allowed = played["runs"], played["opponent_runs"]
+        self.outputs["runs"].add(runs)
+        self.outputs["allowed"].add(allowed)
+        self.outputs["win"].add((runs > allowed) + 0.5 * (runs == allowed))
+        self.outputs["average"].add(played["hits"], played["atbats"])
+        self.outputs["rbis"].add(played["rbis"])
+
+    def summary(self, confidence=0.95):
+        """
+        Returns the estimates so far.
+
+        Parameters:
+            confidence (float): Coverage of the intervals, e.g. 0.95.
+
+        Returns:
+            (dict): Output name to "mean", "error" and "low" and "high"
+            ends of the interval; floats, or lists by batter.
+        """
+        z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        summary = {}
+        for name, output in self.outputs.items():
+            mean, error = output.mean, output.error()
+            values = {"mean" : mean, "error" : error, "low" : mean - z * error,
+                      "high" : mean + z * error}
+            summary[name] = {key : value.tolist() for key, value in
+                             values.items()}
+        return summary
+
+    def half_width(self, name, confidence=0.95):
+        """Returns (float) the widest interval half-width of an output."""
+        z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        error = self.outputs[name].error()
+        if np.any(np.isnan(error)):
+            return np.inf
+        return float(np.max(z * error))
+
+def play(engine, games, seed, chunk, first, batched):
+    """
+    Plays one chunk of games.
+
+    Parameters:
+        engine (obj): Headless instance of Engine class.
+        games (int): Games in the chunk.
+        seed (int): Root seed of the whole run.
+        chunk (int): Number of the chunk, for the batched games' stream.
+        first (int): Number of the chunk's first game, for the games'
+                     own streams.
+        batched (bool): True to play the chunk with
+                        Engine.simulate_batch().
+
+    Returns:
+        (dict): Arrays "runs" and "opponent_runs" per game, and "hits",
+        "atbats" and "rbis" of shape (games, batters).
+    """
+    size = len(engine.order)
+    if batched:
+        rng = np.random.default_rng(streams.game_sequence(seed, chunk))
+        played = engine.simulate_batch(games, rng)
+        lines = played["lines"][:, 0, :size]
+        return {"runs" : played["runs"],
+                "opponent_runs" : played["opponent_runs"],
+                "atbats" : lines[:, :, 0], "hits" : lines[:, :, 1],
+                "rbis" : lines[:, :, 2]}
+    results = engine.simulate(games, seed, first)
+    lines = np.array([[(batter["atbats"], batter["hits"], batter["rbis"])
+                       for batter in result["batters"]]
+                      for result in results]).reshape(games, size, 3)
+    return {"runs" : np.array([result["runs"] for result in results]),
+            "opponent_runs" : np.array([result["opponent_runs"] for
+                                        result in results]),
+            "atbats" : lines[:, :, 0], "hits" : lines[:, :, 1],
+            "rbis" : lines[:, :, 2]}
+
+def can_batch(engine):
+    """Returns (bool) True if the engine's games can be played batched."""
+    return engine.visitors is not None and \
+        engine.policy in (always_swing, always_watch)
+
+def stop_reason(widths, precision, games, max_games, begin, budget,
+                min_games):
+    """Returns (str) why a run should stop now, or None to go on."""
+    if games >= min_games and all(width <= precision for width in widths):
+        return "precision"
+    if games >= max_games:
+        return "games"
+    if budget is not None and time.perf_counter() - begin >= budget:
+        return "budget"
+    return None
+
+def estimate(engine, precision=0.05, confidence=0.95, budget=None,
+             targets=("runs", "win"), chunk=CHUNK, max_games=10 ** 7,
+             min_games=None, seed=0, batched=None, progress=None):
+    """
+    Plays games until every target is known to the precision asked for.
+
+    Parameters:
+        engine (obj): Headless instance of Engine class.
+        precision (float): Largest half-width of the confidence interval
+                           of each target, e.g. 0.05 runs.
+        confidence (float): Coverage of the intervals.
+        budget (float): Seconds to stop after, even if not precise yet;
+                        None for no limit.
+        targets (tup): Outputs that must reach the precision: "runs",
+                       "allowed", "win", "average" or "rbis" (for the
+                       last two, every batter's).
+        chunk (int): Games between checks.
+        max_games (int): Most games to play.
+        min_games (int): Fewest games before stopping for precision;
+                         defaults to two chunks, so the variance has
+                         settled a little.
+        seed (int): Root seed; game i is played on
+                    streams.game_rng(seed, i), or chunk i of batched games
+                    on its own stream.
+        batched (bool): True to play with Engine.simulate_batch(); by
+                        default, whenever the engine can.
+        progress (func): Called as progress(tally, seconds) after each
+                         chunk.
+
+    Returns:
+        (dict): The summary() of every output, plus "games" played,
+        "seconds", and "stopped": "precision", "budget" or "games".
+    """
+    if batched is None:
+        batched = can_batch(engine)
+    if min_games is None:
+        min_games = 2 * chunk
+    tally = Tally([batter.name for batter in engine.order])
+    begin = time.perf_counter()
+    number = 0
+    while True:
+        size = min(chunk, max_games - tally.games)
+        tally.add(play(engine, size, seed, number, tally.games, batched))
+        number += 1
+        if progress is not None:
+            progress(tally, time.perf_counter() - begin)
+        widths = [tally.half_width(name, confidence) for name in targets]
+        stopped = stop_reason(widths, precision, tally.games, max_games,
+                              begin, budget, min_games)
+        if stopped is not None:
+            break
+    results = tally.summary(confidence)
+    results.update({"games" : tally.games, "stopped" : stopped,
+                    "seconds" : time.perf_counter() - begin})
+    return results
+
+def compare(engine, other, precision=0.05, confidence=0.95, budget=None,
+            chunk=CHUNK, max_games=10 ** 7, min_games=None, seed=0,
+            batched=None, progress=None):
+    """
+    Estimates how many more runs per game one lineup scores than another,
+    using common random numbers.
+
+    Both engines play game i (or batched chunk i) on the same random
+    stream, and the difference is tracked game by game, so luck the two
+    lineups share cancels out of it. One game at a time, the streams stay
+    in step for a while and the variance drops by about half; batched
+    games fall out of step at once, so the gain there is small. The
+    "reduction" returned says how much it helped.
+
+    Parameters:
+        engine (obj): Headless Engine of the first lineup.
+        other (obj): Headless Engine of the second lineup.
+        precision (float): Largest half-width of the interval of the
+                           difference in runs per game.
+        Others as in estimate().
+
+    Returns:
+        (dict): "difference" in runs per game with its "mean", "error",
+        "low" and "high"; the "first" and "second" lineups' summary();
+        "reduction", the variance of the difference if the games had been
+        independent divided by its actual variance; "games", "seconds" and
+        "stopped".
+    """
+    if batched is None:
+        batched = can_batch(engine) and can_batch(other)
+    if min_games is None:
+        min_games = 2 * chunk
+    tallies = [Tally([batter.name for batter in lineup.order])
+               for lineup in (engine, other)]
+    difference = Running()
+    begin = time.perf_counter()
+    number = 0
+    while True:
+        size = min(chunk, max_games - difference.count)
+        played = [play(lineup, size, seed, number, difference.count, batched)
+                  for lineup in (engine, other)]
+        for tally, games in zip(tallies, played):
+            tally.add(games)
+        difference.add(played[0]["runs"] - played[1]["runs"])
+        number += 1
+        if progress is not None:
+            progress(tallies[0], time.perf_counter() - begin)
+        z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        width = z * float(difference.error())
+        if np.isnan(width):
+            width = np.inf
+        stopped = stop_reason([width], precision, difference.count,
+                              max_games, begin, budget, min_games)
+        if stopped is not None:
+            break
+    mean, error = float(difference.mean), float(difference.error())
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    independent = sum(tally.outputs["runs"].variance() for tally in tallies)
+    return {"difference" : {"mean" : mean, "error" : error,
+                            "low" : mean - z * error,
+                            "high" : mean + z * error},
+            "first" : tallies[0].summary(confidence),
+            "second" : tallies[1].summary(confidence),
+            "reduction" : float(independent / difference.variance()),
+            "games" : difference.count, "stopped" : stopped,
+            "seconds" : time.perf_counter() - begin}
+
+def main():
+    """Command line entry point; estimates or compares lineups."""
+    parser = argparse.ArgumentParser(description="Play games until runs " +
+                                     "per game and win odds are precise.")
+    parser.add_argument("team", help="Team name, without the city.")
+    parser.add_argument("--order", default=None,
+                        help="Batting order, e.g. 0,1,2,3,4,5,6,7,8.")
+    parser.add_argument("--compare", default=None, metavar="ORDER",
+                        help="Second batting order to compare against.")
+    parser.add_argument("--opponent", default=None,
+                        help="Real opposing team; batched games if given.")
+    parser.add_argument("--precision", type=float, default=0.05)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Seconds to stop after.")
+    parser.add_argument("--chunk", type=int, default=CHUNK)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    files = Files()
+    orders = [args.order]
+    if args.compare is not None:
+        orders.append(args.compare)
+    engines = [Engine(team=args.team, policy=always_swing, files=files,
+                      opponent_team=args.opponent,
+                      order=None if order is None else
+                      [int(number) for number in order.split(",")])
+               for order in orders]
+
+    def progress(tally, seconds):
+        runs = tally.outputs["runs"]
+        sys.stderr.write("\r{:,} games, {:.3f} +/- {:.3f} runs, {:.1f} s"
+                         .format(tally.games, float(runs.mean),
+                                 float(runs.error()), seconds))
+        sys.stderr.flush()
+
+    options = dict(precision=args.precision, confidence=args.confidence,
+                   budget=args.budget, chunk=args.chunk, seed=args.seed,
+                   progress=progress)
+    if len(engines) == 2:
+        result = compare(engines[0], engines[1], **options)
+        sys.stderr.write("\n")
+        difference = result["difference"]
+        print("Runs per game, first minus second: {:+.3f} ({:.3f} to "
+              "{:.3f}) after {:,} games ({}); common random numbers cut "
+              "the variance {:.2f}x.".format(
+                  difference["mean"], difference["low"], difference["high"],
+                  result["games"], result["stopped"], result["reduction"]))
+        return
+    result = estimate(engines[0], **options)
+    sys.stderr.write("\n")
+    print("Stopped on {} after {:,} games in {:.1f} s.".format(
+        result["stopped"], result["games"], result["seconds"]))
+    for name in ("runs", "allowed", "win"):
+        print('{:<8s}{:>8.3f}  ({:.3f} to {:.3f})'.format(
+              name, result[name]["mean"], result[name]["low"],
+              result[name]["high"]))
+    for number, batter in enumerate(engines[0].order):
+        print('{:<24s}{:>6.3f} +/- {:.3f} AVG {:>6.3f} RBI/game'.format(
+              batter.name, result["average"]["mean"][number],
+              result["average"]["error"][number],
+              result["rbis"]["mean"][number]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Batting order optimizer that searches lineups for a team across all cores.
+
+Every candidate is scored with markov.batch_games(), the exact expected
+runs per game for a fixed batting order, so no games are simulated. The
+search runs in two phases:
+    1. Subsets: every group of batters is scored in one canonical order
+       (best single batter first) and the most promising groups are kept.
+    2. Orders: every batting order of each kept group is scored, best
+       group first, until the search is done or the time budget runs out.
+
+Obviously dominated candidates are skipped. A batter is dominated by a
+teammate who is at least as likely to get every kind of hit and walk and no
+more likely to make an out. Groups that leave out a dominating teammate in
+favour of the batter they dominate are pruned, and so are orders where a
+dominated batter hits ahead of the teammate who dominates them.
+
+Example (nightly job):
+    python optimizer.py "Red Sox" --top 5 --budget 600
+"""
+import argparse
+import heapq
+import itertools
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+import markov
+import shared
+from Smith_BaseballSim import Files
+
+# Outcomes that help (more is better) or hurt (less is better) a batter.
+GOOD = ("BB", "HR", "3B", "2B", "1B")
+BAD = ("K", "OIP")
+OUTCOMES = GOOD + BAD
+# Orders scored per task sent to a worker.
+CHUNK = 4096
+
+# Tables each worker process attaches to once, in _start_worker().
+_worker = {}
+
+def _start_worker(handle, innings):
+    """Attaches a worker process to the shared roster tables."""
+    _worker.update(shared.attach(handle))
+    _worker["innings"] = innings
+
+def _score(orders, top):
+    """
+    Scores a chunk of orders in a worker process.
+
+    Parameters:
+        orders (array): Shape (orders, size) of roster rows.
+        top (int): Number of best orders to send back.
+
+    Returns:
+        (tup): Expected runs and orders of the best top orders in the chunk.
+    """
+    values = markov.batch_games(_worker["moves"], _worker["runs"], orders,
+                                _worker["innings"])
+    keep = np.argsort(-values)[:top]
+    return values[keep], orders[keep]
+
+def dominates(better, worse):
+    """
+    Checks if one batter's plate appearance odds dominate another's.
+
+    Parameters:
+        better (dict): Outcome odds from markov.plate_appearance().
+        worse (dict): Outcome odds from markov.plate_appearance().
+
+    Returns:
+        (bool): True if better is at least as good at everything and
+        strictly better at something.
+    """
+    at_least = all(better[key] >= worse[key] for key in GOOD) and \
+               all(better[key] <= worse[key] for key in BAD)
+    return at_least and any(better[key] != worse[key] for key in OUTCOMES)
+
+def dominance(batters, policy=None, ball_odds=0.5):
+    """
+    Finds every pair of batters where one dominates the other.
+
+    Returns:
+        (lst): (better, worse) pairs of indices into batters.
+    """
+    ends = [markov.plate_appearance(batter.odds, policy, 0, 0, ball_odds)
+            for batter in batters]
+    return [(a, b) for a in range(len(batters)) for b in range(len(batters))
+            if a != b and dominates(ends[a], ends[b])]
+
+def subsets(players, size, pairs):
+    """
+    Yields every group of batters that is not obviously dominated.
+
+    Parameters:
+        players (int): Number of batters on the roster.
+        size (int): Batters in the lineup.
+        pairs (lst): (better, worse) pairs from dominance().
+    """
+    for group in itertools.combinations(range(players), size):
+        chosen = set(group)
+        if any(worse in chosen and better not in chosen
+               for better, worse in pairs):
+            continue
+        yield group
+
+def orderings(group, pairs):
+    """
+    Yields every batting order of a group that is not obviously dominated.
+
+    Parameters:
+        group (tup): Roster indices of the batters in the lineup.
+        pairs (lst): (better, worse) pairs from dominance().
+    """
+    inside = [(better, worse) for better, worse in pairs
+              if better in group and worse in group]
+    for order in itertools.permutations(group):
+        spot = {player : number for number, player in enumerate(order)}
+        if all(spot[better] < spot[worse] for better, worse in inside):
+            yield order
+
+def chunks(iterable, size):
+    """Yields arrays of up to size rows from an iterable of orders."""
+    iterator = iter(iterable)
+    while True:
+        block = list(itertools.islice(iterator, size))
+        if not block:
+            return
+        yield np.array(block, dtype=np.int64)
+
+class Search:
+    """
+    Class to run scoring tasks in a process pool and keep the best results.
+
+    Attributes:
+        pool (obj): ProcessPoolExecutor shared by both phases.
+        workers (int): Number of worker processes.
+        deadline (float): time.monotonic() value to stop at, or None.
+        progress (func): Called as progress(phase, done, total, best).
+        evaluated (int): Orders scored so far.
+        complete (bool): False once the budget cut the search short.
+    """
+
+    def __init__(self, pool, workers, deadline, progress):
+        """Constructor for Search class."""
+        self.pool = pool
+        self.workers = workers
+        self.deadline = deadline
+        self.progress = progress
+        self.evaluated = 0
+        self.complete = True
+
+    def out_of_time(self):
+        """Returns (bool) True if the wall-clock budget is used up."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def run(self, phase, blocks, total, top):
+        """
+        Scores blocks of orders and returns the best ones.
+
+        Parameters:
+            phase (str): Name of the phase, for progress reports.
+            blocks (gen): Arrays of orders to score.
+            total (int): Number of orders expected, for progress reports.
+            top (int): Number of best orders to keep.
+
+        Returns:
+            (lst): (expected runs, order tuple) pairs, best first.
+        """
+        best = []
+        done = 0
+        pending = {}
+        blocks = iter(blocks)
+        # Keep a couple of tasks per worker in flight to bound memory.
+        while True:
+            while len(pending) < 2 * self.workers and not self.out_of_time():
+                block = next(blocks, None)
+                if block is None:
+                    break
+                pending[self.pool.submit(_score, block, top)] = len(block)
+            if not pending:
+                break
+            finished = wait(pending, return_when=FIRST_COMPLETED)[0]
+            for future in finished:
+                values, orders = future.result()
+                scored = pending.pop(future)
+                done += scored
+                self.evaluated += scored
+                for value, order in zip(values, orders):
+                    item = (float(value), tuple(int(x) for x in order))
+                    if len(best) < top:
+                        heapq.heappush(best, item)
+                    else:
+                        heapq.heappushpop(best, item)
+            if self.progress is not None:
+                self.progress(phase, done, total, max(best)[0])
+            if self.out_of_time():
+                self.complete = False
+                for future in pending:
+                    future.cancel()
+                break
+        return sorted(best, reverse=True)
+
+def optimize(team, files=None, size=9, top=10, groups=10, innings=9,
+             budget=None, workers=None, policy=None, ball_odds=0.5,
+             progress=None):
+    """
+    Searches batting orders for a team and returns the best ones found.
+
+    Parameters:
+        team (str): Team name, without the city.
+        files (obj): Instance from Files class; loaded if None.
+        size (int): Batters in the lineup, 5 to 9.
+        top (int): Number of lineups to return.
+        groups (int): Number of batter groups whose orders are searched.
+        innings (int): Innings per game used to score lineups.
+        budget (float): Wall-clock seconds to stop after, or None.
+        workers (int): Worker processes; defaults to every core.
+        policy (func): Solver policy, called as policy(balls, strikes,
+                       outs, bases); defaults to always swinging.
+        ball_odds (float): Chance a watched pitch is a ball.
+        progress (func): Called as progress(phase, done, total, best) after
+                         each finished task.
+
+    Returns:
+        (dict): "lineups" (list of dicts with "expected" runs, "names" and
+        roster "indices", best first), "evaluated" orders, "complete"
+        (False if the budget ran out) and "seconds" taken.
+
+    Raises:
+        ValueError: If the team does not have enough batters.
+    """
+    start = time.monotonic()
+    if files is None:
+        files = Files()
+    batters = files.team_roster(team)
+    if size < 5 or size > 9 or len(batters) < size:
+        raise ValueError("Can't pick " + str(size) + " batters from " +
+                         repr(team) + ".")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    moves, runs = markov.slot_matrices(batters, policy, ball_odds)
+    pairs = dominance(batters, policy, ball_odds)
+    # Best single batter first gives each group a fair canonical order.
+    rating = markov.batch_games(moves, runs, [[player] * size for player in
+                                range(len(batters))], innings)
+    rank = {player : -value for player, value in enumerate(rating)}
+    deadline = None if budget is None else start + budget
+    with shared.SharedTables({"moves" : moves, "runs" : runs}) as tables, \
+            ProcessPoolExecutor(max_workers=workers,
+                                initializer=_start_worker,
+                                initargs=(tables.handle, innings)) as pool:
+        search = Search(pool, workers, deadline, progress)
+        canonical = (sorted(group, key=rank.get) for group in
+                     subsets(len(batters), size, pairs))
+        kept = search.run("subsets", chunks(canonical, CHUNK),
+                          math.comb(len(batters), size), groups)
+        found = []
+        for value, group in kept:
+            if search.out_of_time():
+                search.complete = False
+                break
+            found.extend(search.run("orders",
+                                    chunks(orderings(group, pairs), CHUNK),
+                                    math.factorial(size), top))
+            found = sorted(set(found), reverse=True)[:top]
+        if not found:
+            found = kept[:top]
+    lineups = [{"expected" : value,
+                "names" : [batters[player].name for player in order],
+                "indices" : list(order)} for value, order in found]
+    return {"lineups" : lineups, "evaluated" : search.evaluated,
+            "complete" : search.complete,
+            "seconds" : time.monotonic() - start}
+
+def main():
+    """Command line entry point; prints the best lineups for a team."""
+    parser = argparse.ArgumentParser(description="Search batting orders " +
+                                     "for an MLB team.")
+    parser.add_argument("team", help="Team name, without the city.")
+    parser.add_argument("--size", type=int, default=9,
+                        help="Batters in the lineup (5 to 9).")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Number of lineups to print.")
+    parser.add_argument("--groups", type=int, default=10,
+                        help="Batter groups whose orders are searched.")
+    parser.add_argument("--innings", type=int, default=9)
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Wall-clock seconds to stop after.")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    def progress(phase, done, total, best):
+        sys.stderr.write("\r{}: {:,} of {:,} scored, best {:.4f} runs".
+                         format(phase, done, total, best))
+        sys.stderr.flush()
+
+    result = optimize(args.team, size=args.size, top=args.top,
+                      groups=args.groups, innings=args.innings,
+                      budget=args.budget, workers=args.workers,
+                      progress=progress)
+    sys.stderr.write("\n")
+    if not result["complete"]:
+        print("Budget ran out; showing the best lineups found so far.")
+    print("Scored " + str(result["evaluated"]) + " lineups in " +
+          "{:.1f}".format(result["seconds"]) + " seconds.")
+    for rank, lineup in enumerate(result["lineups"], 1):
+        print(str(rank) + ". {:.4f} runs: ".format(lineup["expected"]) +
+              ", ".join(lineup["names"]))
+
+if __name__ == "__main__":
+    main()
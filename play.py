@@ -0,0 +1,18 @@
+"""
+Command line entry point for the interactive game.
+
+Smith_BaseballSim is the library; this script only starts a game in the
+terminal, so importing the library never asks for input.
+
+Example:
+    python play.py
+"""
+from Smith_BaseballSim import Engine
+
+def main():
+    """Plays one interactive game in the terminal."""
+    game = Engine()
+    game.play()
+
+if __name__ == "__main__":
+    main()
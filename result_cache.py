@@ -0,0 +1,347 @@
+"""
+Cache of simulation results, so the same question is only played once.
+
+Dashboards ask for the same runs per game and win odds for the same
+lineups again and again. ResultCache sits in front of Engine.simulate(),
+Engine.simulate_batch(), montecarlo.estimate() and montecarlo.compare()
+and answers repeats from a cache with two tiers:
+    memory    the most recently used results, up to max_bytes in all;
+              the least recently used go first
+    disk      every result, as a pickle in folder/<roster>/<key>.pkl,
+              kept across runs
+A key is the SHA-256 of everything the result depends on, in a fixed
+order: each team's batter names and Batter.odds in batting order, the
+opponent (a real lineup, or the Scoreboard.other_team run model), innings,
+extra innings, the ball odds and matchup odds of the pitchers each
+lineup faces, the policy, the call and its arguments (games, seed,
+precision, ...), and VERSION.
+
+Results are stored under a fingerprint of the whole roster table, and
+opening a cache for a Files whose data has changed deletes the results of
+the old data, so a new workbook or ingest.py export never gets stale
+numbers. Use one folder per roster to keep more than one.
+
+Only calls that come out the same every time are cached: a seed is
+needed, the policy must be always_swing, always_watch, a module-level
+function or an OptimalPolicy, nothing can be listening on the sink, and a
+montecarlo run that stopped on its time budget is not kept. A bound
+method depends on its object's state, which the cache can't see, so it is
+only cached if the object has a cache_key: a string (or a method that
+returns one) that changes whenever its choices would.
+
+Example:
+    cache = ResultCache(".result_cache", files=files)
+    result = cache.estimate(engine, precision=0.02, seed=0)
+"""
+import collections
+import hashlib
+import inspect
+import json
+import numbers
+import os
+import pickle
+import shutil
+
+import montecarlo
+
+CACHE_DIR = ".result_cache"
+# Bump when the game rules change so old results are not reused.
+VERSION = 1
+# Memory tier size.
+MAX_BYTES = 64 << 20
+
+def roster_key(files):
+    """Returns (str) a fingerprint of every name and odd in the roster."""
+    table = files.table
+    digest = hashlib.sha256("\n".join(table.names).encode())
+    digest.update(table.odds.tobytes())
+    return digest.hexdigest()[:16]
+
+def code_key(code, digest):
+    """Adds a code object's bytecode, names and constants (and those of
+    any functions inside it) to a hash."""
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for constant in code.co_consts:
+        if hasattr(constant, "co_code"):
+            code_key(constant, digest)
+        else:
+            digest.update(repr(constant).encode())
+
+def policy_key(policy):
+    """
+    Names a policy so the same one gives the same key.
+
+    Returns:
+        (str): The policy's module and name with a hash of its code, so
+        editing the function makes new keys, or a hash of an
+        OptimalPolicy's choices; None if it can't be named, like a lambda
+        or a bound method of an object with no cache_key.
+    """
+    swing = getattr(policy, "swing", None)
+    if swing is not None and hasattr(swing, "tobytes"):
+        # Batters it wasn't solved for play the fallback policy.
+        fallback = policy_key(policy.fallback)
+        if fallback is None:
+            return None
+        return "table:" + hashlib.sha256(swing.tobytes()).hexdigest() + \
+            ";" + fallback
+    name = getattr(policy, "__qualname__", None)
+    if name is None or "<" in name:
+        return None
+    state = ""
+    owner = getattr(policy, "__self__", None)
+    if owner is not None:
+        # Two objects' methods share a name and code, not their choices.
+        state = getattr(owner, "cache_key", None)
+        if callable(state):
+            state = state()
+        if state is None:
+            return None
+        state = "@" + str(state)
+    digest = hashlib.sha256()
+    code = getattr(policy, "__code__", None)
+    if code is not None:
+        code_key(code, digest)
+    return policy.__module__ + "." + name + state + ":" + \
+        digest.hexdigest()[:16]
+
+def pitcher_key(pitcher):
+    """Returns (lst) a pitcher's name, ball odds and a hash of their
+    matchup odds, if any."""
+    table = None
+    if pitcher.table is not None:
+        table = hashlib.sha256(pitcher.table.odds.tobytes()).hexdigest()
+    return [pitcher.name, pitcher.ball_odds, table]
+
+def team_key(engine):
+    """Returns (dict) what one team's results depend on: its batters and
+    the pitchers they face."""
+    return {"team" : engine.scoreboard.home,
+            "batters" : [[batter.name, batter.odds] for batter in
+                         engine.order],
+            "bullpen" : [pitcher_key(pitcher) for pitcher in
+                         engine.field.bullpen]}
+
+def engine_key(engine):
+    """
+    Describes a headless engine's game for a key.
+
+    Returns:
+        (dict): The lineup, opponent and rules; None if the engine's games
+        can't be cached.
+    """
+    policy = policy_key(engine.policy)
+    if policy is None or engine.field.sink.active:
+        return None
+    if engine.visitors is None:
+        opponent = {"model" : "other_team",
+                    "name" : engine.scoreboard.opponent}
+    else:
+        opponent = team_key(engine.visitors)
+        opponent["name"] = engine.scoreboard.opponent
+    return {"home" : team_key(engine), "opponent" : opponent,
+            "innings" : engine.innings, "extras" : engine.extras,
+            "policy" : policy}
+
+def full_options(function, options):
+    """Returns (dict) a montecarlo call's options with every default
+    filled in, so leaving one out gives the same key as passing it."""
+    names = [name for name in inspect.signature(function).parameters
+             if name not in ("engine", "other")]
+    bound = inspect.signature(function).bind_partial(**options)
+    bound.apply_defaults()
+    return {name : bound.arguments[name] for name in names}
+
+class ResultCache:
+    """
+    Class to keep simulation results in memory and on disk.
+
+    Attributes:
+        folder (str): Folder of this roster's results, or None for memory
+                      only.
+        max_bytes (int): Most bytes of pickled results kept in memory.
+        size (int): Bytes of pickled results in memory now.
+        entries (OrderedDict): Key to pickled result, least recently used
+                               first.
+        hits (int): Results found in memory.
+        disk_hits (int): Results found on disk.
+        misses (int): Results that had to be played.
+    """
+
+    def __init__(self, folder=CACHE_DIR, files=None, max_bytes=MAX_BYTES):
+        """
+        Constructor for ResultCache class.
+
+        Parameters:
+            folder (str): Folder for the disk tier, or None for none.
+            files (obj): Instance of Files whose roster the results are
+                         for; results of any other roster in the folder
+                         are deleted. If None, results go straight in
+                         folder.
+            max_bytes (int): Size of the memory tier.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = collections.OrderedDict()
+        self.hits = self.disk_hits = self.misses = 0
+        self.folder = folder
+        if folder is not None and files is not None:
+            roster = roster_key(files)
+            # The roster changed since these were saved: they are stale.
+            if os.path.isdir(folder):
+                for name in os.listdir(folder):
+                    path = os.path.join(folder, name)
+                    if name != roster and os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+            self.folder = os.path.join(folder, roster)
+        if self.folder is not None:
+            os.makedirs(self.folder, exist_ok=True)
+
+    def key(self, engines, call, arguments):
+        """
+        Makes the key of one call.
+
+        Parameters:
+            engines (lst): Headless Engines the call plays.
+            call (str): Name of the call, e.g. "simulate".
+            arguments (dict): Its arguments, JSON-friendly.
+
+        Returns:
+            (str): Hex SHA-256 key, or None if the call can't be cached.
+        """
+        if arguments.get("seed") is None:
+            return None
+        games = [engine_key(engine) for engine in engines]
+        if None in games:
+            return None
+        text = json.dumps({"version" : VERSION, "call" : call,
+                           "arguments" : arguments, "games" : games},
+                          sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, key):
+        """Returns (str) the disk tier file of a key."""
+        return os.path.join(self.folder, key + ".pkl")
+
+    def get(self, key):
+        """
+        Looks a key up, in memory and then on disk.
+
+        Returns:
+            (obj): A fresh copy of the result, or None if it isn't cached.
+        """
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return pickle.loads(data)
+        if self.folder is None:
+            return None
+        try:
+            with open(self.path(key), "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        self.disk_hits += 1
+        self.remember(key, data)
+        return pickle.loads(data)
+
+    def put(self, key, result):
+        """Stores a result in both tiers."""
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        self.remember(key, data)
+        if self.folder is not None:
+            temporary = self.path(key) + ".tmp"
+            with open(temporary, "wb") as file:
+                file.write(data)
+            os.replace(temporary, self.path(key))
+
+    def remember(self, key, data):
+        """Puts pickled data in memory, dropping the least recently used."""
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        if len(data) > self.max_bytes:
+            return
+        self.entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            self.size -= len(self.entries.popitem(last=False)[1])
+
+    def clear(self):
+        """Empties both tiers."""
+        self.entries.clear()
+        self.size = 0
+        if self.folder is not None:
+            for name in os.listdir(self.folder):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(self.folder, name))
+
+    def cached(self, engines, call, arguments, play, keep=None):
+        """
+        Returns a call's result from the cache, or plays and stores it.
+
+        Parameters:
+            engines (lst): Headless Engines the call plays.
+            call (str): Name of the call.
+            arguments (dict): Its arguments.
+            play (func): Called with no arguments to get the result.
+            keep (func): Called with the result; False to not store it.
+
+        Returns:
+            (obj): The result.
+        """
+        key = self.key(engines, call, arguments)
+        if key is not None:
+            result = self.get(key)
+            if result is not None:
+                return result
+        self.misses += 1
+        result = play()
+        if key is not None and (keep is None or keep(result)):
+            self.put(key, result)
+        return result
+
+    def simulate(self, engine, games=1, seed=0, first=0):
+        """Engine.simulate(), cached; see there."""
+        return self.cached([engine], "simulate", {"games" : games,
+                                                  "seed" : seed,
+                                                  "first" : first},
+                           lambda: engine.simulate(games, seed, first))
+
+    def simulate_batch(self, engine, games, seed=0, swing=None):
+        """Engine.simulate_batch(), cached when seed is an integer; any
+        other seed (a Generator, say) is played but not kept."""
+        choices = swing.tolist() if hasattr(swing, "tolist") else swing
+        # The call always gets the caller's seed; only the key needs an int.
+        key_seed = int(seed) if isinstance(seed, numbers.Integral) else None
+        return self.cached([engine], "simulate_batch", {"games" : games,
+                                                        "seed" : key_seed,
+                                                        "swing" : choices},
+                           lambda: engine.simulate_batch(games, seed, swing))
+
+    def estimate(self, engine, **options):
+        """montecarlo.estimate(), cached; takes the same options."""
+        options = full_options(montecarlo.estimate, options)
+        if options["batched"] is None:
+            options["batched"] = montecarlo.can_batch(engine)
+        progress = options.pop("progress")
+        return self.cached([engine], "estimate", options,
+                           lambda: montecarlo.estimate(engine,
+                                                       progress=progress,
+                                                       **options),
+                           lambda result: result["stopped"] != "budget")
+
+    def compare(self, engine, other, **options):
+        """montecarlo.compare(), cached; takes the same options."""
+        options = full_options(montecarlo.compare, options)
+        if options["batched"] is None:
+            options["batched"] = montecarlo.can_batch(engine) and \
+                montecarlo.can_batch(other)
+        progress = options.pop("progress")
+        return self.cached([engine, other], "compare", options,
+                           lambda: montecarlo.compare(engine, other,
+                                                      progress=progress,
+                                                      **options),
+                           lambda result: result["stopped"] != "budget")
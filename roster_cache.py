@@ -0,0 +1,133 @@
+"""
+Columnar cache of the batter spreadsheet so it is only parsed once.
+
+Reading "Baseball simulator.xlsx" with pandas and openpyxl is the slowest
+part of starting a game. The first load converts every column to a NumPy
+.npy file in a cache folder next to the workbook; later loads memory-map
+those files instead, which takes a few milliseconds.
+
+The cache remembers the workbook's modification time, size and SHA-256
+hash. If the time or size changed, the hash is checked, and the cache is
+only rebuilt when the contents really changed.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+CACHE_DIR = ".roster_cache"
+# Bump when the cache layout changes so old caches are rebuilt.
+VERSION = 1
+
+def file_hash(path):
+    """Returns (str) the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_folder(path, cache_dir=None):
+    """Returns (str) the cache folder for a workbook."""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)),
+                                 CACHE_DIR)
+    return os.path.join(cache_dir, os.path.basename(path))
+
+def read_source(path):
+    """
+    Reads the workbook (or a .csv file) into NumPy columns with pandas.
+
+    Returns:
+        (dict): Column name to array, in spreadsheet order.
+    """
+    import pandas as pd
+    if path.lower().endswith(".csv"):
+        frame = pd.read_csv(path)
+    else:
+        frame = pd.read_excel(path)
+    columns = {}
+    for name in frame.columns:
+        values = frame[name].to_numpy()
+        if values.dtype.kind in "OUS":
+            values = values.astype(str)
+        columns[str(name)] = values
+    return columns
+
+def write(folder, columns, stamp):
+    """
+    Writes columns and their source stamp to a cache folder.
+
+    Files are written to a temporary folder first and moved into place, so
+    a half-written cache is never read.
+    """
+    temporary = folder + ".tmp" + str(os.getpid())
+    os.makedirs(temporary, exist_ok=True)
+    names = list(columns)
+    for number, name in enumerate(names):
+        np.save(os.path.join(temporary, str(number) + ".npy"), columns[name])
+    meta = dict(stamp, version=VERSION, columns=names)
+    with open(os.path.join(temporary, "meta.json"), "w") as file:
+        json.dump(meta, file)
+    if os.path.isdir(folder):
+        shutil.rmtree(folder, ignore_errors=True)
+    os.replace(temporary, folder)
+
+def read_meta(folder):
+    """Returns (dict) the cache's meta.json, or None if it is unreadable."""
+    try:
+        with open(os.path.join(folder, "meta.json")) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != VERSION:
+        return None
+    return meta
+
+def load(path, cache_dir=None):
+    """
+    Loads the workbook's columns, from the cache when it is current.
+
+    Parameters:
+        path (str): Workbook (.xlsx) or .csv file of batter odds.
+        cache_dir (str): Folder for caches; defaults to .roster_cache next
+                         to the workbook.
+
+    Returns:
+        (dict): Column name to read-only, memory-mapped NumPy array.
+    """
+    folder = cache_folder(path, cache_dir)
+    info = os.stat(path)
+    stamp = {"mtime_ns" : info.st_mtime_ns, "size" : info.st_size}
+    meta = read_meta(folder)
+    fresh = meta is not None and meta["mtime_ns"] == stamp["mtime_ns"] \
+        and meta["size"] == stamp["size"]
+    if not fresh:
+        stamp["sha256"] = file_hash(path)
+        if meta is not None and meta.get("sha256") == stamp["sha256"]:
+            # Touched but not changed: just remember the new time. The
+            # cache is still good if that can't be written.
+            meta.update(stamp)
+            temporary = os.path.join(folder, "meta.json.tmp" +
+                                     str(os.getpid()))
+            try:
+                with open(temporary, "w") as file:
+                    json.dump(meta, file)
+                os.replace(temporary, os.path.join(folder, "meta.json"))
+            except OSError:
+                pass
+        else:
+            try:
+                write(folder, read_source(path), stamp)
+            except OSError:
+                # No write access next to the workbook: use it directly.
+                return read_source(path)
+            meta = read_meta(folder)
+            if meta is None:
+                # Another process replaced the cache as it was written.
+                return read_source(path)
+    return {name : np.load(os.path.join(folder, str(number) + ".npy"),
+                           mmap_mode="r")
+            for number, name in enumerate(meta["columns"])}
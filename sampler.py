@@ -0,0 +1,182 @@
+"""
+Vectorized pitch sampler for running many at bats at once with NumPy.
+
+AtBat.swing() and AtBat.watch() decide one pitch at a time. The functions
+here draw the same outcomes for whole arrays of pitches: each batter's swing
+odds become a row of cumulative thresholds and np.searchsorted finds where
+every random number lands.
+
+Counts are coded as one number, balls * 3 + strikes, so there are 12 count
+states from 0 (0 balls, 0 strikes) to 11 (3 balls, 2 strikes).
+"""
+import numpy as np
+
+# At bat statuses, in the same words the AtBat class uses.
+STATUSES = ("Batting", "Strike out", "Walk", "Out in play", "Home run",
+            "Single", "Double", "Triple")
+BATTING, STRIKE_OUT, WALK, OUT_IN_PLAY, HOME_RUN, SINGLE, DOUBLE, TRIPLE = \
+    range(len(STATUSES))
+
+# Swing outcomes in the order AtBat.swing() checks them. The first one, a
+# strike, keeps the at bat going; the rest end it.
+SWING_ORDER = ("K", "OIP", "HR", "1B", "2B", "3B")
+SWING_STATUS = np.array([BATTING, OUT_IN_PLAY, HOME_RUN, SINGLE, DOUBLE,
+                         TRIPLE], dtype=np.int8)
+
+COUNTS = 12
+# Most pitches an at bat can take: 3 balls, 2 strikes and the last pitch.
+MAX_PITCHES = 6
+
+def count_code(balls, strikes):
+    """Returns the count code (int or array) for balls and strikes."""
+    return balls * 3 + strikes
+
+def swing_table(batters):
+    """
+    Builds the cumulative swing thresholds for a list of batters.
+
+    Parameters:
+        batters (lst): Batter objects.
+
+    Returns:
+        (array): One row per batter and one column per SWING_ORDER outcome,
+        scaled so the last column is 1.
+    """
+    odds = np.array([[batter.odds[key] for key in SWING_ORDER]
+                     for batter in batters], dtype=np.float64)
+    return cumulative(odds)
+
+def table_thresholds(table):
+    """
+    Builds cumulative swing thresholds straight from a RosterTable.
+
+    Parameters:
+        table (obj): RosterTable, e.g. Files.table for the whole league.
+
+    Returns:
+        (array): One row per table row, as in swing_table().
+    """
+    columns = [table.ODDS.index(key) for key in SWING_ORDER]
+    return cumulative(table.odds[:, columns])
+
+def cumulative(odds):
+    """
+    Turns rows of swing odds (SWING_ORDER columns) into thresholds.
+
+    Parameters:
+        odds (array): Swing odds, one row per batter.
+
+    Returns:
+        (array): Cumulative thresholds scaled so each row ends at 1.
+    """
+    table = np.cumsum(odds, axis=1)
+    table /= table[:, -1:]
+    table[:, -1] = 1.0
+    return table
+
+def swing_outcomes(table, batter, rng):
+    """
+    Draws the outcome of a swing for every entry in batter.
+
+    Parameters:
+        table (array): Thresholds from swing_table() or cumulative().
+        batter (array): Row in table of the batter for each swing.
+        rng (obj): numpy.random.Generator.
+
+    Returns:
+        (array): Index into SWING_ORDER of each swing's outcome.
+    """
+    # Shift row i to [i, i + 1] so one sorted search covers every row.
+    rows = table.shape[0]
+    flat = (table + np.arange(rows)[:, None]).ravel()
+    points = batter + rng.random(len(batter))
+    found = np.searchsorted(flat, points, side="left")
+    outcome = found - batter * len(SWING_ORDER)
+    return np.minimum(outcome, len(SWING_ORDER) - 1)
+
+def sample_pitches(table, batter, count, swing, rng, ball_odds=0.5):
+    """
+    Draws the result of one pitch for every entry in the arrays.
+
+    Parameters:
+        table (array): Thresholds from swing_table() or cumulative().
+        batter (array): Row in table of the batter at the plate.
+        count (array): Count code before the pitch.
+        swing (array): True where the batter swings, False where they watch.
+        rng (obj): numpy.random.Generator.
+        ball_odds (float): Chance a watched pitch is a ball, or an array
+                           of one per table row.
+
+    Returns:
+        status (array): STATUSES code after the pitch.
+        count (array): Count code after the pitch.
+    """
+    batter = np.asarray(batter, dtype=np.int64)
+    count = np.asarray(count, dtype=np.int64)
+    swing = np.asarray(swing, dtype=bool)
+    status = np.full(len(batter), BATTING, dtype=np.int8)
+    strike = np.empty(len(batter), dtype=bool)
+    # Swings: a strike, or the outcome that ends the at bat.
+    swung = np.flatnonzero(swing)
+    outcome = swing_outcomes(table, batter[swung], rng)
+    status[swung] = SWING_STATUS[outcome]
+    strike[swung] = outcome == 0
+    # Watched pitches: a ball or a strike from the pitcher.
+    watched = np.flatnonzero(~swing)
+    if np.ndim(ball_odds):
+        ball_odds = ball_odds[batter[watched]]
+    strike[watched] = rng.random(len(watched)) >= ball_odds
+    ball = ~swing & ~strike
+    balls = count // 3 + ball
+    strikes = count % 3 + strike
+    status[strikes >= 3] = STRIKE_OUT
+    status[balls >= 4] = WALK
+    return status, np.minimum(balls, 3) * 3 + np.minimum(strikes, 2)
+
+def sample_at_bats(table, batter, rng, swing=None, ball_odds=0.5,
+                   plan=None):
+    """
+    Plays a whole at bat for every entry in batter, pitch by pitch.
+
+    Parameters:
+        table (array): Thresholds from swing_table() or cumulative().
+        batter (array): Row in table of the batter for each at bat.
+        rng (obj): numpy.random.Generator.
+        swing (array): True to swing in each count; shape (12,) for every
+                       batter or (rows in table, 12). Defaults to swinging.
+        ball_odds (float): Chance a watched pitch is a ball, or an array
+                           of one per table row.
+        plan (array): Row of swing to use for each at bat, e.g. one row per
+                      batter and base/out situation; defaults to batter.
+
+    Returns:
+        status (array): STATUSES code each at bat ended with.
+        count (array): Count code after the last pitch, with 4 balls or 3
+                       strikes kept at 3 and 2.
+        pitches (array): Number of pitches seen.
+    """
+    batter = np.asarray(batter, dtype=np.int64)
+    if swing is None:
+        swing = np.ones(COUNTS, dtype=bool)
+    swing = np.asarray(swing, dtype=bool)
+    if plan is None:
+        plan = batter
+    status = np.full(len(batter), BATTING, dtype=np.int8)
+    count = np.zeros(len(batter), dtype=np.int64)
+    pitches = np.zeros(len(batter), dtype=np.int64)
+    live = np.arange(len(batter))
+    for pitch in range(MAX_PITCHES):
+        if len(live) == 0:
+            break
+        if swing.ndim == 1:
+            choice = swing[count[live]]
+        else:
+            choice = swing[plan[live], count[live]]
+        new_status, new_count = sample_pitches(table, batter[live],
+                                               count[live], choice, rng,
+                                               ball_odds)
+        status[live] = new_status
+        count[live] = new_count
+        pitches[live] += 1
+        live = live[new_status == BATTING]
+    return status, count, pitches
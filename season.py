@@ -0,0 +1,467 @@
+"""
+Full-season league simulator that plays every team against each other.
+
+Every team in the batter data gets a headless Engine with its batting
+order, and games are played head to head: the away team bats in the top
+of each inning and the home team in the bottom, both with the same at bat
+rules as the interactive game. The bottom of the last inning is skipped if
+the home team is ahead, and ends as soon as the home team goes ahead. By
+default a whole season is played at once with batch.play_games(); with
+batched=False the games are played one at a time through the engines.
+
+Each season is a balanced schedule of 162 games per team. Seasons are
+spread across a process pool a chunk at a time. Workers build their
+engines on the parent's roster tables in shared memory (see shared.py),
+and each task is just a seed and a range of seasons. Workers send back
+fixed size totals (wins, runs, playoff spots, win histograms and batting
+lines) that are added into one result, so memory does not grow with the
+number of seasons. Season number i is played on its own random stream,
+streams.game_rng(seed, i), so results do not depend on how the seasons are
+split between workers.
+
+Example:
+    python season.py --seasons 1000 --playoffs 12
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+import batch
+import sampler
+import shared
+import streams
+from Smith_BaseballSim import Engine, Files, BitField, always_swing, \
+    always_watch
+
+# Games per team in a season.
+GAMES = 162
+# Seasons played per task sent to a worker.
+CHUNK = 4
+# Columns of a batting line: at bats, hits and RBIs.
+LINE = ("atbats", "hits", "rbis")
+
+# League each worker process builds once, in _start_worker().
+_worker = {}
+
+def schedule(teams, games=GAMES):
+    """
+    Makes a balanced schedule where every team plays the same number of
+    games, using the circle method for round robins.
+
+    Parameters:
+        teams (int): Number of teams.
+        games (int): Games per team. With an odd number of teams, some
+                     teams may play one game fewer.
+
+    Returns:
+        (lst): (home, away) team index pairs in the order they are played.
+    """
+    slots = list(range(teams)) + ([None] if teams % 2 else [])
+    size = len(slots)
+    played = [0] * teams
+    hosted = [0] * teams
+    pairs = []
+    idle = 0
+    round_number = 0
+    # Stop once nobody needs games or a full cycle of rounds adds none.
+    while min(played) < games and idle < size:
+        added = 0
+        for number in range(size // 2):
+            a, b = slots[number], slots[size - 1 - number]
+            if a is None or b is None or played[a] >= games or \
+                    played[b] >= games:
+                continue
+            # The team with fewer home games so far is at home.
+            if hosted[b] < hosted[a] or (hosted[b] == hosted[a] and
+                                         (round_number + number) % 2):
+                a, b = b, a
+            pairs.append((a, b))
+            hosted[a] += 1
+            played[a] += 1
+            played[b] += 1
+            added += 1
+        idle = 0 if added else idle + 1
+        slots = [slots[0], slots[-1]] + slots[1:-1]
+        round_number += 1
+    return pairs
+
+def play_game(home, away, innings=9):
+    """
+    Plays one game between two headless engines.
+
+    Parameters:
+        home (obj): Engine of the home team.
+        away (obj): Engine of the away team; both should share one random
+                    stream, set with Engine.set_rng().
+        innings (int): Length of the game before extra innings.
+
+    Returns:
+        (tup): Runs for the home team and for the away team.
+    """
+    home.reset()
+    away.reset()
+    inning = 1
+    while True:
+        away.half_inning()
+        away.field.clear_bases()
+        runs, against = home.scoreboard.runs, away.scoreboard.runs
+        if inning >= innings and runs > against:
+            break
+        home.half_inning(against if inning >= innings else None)
+        home.field.clear_bases()
+        runs = home.scoreboard.runs
+        if inning >= innings and runs != against:
+            break
+        inning += 1
+    return runs, against
+
+class League:
+    """
+    Class to hold every team's engine and play seasons between them.
+
+    Attributes:
+        names (lst): Team names, in the order used by every result array.
+        engines (lst): Headless Engine of each team.
+        pairs (lst): (home, away) schedule of one season.
+        innings (int): Innings per game.
+        playoffs (int): Teams with the most wins that make the playoffs.
+        batched (bool): True to play each season with batch.play_games().
+    """
+
+    def __init__(self, files, teams=None, lineups=None, innings=9,
+                 games=GAMES, playoffs=12, policy=always_swing,
+                 batched=True):
+        """
+        Constructor for League class.
+
+        Parameters:
+            files (obj): Instance from Files class.
+            teams (lst): Team names; defaults to every team in the data.
+            lineups (dict): Team name to a batting order (indices into the
+                            team's players); defaults to the first nine.
+            innings (int): Innings per game.
+            games (int): Games per team in a season.
+            playoffs (int): Number of teams that make the playoffs.
+            policy (func): Swing/watch policy every batter uses; only
+                           always_swing and always_watch can be batched.
+            batched (bool): True to play whole seasons at once with NumPy.
+
+        Raises:
+            ValueError: If a team, batting order or policy is not valid.
+        """
+        if teams is None:
+            teams = list(files.teams)
+        if lineups is None:
+            lineups = {}
+        self.engines = [Engine(team=team, order=lineups.get(team),
+                               innings=innings, policy=policy, files=files,
+                               field_type=BitField) for team in teams]
+        self.names = [engine.scoreboard.home for engine in self.engines]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("A team is in the league more than once.")
+        self.pairs = schedule(len(teams), games)
+        self.innings = innings
+        self.games = games
+        self.playoffs = playoffs
+        self.batched = batched
+        if batched:
+            if policy not in (always_swing, always_watch):
+                raise ValueError("Only always_swing and always_watch " +
+                                 "seasons can be batched.")
+            self.swing = policy is always_swing
+            self.table = sampler.table_thresholds(files.table)
+            self.lineups = [[batter.row for batter in engine.order]
+                            for engine in self.engines]
+
+    def totals(self):
+        """Returns (dict) empty season totals, as arrays of zeros."""
+        teams = len(self.names)
+        return {
+            "seasons" : 0,
+            "wins" : np.zeros(teams, dtype=np.int64),
+            "wins_squared" : np.zeros(teams, dtype=np.int64),
+            "runs" : np.zeros(teams, dtype=np.int64),
+            "allowed" : np.zeros(teams, dtype=np.int64),
+            "playoffs" : np.zeros(teams, dtype=np.int64),
+            "best" : np.zeros(teams, dtype=np.int64),
+            "histogram" : np.zeros((teams, self.games + 1), dtype=np.int64),
+            "lines" : np.zeros((teams, 9, len(LINE)), dtype=np.int64)
+        }
+
+    def play_season(self, rng, totals):
+        """
+        Plays one season and adds it to a set of totals.
+
+        Parameters:
+            rng (obj): Random number source for the whole season.
+            totals (dict): Totals from totals(), updated in place.
+        """
+        if self.batched:
+            self.play_batch(rng, totals)
+            return
+        engines = self.engines
+        rng = streams.as_random(rng)
+        for engine in engines:
+            engine.set_rng(rng)
+        wins = np.zeros(len(engines), dtype=np.int64)
+        runs = totals["runs"]
+        allowed = totals["allowed"]
+        lines = totals["lines"]
+        for home, away in self.pairs:
+            scored, against = play_game(engines[home], engines[away],
+                                        self.innings)
+            wins[home if scored > against else away] += 1
+            runs[home] += scored
+            runs[away] += against
+            allowed[home] += against
+            allowed[away] += scored
+            for team in (home, away):
+                line = lines[team]
+                for slot, batter in enumerate(engines[team].order):
+                    line[slot, 0] += batter.atbats
+                    line[slot, 1] += batter.hits
+                    line[slot, 2] += batter.rbis
+        coins = [rng.random() for engine in engines]
+        self.standings(wins, coins, totals)
+
+    def play_batch(self, rng, totals):
+        """
+        Plays one season with every game at once and adds it to totals.
+
+        Parameters:
+            rng (obj): Int seed, numpy.random.Generator or StreamRandom.
+            totals (dict): Totals from totals(), updated in place.
+        """
+        generator = streams.as_generator(rng)
+        pairs = np.array(self.pairs, dtype=np.int64)
+        played = batch.play_games(self.table, self.lineups, pairs,
+                                  generator, self.innings, swing=self.swing)
+        home, away = pairs[:, 0], pairs[:, 1]
+        scored, against = played["runs"], played["opponent_runs"]
+        teams = len(self.names)
+        wins = np.bincount(np.where(scored > against, home, away),
+                           minlength=teams)
+        np.add.at(totals["runs"], home, scored)
+        np.add.at(totals["runs"], away, against)
+        np.add.at(totals["allowed"], home, against)
+        np.add.at(totals["allowed"], away, scored)
+        np.add.at(totals["lines"], home, played["lines"][:, 0])
+        np.add.at(totals["lines"], away, played["lines"][:, 1])
+        self.standings(wins, generator.random(teams), totals)
+
+    def standings(self, wins, coins, totals):
+        """
+        Adds one season's standings to totals.
+
+        Parameters:
+            wins (array): Wins of each team.
+            coins (lst): Random number for each team to break ties.
+            totals (dict): Totals from totals(), updated in place.
+        """
+        order = sorted(range(len(wins)), key=lambda team:
+                       (-wins[team], coins[team]))
+        totals["playoffs"][order[:self.playoffs]] += 1
+        totals["best"][order[0]] += 1
+        totals["histogram"][np.arange(len(wins)), wins] += 1
+        totals["wins"] += wins
+        totals["wins_squared"] += wins * wins
+        totals["seasons"] += 1
+
+    def play_seasons(self, seed, first, count):
+        """
+        Plays a run of seasons, each on its own random stream.
+
+        Parameters:
+            seed (int): Root seed of the whole simulation.
+            first (int): Number of the first season.
+            count (int): Number of seasons to play.
+
+        Returns:
+            (dict): Totals of the seasons; see totals().
+        """
+        totals = self.totals()
+        for season in range(first, first + count):
+            self.play_season(streams.game_rng(seed, season), totals)
+        return totals
+
+    def report(self, totals, seconds=0.0):
+        """
+        Turns season totals into standings and per-season player lines.
+
+        Parameters:
+            totals (dict): Totals from play_seasons(), possibly merged.
+            seconds (float): Wall-clock time taken, to include.
+
+        Returns:
+            (dict): "seasons" and "seconds", "standings" (one dict per team
+            with mean "wins", "losses", "runs", "allowed", the "wins_sd",
+            "playoffs" and "best_record" odds and a "histogram" of wins),
+            sorted by wins, and "players" (mean season at bats, hits, RBIs
+            and batting average of every batter in each lineup).
+        """
+        seasons = max(totals["seasons"], 1)
+        games = np.zeros(len(self.names), dtype=np.int64)
+        for home, away in self.pairs:
+            games[home] += 1
+            games[away] += 1
+        wins = totals["wins"] / seasons
+        spread = np.sqrt(np.maximum(totals["wins_squared"] / seasons -
+                                    wins * wins, 0.0))
+        standings = []
+        for team, name in enumerate(self.names):
+            standings.append({
+                "team" : name,
+                "wins" : float(wins[team]),
+                "losses" : float(games[team] - wins[team]),
+                "wins_sd" : float(spread[team]),
+                "runs" : float(totals["runs"][team] / seasons),
+                "allowed" : float(totals["allowed"][team] / seasons),
+                "playoffs" : float(totals["playoffs"][team] / seasons),
+                "best_record" : float(totals["best"][team] / seasons),
+                "histogram" : totals["histogram"][team].tolist()
+            })
+        standings.sort(key=lambda row: -row["wins"])
+        players = []
+        for team, engine in enumerate(self.engines):
+            for slot, batter in enumerate(engine.order):
+                atbats, hits, rbis = totals["lines"][team, slot] / seasons
+                players.append({
+                    "team" : self.names[team],
+                    "name" : batter.name,
+                    "atbats" : float(atbats),
+                    "hits" : float(hits),
+                    "rbis" : float(rbis),
+                    "average" : float(hits / atbats) if atbats else 0.0
+                })
+        return {"seasons" : int(totals["seasons"]), "seconds" : seconds,
+                "standings" : standings, "players" : players}
+
+def merge(totals, other):
+    """Adds one set of season totals into another, in place."""
+    for key in totals:
+        totals[key] += other[key]
+
+def _start_worker(handle, options):
+    """Builds the league once in a worker process, on the parent's
+    shared roster tables."""
+    _worker["league"] = League(shared.attach_files(handle), **options)
+
+def _play(seed, first, count):
+    """Plays a chunk of seasons in a worker process; returns the totals."""
+    return _worker["league"].play_seasons(seed, first, count)
+
+def simulate(seasons=100, seed=0, players="Baseball simulator.xlsx",
+             teams=None, lineups=None, innings=9, games=GAMES, playoffs=12,
+             policy=always_swing, batched=True, workers=None, chunk=CHUNK,
+             progress=None):
+    """
+    Simulates many league seasons across all cores and merges the results.
+
+    Parameters:
+        seasons (int): Number of seasons to play.
+        seed (int): Root seed; the same seed always gives the same result,
+                    whatever the number of workers.
+        players (str): Batter odds spreadsheet.
+        teams (lst): Team names; defaults to every team in the data.
+        lineups (dict): Team name to batting order indices.
+        innings (int): Innings per game.
+        games (int): Games per team in a season.
+        playoffs (int): Number of teams that make the playoffs.
+        policy (func): Swing/watch policy; must be a module level function
+                       so it can be sent to the workers.
+        batched (bool): True to play each season at once with NumPy; False
+                        to play the games one at a time.
+        workers (int): Worker processes; defaults to every core. With 1,
+                       seasons are played in this process.
+        chunk (int): Seasons per task sent to a worker.
+        progress (func): Called as progress(done, seasons) after each
+                         finished task.
+
+    Returns:
+        (dict): Standings and player lines; see League.report().
+    """
+    begin = time.monotonic()
+    options = {"teams" : teams, "lineups" : lineups, "innings" : innings,
+               "games" : games, "playoffs" : playoffs, "policy" : policy,
+               "batched" : batched}
+    files = Files(players)
+    league = League(files, **options)
+    totals = league.totals()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    tasks = ((first, min(chunk, seasons - first))
+             for first in range(0, seasons, chunk))
+    if workers == 1:
+        for first, count in tasks:
+            merge(totals, league.play_seasons(seed, first, count))
+            if progress is not None:
+                progress(int(totals["seasons"]), seasons)
+        return league.report(totals, time.monotonic() - begin)
+    with shared.share_files(files) as tables, \
+            ProcessPoolExecutor(max_workers=workers,
+                                initializer=_start_worker,
+                                initargs=(tables.handle, options)) as pool:
+        pending = set()
+        # Keep a couple of tasks per worker in flight to bound memory.
+        while True:
+            while len(pending) < 2 * workers:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                pending.add(pool.submit(_play, seed, *task))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                merge(totals, future.result())
+            if progress is not None:
+                progress(int(totals["seasons"]), seasons)
+    return league.report(totals, time.monotonic() - begin)
+
+def main():
+    """Command line entry point; prints the standings and playoff odds."""
+    parser = argparse.ArgumentParser(description="Simulate full seasons " +
+                                     "of every MLB team against each other.")
+    parser.add_argument("--seasons", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--games", type=int, default=GAMES,
+                        help="Games per team in a season.")
+    parser.add_argument("--innings", type=int, default=9)
+    parser.add_argument("--playoffs", type=int, default=12,
+                        help="Teams that make the playoffs.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--scalar", action="store_true",
+                        help="Play games one at a time instead of batched.")
+    parser.add_argument("--players", type=int, default=0,
+                        help="Number of top hitters to print.")
+    args = parser.parse_args()
+
+    def progress(done, total):
+        sys.stderr.write("\r{:,} of {:,} seasons".format(done, total))
+        sys.stderr.flush()
+
+    result = simulate(args.seasons, args.seed, games=args.games,
+                      innings=args.innings, playoffs=args.playoffs,
+                      batched=not args.scalar, workers=args.workers,
+                      progress=progress)
+    sys.stderr.write("\n")
+    print("Played " + str(result["seasons"]) + " seasons in " +
+          "{:.1f}".format(result["seconds"]) + " seconds.")
+    print('{:<14s}{:>8s}{:>8s}{:>8s}{:>8s}{:>10s}'.format("Team", "W", "L",
+          "RS", "RA", "Playoffs"))
+    for row in result["standings"]:
+        print('{:<14s}{:>8.1f}{:>8.1f}{:>8.0f}{:>8.0f}{:>9.1f}%'.format(
+              row["team"], row["wins"], row["losses"], row["runs"],
+              row["allowed"], 100 * row["playoffs"]))
+    hitters = sorted(result["players"], key=lambda line: -line["average"])
+    for line in hitters[:args.players]:
+        print(line["name"] + " (" + line["team"] + "): " +
+              "{:.3f}".format(line["average"]) + ", " +
+              "{:.0f} RBIs".format(line["rbis"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+"""
+Game server: many interactive games at once, one per TCP connection.
+
+The interactive game asks its questions with input() and quits with
+sys.exit(), so one process can only host one player. This server runs
+every player's game as a coroutine on one asyncio event loop instead. The
+line protocol is the game itself: the server sends the same text the
+terminal shows, each question followed by PROMPT, and the client answers
+with one line. [h]elp and [q]uit work at every question as they do in
+Engine.help_quit(); quitting closes the connection, not the server.
+
+Each Session has its own Field, Scoreboard, random stream and Batter
+views, while the Files (and the RosterTable behind every roster) are
+loaded once and shared read-only by every session. The questions and
+messages all come from the game's own methods, and the game loop is
+Engine.game(), the same one Engine.play() runs: print() inside a session
+goes to that session's buffer, and a step that asks a question is run up
+to the question, the answer awaited, then run again with it.
+
+Stopping the server cancels every session in progress, which tells the
+player and closes their connection.
+
+Example:
+    python server.py --port 8765
+    python server.py --port 8765 --load 1000 --concurrency 200
+    nc localhost 8765
+"""
+import argparse
+import asyncio
+import contextvars
+import io
+import sys
+import time
+
+import numpy as np
+
+import streams
+from events import TerminalSink
+from Smith_BaseballSim import Engine, Field, Files, Scoreboard
+
+# Sent after every question; the client answers with one line.
+PROMPT = "\n> "
+# Random numbers each session draws at a time, kept small for memory.
+BLOCK = 64
+
+# Session whose task is running, so print() knows where its text goes.
+_session = contextvars.ContextVar("session", default=None)
+
+class Output:
+    """
+    Stand-in for sys.stdout that sends print() calls made by a session's
+    task to that session, and everything else to the real stream.
+    """
+
+    def __init__(self, stream):
+        """
+        Constructor for Output class.
+
+        Parameters:
+            stream (obj): The real sys.stdout.
+        """
+        self.stream = stream
+
+    def write(self, text):
+        """Writes text to the running session's buffer, or the stream."""
+        session = _session.get()
+        if session is None:
+            return self.stream.write(text)
+        return session.buffer.write(text)
+
+    def flush(self):
+        """Flushes the real stream; sessions flush at each question."""
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        """Everything else (encoding, isatty, ...) is the real stream's."""
+        return getattr(self.stream, name)
+
+class Prompt(Exception):
+    """Raised by Session.help_quit() to stop a method at its question."""
+
+class Quit(Exception):
+    """Raised when the player quits or the connection goes away."""
+
+class Session:
+    """
+    Class for one player's game, driven by the lines they send.
+
+    A Session stands in for the Engine in the game's own methods
+    (Scoreboard(), batting_order(), make_roster(), ...), which only use
+    its files, field, scoreboard, lineup and help_quit(), and in
+    Engine.game(), whose steps it runs with run().
+
+    Attributes:
+        files (obj): Files shared by every session.
+        reader (obj): asyncio.StreamReader of the connection.
+        writer (obj): asyncio.StreamWriter of the connection.
+        buffer (obj): io.StringIO of text waiting to be sent.
+        answer (str): Line to give the next help_quit() call, or None.
+        rng (obj): The session's own random stream.
+        field (obj): Instance from Field class.
+        scoreboard (obj): Instance from Scoreboard class.
+        lineup (lst): Batter views of the chosen team's players.
+        idle (float): Seconds to wait for a line before giving up.
+        prompts (int): Questions answered so far.
+    """
+    game = Engine.game
+    make_roster = Engine.make_roster
+    make_choice = Engine.make_choice
+
+    def __init__(self, files, reader, writer, rng, idle=None):
+        """
+        Constructor for Session class.
+
+        Parameters:
+            files (obj): Instance from Files class, shared and read-only.
+            reader (obj): asyncio.StreamReader of the connection.
+            writer (obj): asyncio.StreamWriter of the connection.
+            rng (obj): Random number source, e.g. streams.game_rng().
+            idle (float): Seconds to wait for each line; None to wait
+                          forever.
+        """
+        self.files = files
+        self.reader = reader
+        self.writer = writer
+        self.buffer = io.StringIO()
+        self.answer = None
+        self.mark = 0
+        self.rng = rng
+        self.field = Field(sink=TerminalSink(rng), rng=rng)
+        self.scoreboard = None
+        self.lineup = []
+        self.idle = idle
+        self.prompts = 0
+
+    def help_quit(self, question):
+        """
+        Answers a question asked by one of the game's methods.
+
+        Parameters:
+            question (str): Text of the question.
+
+        Returns:
+            (str): The line read for it, on the second run of the method.
+
+        Raises:
+            Prompt: On the first run, to stop the method at its question.
+        """
+        if self.answer is None:
+            raise Prompt(question)
+        answer, self.answer = self.answer, None
+        # Drop what the method printed again on its way to the question.
+        self.buffer.seek(self.mark)
+        self.buffer.truncate()
+        return answer
+
+    async def run(self, method, *args):
+        """
+        Runs a game method that may ask one question.
+
+        Parameters:
+            method (func): Called as method(*args).
+
+        Returns:
+            (obj): What the method returns.
+        """
+        try:
+            return method(*args)
+        except Prompt as prompt:
+            self.answer = await self.ask(prompt.args[0])
+        self.mark = self.buffer.tell()
+        return method(*args)
+
+    async def send(self, text=""):
+        """Sends everything in the buffer, then text."""
+        self.writer.write((self.buffer.getvalue() + text).encode())
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        await self.writer.drain()
+
+    async def read(self, question):
+        """
+        Sends a question and waits for the line that answers it.
+
+        Raises:
+            Quit: If the connection closes or is idle for too long.
+        """
+        await self.send(question + PROMPT)
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), self.idle)
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            # ValueError: a line longer than the reader's limit.
+            raise Quit()
+        if not line:
+            raise Quit()
+        self.prompts += 1
+        return line.decode(errors="replace").rstrip("\r\n")
+
+    async def ask(self, question):
+        """
+        Asks a question with the help and quit options, like
+        Engine.help_quit().
+
+        Parameters:
+            question (str): Text of the question.
+
+        Returns:
+            (str): The first answer that is not h or q.
+
+        Raises:
+            Quit: If the player confirms they want to quit.
+        """
+        user_input = await self.read(question)
+        while user_input == 'h' or user_input == 'q':
+            if user_input == 'q':
+                final_decision = await self.read("\nAre you sure you want " +
+                                                 "to quit the game? [y] or " +
+                                                 "[n]: ")
+                if final_decision.lower() == 'y':
+                    raise Quit()
+                user_input = await self.read(question)
+            elif user_input == 'h':
+                print(self.files.help)
+                leave = await self.read("E[x]it the help screen.")
+                if leave == 'x':
+                    user_input = await self.read(question)
+        return user_input
+
+    async def play(self):
+        """Plays a full game: Engine.game(), answered over the connection."""
+        print(self.files.welcome)
+        self.scoreboard = await self.run(Scoreboard, self)
+        self.scoreboard.rng = self.rng
+        steps = self.game()
+        result = None
+        while True:
+            try:
+                method, args = steps.send(result)
+            except StopIteration:
+                return
+            result = await self.run(method, *args)
+
+class Server:
+    """
+    Class to host a Session for every connection on one event loop.
+
+    Attributes:
+        files (obj): Files shared read-only by every session.
+        seed (int): Root seed; session number i plays on
+                    streams.game_rng(seed, i).
+        idle (float): Seconds a session may wait for a line.
+        started (int): Sessions started so far.
+        active (int): Sessions connected now.
+        finished (int): Games played to the end.
+        tasks (set): Tasks of the sessions connected now.
+    """
+
+    def __init__(self, files, seed=None, idle=None):
+        """
+        Constructor for Server class.
+
+        Parameters:
+            files (obj): Instance from Files class.
+            seed (int): Root seed for the sessions' streams; random if
+                        None.
+            idle (float): Seconds to wait for each line; None for no limit.
+        """
+        self.files = files
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        self.seed = seed
+        self.idle = idle
+        self.started = 0
+        self.active = 0
+        self.finished = 0
+        self.tasks = set()
+
+    async def handle(self, reader, writer):
+        """
+        Plays one connection's game from start to finish.
+
+        Raises:
+            asyncio.CancelledError: If the server stops first; the player
+                                    is told and the connection closed.
+        """
+        rng = streams.game_rng(self.seed, self.started, BLOCK)
+        session = Session(self.files, reader, writer, rng, self.idle)
+        task = asyncio.current_task()
+        self.started += 1
+        self.active += 1
+        self.tasks.add(task)
+        # Each connection runs in its own task, so this is its own value.
+        _session.set(session)
+        try:
+            await session.play()
+            self.finished += 1
+            await session.send()
+        except (Quit, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # No awaiting now; write what fits in the transport and go.
+            writer.write(b"\nThe server is shutting down. Goodbye!\n")
+            writer.close()
+            raise
+        finally:
+            self.tasks.discard(task)
+            self.active -= 1
+            writer.close()
+
+    async def close(self):
+        """Ends every session in progress and waits for them to finish."""
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def serve(self, host="127.0.0.1", port=8765, ready=None):
+        """
+        Accepts connections until cancelled, then closes every session.
+
+        Parameters:
+            host (str): Address to listen on.
+            port (int): Port to listen on; 0 picks a free one.
+            ready (obj): asyncio.Future to set to the port once listening.
+        """
+        stdout = sys.stdout
+        sys.stdout = Output(stdout)
+        try:
+            server = await asyncio.start_server(self.handle, host, port,
+                                                limit=1024, backlog=4096)
+            if ready is not None:
+                ready.set_result(server.sockets[0].getsockname()[1])
+            async with server:
+                try:
+                    await server.serve_forever()
+                finally:
+                    # Before the server closes, which waits for them.
+                    await self.close()
+        finally:
+            sys.stdout = stdout
+
+def answer(text, team, order, innings, rng):
+    """
+    Picks a load-test client's answer to the question that ends text.
+
+    Returns:
+        (str): Line to send.
+    """
+    question = text[:-len(PROMPT)].rstrip().rsplit("\n\n", 1)[-1]
+    if "How many innings" in question:
+        return str(innings)
+    if "Which MLB team" in question:
+        return team
+    if "batting order" in question:
+        return order
+    if "opposing team" in question:
+        return "Load Testers"
+    if "one more inning" in question:
+        return "n"
+    return "s" if rng.random() < 0.5 else "w"
+
+async def client(host, port, team, order, innings, rng, latencies):
+    """
+    Plays one whole game as a bot, timing every question's round trip.
+
+    Returns:
+        (int): Questions answered.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    marker = PROMPT.encode()
+    prompts = 0
+    try:
+        sent = time.perf_counter()
+        while True:
+            try:
+                text = await reader.readuntil(marker)
+            except asyncio.IncompleteReadError:
+                break
+            latencies.append(time.perf_counter() - sent)
+            line = answer(text.decode(errors="replace"), team, order,
+                          innings, rng)
+            sent = time.perf_counter()
+            writer.write((line + "\n").encode())
+            prompts += 1
+    finally:
+        writer.close()
+    return prompts
+
+async def load_test(host, port, sessions=1000, concurrency=100,
+                    team="Red Sox", order="0,1,2,3,4,5,6,7,8", innings=9,
+                    idle=0, seed=0):
+    """
+    Plays many bot games against a running server.
+
+    Parameters:
+        host (str): Server address.
+        port (int): Server port.
+        sessions (int): Games to play.
+        concurrency (int): Games in progress at once.
+        team (str): Team the bots play as.
+        order (str): Batting order the bots send.
+        innings (int): Innings the bots ask for.
+        idle (int): Extra connections to open and leave idle throughout.
+        seed (int): Seed for the bots' swing/watch choices.
+
+    Returns:
+        (dict): "sessions" finished, "prompts" answered, "seconds",
+        sessions and prompts per second, and round trip "latency"
+        percentiles in milliseconds.
+    """
+    rng = np.random.default_rng(seed)
+    latencies = []
+    waiting = []
+    for number in range(idle):
+        waiting.append(await asyncio.open_connection(host, port))
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with limit:
+            return await client(host, port, team, order, innings, rng,
+                                latencies)
+
+    begin = time.perf_counter()
+    prompts = await asyncio.gather(*[one() for number in range(sessions)])
+    seconds = time.perf_counter() - begin
+    for reader, writer in waiting:
+        writer.close()
+    percentiles = np.percentile(latencies, [50, 90, 99, 100]) * 1000 \
+        if latencies else [0.0] * 4
+    return {"sessions" : sessions, "prompts" : int(sum(prompts)),
+            "seconds" : seconds, "sessions_per_second" : sessions / seconds,
+            "prompts_per_second" : sum(prompts) / seconds,
+            "latency" : dict(zip(("p50", "p90", "p99", "max"),
+                                 [float(value) for value in percentiles]))}
+
+def main():
+    """Command line entry point; runs the server or the load test."""
+    parser = argparse.ArgumentParser(description="Host many interactive " +
+                                     "games over TCP, or load test a host.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--idle-timeout", type=float, default=None,
+                        help="Seconds to wait for a line before closing.")
+    parser.add_argument("--load", type=int, default=None, metavar="GAMES",
+                        help="Play this many bot games against the server.")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--idle", type=int, default=0,
+                        help="Idle connections to hold open in the test.")
+    parser.add_argument("--innings", type=int, default=9)
+    args = parser.parse_args()
+
+    if args.load is not None:
+        result = asyncio.run(load_test(args.host, args.port, args.load,
+                                       args.concurrency,
+                                       innings=args.innings, idle=args.idle,
+                                       seed=args.seed or 0))
+        print("{:,} games, {:,} answers in {:.2f} s: {:.1f} games/s, "
+              "{:,.0f} answers/s".format(result["sessions"],
+                                         result["prompts"], result["seconds"],
+                                         result["sessions_per_second"],
+                                         result["prompts_per_second"]))
+        print("Round trip ms: " + ", ".join(
+            "{} {:.2f}".format(name, value) for name, value in
+            result["latency"].items()))
+        return
+    server = Server(Files(), args.seed, args.idle_timeout)
+    print("Serving games on " + args.host + ":" + str(args.port))
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
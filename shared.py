@@ -0,0 +1,160 @@
+"""
+Roster and odds tables in shared memory, for process pool workers.
+
+A process pool used to give every worker its own copy of the data: each
+one built Files again, or had arrays pickled into it. Here the parent puts
+the tables into one multiprocessing.shared_memory block, once:
+    SharedTables(arrays)   copies NumPy arrays into a new block; its
+                           handle (the block's name and where each array
+                           is) is a few hundred bytes
+    attach(handle)         in a worker: read-only NumPy views of the
+                           arrays, straight onto the parent's memory
+share_files() and attach_files() do this for a whole Files: the Name and
+Team columns, the other numeric columns, and the RosterTable odds, swing
+totals and thresholds. A worker gets a Files built on the views, without
+reading the workbook or copying the tables, so the memory they take is
+paid once however many workers there are. Only small task descriptors
+(team names, batting orders, seeds) go to the workers after that.
+
+The parent owns the block: close it (or leave the with block) after the
+pool has shut down.
+
+Example:
+    with share_files(files) as tables:
+        with ProcessPoolExecutor(initializer=start,
+                                 initargs=(tables.handle,)) as pool:
+            ...
+    # In the worker:
+    files = attach_files(handle)
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Smith_BaseballSim import Files, RosterTable
+
+# Each array starts on a multiple of this many bytes.
+ALIGN = 64
+# Blocks this process has attached to, kept open while it runs.
+_attached = {}
+
+class SharedTables:
+    """
+    Class to own a shared memory block of NumPy arrays.
+
+    Attributes:
+        memory (obj): The multiprocessing.shared_memory.SharedMemory.
+        handle (tup): The block's name and the (name, dtype, shape,
+                      offset) of each array; pass it to attach().
+    """
+
+    def __init__(self, arrays):
+        """
+        Constructor for SharedTables class; copies the arrays in.
+
+        Parameters:
+            arrays (dict): Name to NumPy array (numbers or fixed-width
+                           strings, not objects).
+        """
+        arrays = {name : np.ascontiguousarray(array) for name, array in
+                  arrays.items()}
+        layout = []
+        size = 0
+        for name, array in arrays.items():
+            if array.dtype.hasobject:
+                raise ValueError("Can't share the object array " +
+                                 repr(name) + ".")
+            layout.append((name, array.dtype.str, array.shape, size))
+            size += -(-array.nbytes // ALIGN) * ALIGN
+        self.memory = shared_memory.SharedMemory(create=True,
+                                                 size=max(size, 1))
+        for name, dtype, shape, offset in layout:
+            view = np.ndarray(shape, dtype, self.memory.buf, offset)
+            view[...] = arrays[name]
+            del view
+        self.handle = (self.memory.name, tuple(layout))
+
+    def __enter__(self):
+        """Returns (obj) itself, to close on leaving a with block."""
+        return self
+
+    def __exit__(self, *exc):
+        """Closes the block."""
+        self.close()
+
+    def close(self):
+        """Frees the block; workers must be done with it."""
+        self.memory.close()
+        self.memory.unlink()
+
+def attach(handle):
+    """
+    Maps a shared memory block into this process.
+
+    Parameters:
+        handle (tup): SharedTables.handle.
+
+    Returns:
+        (dict): Name to read-only NumPy array over the shared memory.
+    """
+    name, layout = handle
+    memory = _attached.get(name)
+    if memory is None:
+        try:
+            # Only the parent should unlink the block (Python 3.13+).
+            memory = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Older Pythons: pool workers share the parent's resource
+            # tracker, which only counts the block once.
+            memory = shared_memory.SharedMemory(name=name)
+        _attached[name] = memory
+    arrays = {}
+    for key, dtype, shape, offset in layout:
+        array = np.ndarray(shape, dtype, memory.buf, offset)
+        array.flags.writeable = False
+        arrays[key] = array
+    return arrays
+
+def share_files(files):
+    """
+    Puts a Files' batter data into shared memory.
+
+    Parameters:
+        files (obj): Instance of Files class.
+
+    Returns:
+        (obj): SharedTables; the caller closes it.
+    """
+    arrays = {}
+    for name, column in files.columns.items():
+        column = np.asarray(column)
+        if column.dtype.hasobject:
+            column = column.astype(str)
+        arrays["column:" + name] = column
+    table = files.table
+    arrays.update({"table:names" : np.array(table.names, dtype=str),
+                   "table:odds" : table.odds, "table:swing" : table.swing,
+                   "table:thresholds" : table.thresholds})
+    return SharedTables(arrays)
+
+def attach_files(handle, welcome="", help=""):
+    """
+    Makes a Files over batter data shared with share_files().
+
+    Parameters:
+        handle (tup): SharedTables.handle from share_files().
+        welcome (str): Welcome screen text, for interactive use.
+        help (str): Help screen text.
+
+    Returns:
+        (obj): Instance of Files whose columns and RosterTable arrays are
+        read-only views of the shared memory.
+    """
+    arrays = attach(handle)
+    columns = {name[len("column:"):] : array for name, array in
+               arrays.items() if name.startswith("column:")}
+    table = RosterTable.from_arrays(arrays["table:names"].tolist(),
+                                    arrays["table:odds"],
+                                    arrays["table:swing"],
+                                    arrays["table:thresholds"])
+    return Files.from_columns(columns, table, welcome, help)
@@ -0,0 +1,420 @@
+"""
+Compact snapshots of games in progress, and checkpointed batches.
+
+A game lives in the Engine's Field, Scoreboard and AtBat objects. save()
+packs everything needed to carry on into a few hundred bytes:
+
+    header     version, inning, innings to play, outs, both teams' runs,
+               and the count, status and batter of an at bat in progress
+    names      home and opponent team names
+    per team   table row of every batter in the batting order, each one's
+               at bats, hits and RBIs, the dugout line as batting order
+               slots, and the runners as (slot, base) pairs in the order
+               the Field keeps them, and the bullpen in order, the
+               pitcher on the mound first, each by name, ball odds and
+               whether they have matchup odds (the home team, then a real
+               opponent)
+    rng        the random stream: a PCG64 StreamRandom's block state and
+               position (45 bytes), or the 2.5 KB Mersenne Twister state
+               of the random module or a random.Random
+
+load() puts a snapshot back into an Engine made for the same teams and
+batting orders (or an interactive one with no order yet, which gets
+Batter views of the saved rows). Pitchers are matched to the engine's
+bullpen by name and put back in the saved order; one it lacks is made
+again, from the Matchups given to load() if they had matchup odds. Both
+take microseconds, so games can be saved as often as every pitch.
+
+simulate() plays a long headless batch in chunks, checkpointing after
+every few games, and picks up where a killed run stopped.
+
+Example:
+    data = snapshot.save(engine, atbat)
+    atbat = snapshot.load(Engine(team="Red Sox", policy=always_swing), data)
+"""
+import json
+import os
+import random
+import struct
+
+import numpy as np
+
+import streams
+from sampler import STATUSES
+from Smith_BaseballSim import AtBat, Pitcher
+
+VERSION = 2
+# Version, flags, inning, innings to play, outs, runs, opponent runs, and
+# the at bat's batter slot, balls, strikes and status.
+HEADER = struct.Struct("<BBHHBHHBBBB")
+# Flags in the header.
+AT_BAT, VISITORS = 1, 2
+# Random stream kinds: the random module, a random.Random and a
+# StreamRandom over PCG64.
+MODULE, MERSENNE, PCG64 = 0, 1, 2
+# PCG64 state and increment, has_uint32, uinteger, position and block.
+STREAM = struct.Struct("<16s16sBIII")
+MT = struct.Struct("<B625Id")
+# A pitcher's ball odds, and 1 if they have a matchup table.
+PITCHER = struct.Struct("<dB")
+# Games done, then the snapshot, in a checkpoint file.
+DONE = struct.Struct("<Q")
+
+def players(engine):
+    """Returns (lst) the engine's batting order, or its players on field."""
+    if engine.order:
+        return engine.order
+    field = engine.field
+    return list(field.dugout) + list(field.bases)
+
+def pack_team(engine):
+    """
+    Packs one team's batters, dugout, runners and bullpen.
+
+    Returns:
+        (bytes): The team's part of a snapshot.
+    """
+    order = players(engine)
+    slots = {batter : slot for slot, batter in enumerate(order)}
+    size = len(order)
+    stats = []
+    for batter in order:
+        stats += (batter.atbats, batter.hits, batter.rbis)
+    dugout = [slots[batter] for batter in engine.field.dugout]
+    bases = []
+    for runner, base in engine.field.bases.items():
+        bases += (slots[runner], base)
+    scoreboard = engine.scoreboard
+    parts = [struct.pack("<BHB{}I{}HB{}BB{}B".format(
+        size, 3 * size, len(dugout), len(bases)), size, scoreboard.runs,
+        scoreboard.outs, *[batter.row for batter in order], *stats,
+        len(dugout), *dugout, len(bases) // 2, *bases),
+             bytes([len(engine.field.bullpen)])]
+    for pitcher in engine.field.bullpen:
+        name = pitcher.name.encode()[:255]
+        parts += (bytes([len(name)]), name,
+                  PITCHER.pack(pitcher.ball_odds, pitcher.table is not None))
+    return b"".join(parts)
+
+def unpack_team(engine, data, offset, matchups=None):
+    """
+    Puts one team's batters, dugout, runners and bullpen back.
+
+    Parameters:
+        engine (obj): Instance of Engine class for the team.
+        data (bytes): Snapshot.
+        offset (int): Where the team's part starts.
+        matchups (obj): Matchups to make missing matchup pitchers from.
+
+    Returns:
+        (int): Offset just past the team's part of the snapshot.
+
+    Raises:
+        ValueError: If the engine has a different batting order, or a
+                    pitcher with matchup odds can't be made.
+    """
+    size, runs, outs = struct.unpack_from("<BHB", data, offset)
+    offset += 4
+    rows = struct.unpack_from("<{}I".format(size), data, offset)
+    offset += 4 * size
+    stats = struct.unpack_from("<{}H".format(3 * size), data, offset)
+    offset += 6 * size
+    if not engine.order:
+        engine.order = engine.files.table.batters(list(rows))
+    order = engine.order
+    if tuple(batter.row for batter in order) != rows:
+        raise ValueError("The snapshot is of a different batting order.")
+    for number, batter in enumerate(order):
+        batter.atbats, batter.hits, batter.rbis = \
+            stats[3 * number:3 * number + 3]
+    length = data[offset]
+    field = engine.field
+    field.clear_bases()
+    field.dugout = [order[slot] for slot in data[offset + 1:offset + 1 +
+                                                 length]]
+    offset += 1 + length
+    count = data[offset]
+    runners = data[offset + 1:offset + 1 + 2 * count]
+    set_bases(field, [(order[runners[number]], runners[number + 1])
+                      for number in range(0, 2 * count, 2)])
+    offset += 1 + 2 * count
+    pitchers = []
+    for number in range(data[offset]):
+        length = data[offset + 1]
+        name = data[offset + 2:offset + 2 + length].decode(errors="replace")
+        ball_odds, matchup = PITCHER.unpack_from(data, offset + 2 + length)
+        pitchers.append((name, ball_odds, matchup))
+        offset += 1 + length + PITCHER.size
+    set_bullpen(field, pitchers, matchups)
+    engine.scoreboard.runs = runs
+    engine.scoreboard.outs = outs
+    return offset + 1
+
+def set_bullpen(field, pitchers, matchups=None):
+    """
+    Puts a field's bullpen in a saved order, the pitcher on the mound first.
+
+    The bullpen list is changed in place, since a FastGame holds on to it.
+    Pitchers are matched by name; ones the field lacks are made again and
+    ones the snapshot lacks are dropped.
+
+    Parameters:
+        field (obj): Field or BitField.
+        pitchers (lst): (name, ball odds, has matchup odds) of each saved
+                        pitcher, in bullpen order.
+        matchups (obj): Matchups to make missing matchup pitchers from.
+
+    Raises:
+        ValueError: If a missing pitcher had matchup odds and no Matchups
+                    were given.
+    """
+    waiting = list(field.bullpen)
+    bullpen = []
+    for name, ball_odds, matchup in pitchers:
+        found = [pitcher for pitcher in waiting if pitcher.name == name]
+        if found:
+            pitcher = found[0]
+            waiting.remove(pitcher)
+        elif matchup and matchups is None:
+            raise ValueError("The snapshot's pitcher " + repr(name) + " has " +
+                             "matchup odds; pass the Matchups to load().")
+        else:
+            # Pitcher() and Matchups.pitcher() add them to the bullpen;
+            # it is replaced below.
+            pitcher = matchups.pitcher(name, field) if matchup else \
+                Pitcher(name, field, ball_odds)
+        pitcher.ball_odds = ball_odds
+        bullpen.append(pitcher)
+    field.bullpen[:] = bullpen
+
+def set_bases(field, runners):
+    """
+    Puts runners on a Field or BitField.
+
+    Parameters:
+        field (obj): Instance of Field or BitField, with no one on base.
+        runners (lst): (Batter, base) pairs, 0 for the plate, in the order
+                       Field.bases had them.
+    """
+    if hasattr(field, "slots"):
+        for runner, base in runners:
+            field.slots[base] = runner
+            if base:
+                field.mask |= 1 << (base - 1)
+    else:
+        field.bases = dict(runners)
+
+def pack_rng(rng):
+    """Returns (bytes) a random source's state, led by its kind."""
+    if isinstance(rng, streams.StreamRandom) and \
+            isinstance(rng.generator.bit_generator, np.random.PCG64):
+        block_state, position, block = rng.getstate()
+        # No block drawn yet: the next one comes from the current state.
+        drawn = block_state is not None
+        state = block_state if drawn else rng.generator.bit_generator.state
+        return bytes([PCG64]) + STREAM.pack(
+            state["state"]["state"].to_bytes(16, "little"),
+            state["state"]["inc"].to_bytes(16, "little"),
+            state["has_uint32"], state["uinteger"],
+            position if drawn else 1 << 31, block)
+    if rng is random or type(rng) is random.Random:
+        version, words, gauss = rng.getstate()
+        return bytes([MODULE if rng is random else MERSENNE]) + MT.pack(
+            version, *words, np.nan if gauss is None else gauss)
+    raise ValueError("Can't snapshot a random source of type " +
+                     type(rng).__name__ + ".")
+
+def unpack_rng(data, offset, current):
+    """
+    Rebuilds a random source, reusing the current one where it can.
+
+    Parameters:
+        data (bytes): Snapshot.
+        offset (int): Where the random source's part starts.
+        current (obj): The engine's random source now.
+
+    Returns:
+        (obj): The random source to use.
+    """
+    kind = data[offset]
+    if kind == PCG64:
+        state, inc, has_uint32, uinteger, position, block = \
+            STREAM.unpack_from(data, offset + 1)
+        rng = current
+        if not isinstance(rng, streams.StreamRandom) or \
+                not isinstance(rng.generator.bit_generator, np.random.PCG64):
+            rng = streams.StreamRandom(np.random.Generator(
+                np.random.PCG64()), block)
+        state = {"bit_generator" : "PCG64",
+                 "state" : {"state" : int.from_bytes(state, "little"),
+                            "inc" : int.from_bytes(inc, "little")},
+                 "has_uint32" : has_uint32, "uinteger" : uinteger}
+        bits = rng.generator.bit_generator
+        bits.state = state
+        # Each number in a block is one draw, so skipping to the position
+        # gives the same numbers as redrawing the block, without drawing it.
+        if position != 1 << 31:
+            bits.advance(position)
+        rng.values = []
+        rng.position = 0
+        rng.block_state = None
+        rng.block = block
+        return rng
+    values = MT.unpack_from(data, offset + 1)
+    gauss = None if np.isnan(values[-1]) else values[-1]
+    if kind == MODULE:
+        rng = random
+    elif type(current) is random.Random:
+        rng = current
+    else:
+        rng = random.Random()
+    rng.setstate((values[0], tuple(values[1:-1]), gauss))
+    return rng
+
+def save(engine, atbat=None):
+    """
+    Packs the state of an Engine's game into bytes.
+
+    Parameters:
+        engine (obj): Instance of Engine class, between pitches.
+        atbat (obj): The AtBat in progress, if any.
+
+    Returns:
+        (bytes): The snapshot.
+    """
+    scoreboard = engine.scoreboard
+    visitors = engine.visitors
+    flags = (AT_BAT if atbat is not None else 0) | \
+        (VISITORS if visitors is not None else 0)
+    slot = balls = strikes = status = 0
+    if atbat is not None:
+        slot = players(engine).index(atbat.batter)
+        balls, strikes = atbat.balls, atbat.strikes
+        status = STATUSES.index(atbat.status)
+    names = [name.encode()[:255] for name in (scoreboard.home,
+                                              scoreboard.opponent)]
+    parts = [HEADER.pack(VERSION, flags, scoreboard.inning, scoreboard.max,
+                         scoreboard.outs, scoreboard.runs,
+                         scoreboard.opponentruns, slot, balls, strikes,
+                         status),
+             bytes([len(names[0])]), names[0], bytes([len(names[1])]),
+             names[1], pack_team(engine)]
+    if visitors is not None:
+        parts.append(pack_team(visitors))
+    parts.append(pack_rng(engine.field.rng))
+    return b"".join(parts)
+
+def load(engine, data, matchups=None):
+    """
+    Puts a snapshot back into an Engine for the same teams.
+
+    Parameters:
+        engine (obj): Instance of Engine class, e.g. a fresh one.
+        data (bytes): Snapshot from save().
+        matchups (obj): Matchups to make pitchers with matchup odds from,
+                        if the engine's bullpens lack them.
+
+    Returns:
+        (obj): The AtBat that was in progress, ready for its next pitch,
+        or None.
+
+    Raises:
+        ValueError: If the snapshot does not fit the engine, or has a
+                    matchup pitcher and no Matchups were given.
+    """
+    (version, flags, inning, innings, outs, runs, opponent_runs, slot, balls,
+     strikes, status) = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError("Unknown snapshot version " + str(version) + ".")
+    if bool(flags & VISITORS) != (engine.visitors is not None):
+        raise ValueError("The snapshot and engine differ in the opponent.")
+    offset = HEADER.size
+    names = []
+    for number in range(2):
+        length = data[offset]
+        names.append(data[offset + 1:offset + 1 + length].decode(
+            errors="replace"))
+        offset += 1 + length
+    offset = unpack_team(engine, data, offset, matchups)
+    if engine.visitors is not None:
+        offset = unpack_team(engine.visitors, data, offset, matchups)
+    scoreboard = engine.scoreboard
+    scoreboard.home, scoreboard.opponent = names
+    scoreboard.inning = inning
+    scoreboard.max = innings
+    scoreboard.outs = outs
+    scoreboard.runs = runs
+    scoreboard.opponentruns = opponent_runs
+    rng = unpack_rng(data, offset, engine.field.rng)
+    if engine.policy is None:
+        engine.field.rng = scoreboard.rng = rng
+    else:
+        engine.set_rng(rng)
+    if not flags & AT_BAT:
+        return None
+    # The batter is already at the plate, so skip AtBat's step_up().
+    # Its cuts come from the restored pitcher on the mound.
+    atbat = AtBat.__new__(AtBat)
+    atbat.batter = engine.order[slot]
+    atbat.status = STATUSES[status]
+    atbat.balls = balls
+    atbat.strikes = strikes
+    atbat.sink = engine.field.sink
+    atbat.rng = engine.field.rng
+    cuts = engine.field.bullpen[0].cuts if engine.field.bullpen else None
+    atbat.cuts = atbat.batter.cuts if cuts is None else \
+        cuts[atbat.batter.row]
+    return atbat
+
+def write(path, data):
+    """Writes a file all at once, so a crash never leaves half of one."""
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+def simulate(engine, games, path, every=100, seed=None):
+    """
+    Plays headless games like Engine.simulate(), checkpointing as it goes.
+
+    After every `every` games, their results are added to path + ".jsonl"
+    and the number of games done and a snapshot of the engine are saved to
+    path. Run again with the same arguments after a crash, it carries on
+    from the last checkpoint with the same random numbers it would have
+    used, so the results match an uninterrupted run.
+
+    Parameters:
+        engine (obj): Headless instance of Engine class.
+        games (int): Games to play in all.
+        path (str): Checkpoint file.
+        every (int): Games between checkpoints.
+        seed (int): Root seed, as in Engine.simulate(); None to carry on
+                    the engine's own random source.
+
+    Returns:
+        (lst): One results dictionary per game, all of them.
+    """
+    results = []
+    done = 0
+    if os.path.exists(path):
+        with open(path, "rb") as file:
+            data = file.read()
+        done = DONE.unpack_from(data)[0]
+        load(engine, data[DONE.size:])
+        with open(path + ".jsonl") as file:
+            results = [json.loads(line) for line, number in
+                       zip(file, range(done))]
+    # Drop games played after the last checkpoint.
+    with open(path + ".jsonl", "w") as file:
+        file.writelines(json.dumps(result) + "\n" for result in results)
+    while done < games:
+        size = min(every, games - done)
+        played = engine.simulate(size, seed, done)
+        with open(path + ".jsonl", "a") as file:
+            file.writelines(json.dumps(result) + "\n" for result in played)
+        results += played
+        done += size
+        write(path, DONE.pack(done) + save(engine))
+    return results
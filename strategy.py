@@ -0,0 +1,295 @@
+"""
+Run-maximizing swing/watch policy, solved over the ball-strike count.
+
+The interactive game asks [s]wing or [w]atch before every pitch. This
+module works out the best answer for every batter, count and base/out
+situation with dynamic programming:
+    1. Each way a plate appearance can end (K, BB, OIP, HR, 1B, 2B, 3B)
+       moves the bases and outs by the rules in markov.slot_moves(), so its
+       value is the runs it scores plus the expected runs of the rest of
+       the inning from where it leaves the next batter.
+    2. Working back from a full count, a swing is worth the batter's
+       Batter.odds of each swing outcome, and a watch the Pitcher's ball
+       odds of a ball or a called strike; the better one is kept.
+    3. The value of the first pitch is the batter's new run expectancy,
+       and steps 1 and 2 repeat until those values stop changing.
+The batting order is taken as fixed, like markov.slot_inning(), and each
+inning is valued on its own.
+
+OptimalPolicy plugs into a headless Engine like always_swing does. Any
+policy whose choice depends only on the batter, count, outs and bases can
+also be turned into a table with plan() and evaluated in batches with
+evaluate(), many games at once through batch.play_games().
+
+Example:
+    python strategy.py "Red Sox" --games 100000
+"""
+import argparse
+import inspect
+from types import SimpleNamespace
+
+import numpy as np
+
+import batch
+import markov
+import sampler
+import streams
+from Smith_BaseballSim import Engine, Files, always_swing, always_watch
+
+# Swing outcomes other than a strike, as named in Batter.odds.
+CONTACT = ("OIP", "HR", "1B", "2B", "3B")
+
+def outcome_matrices():
+    """
+    Moves between the 24 base/out states for each plate appearance ending.
+
+    Returns:
+        moves (array): Shape (7, 24, 25); for each of markov.OUTCOMES, the
+                       chance of going from each state to each other, with
+                       the third out last.
+        runs (array): Shape (7, 24); expected runs scored.
+    """
+    moves = np.zeros((len(markov.OUTCOMES), 24, 25))
+    runs = np.zeros((len(markov.OUTCOMES), 24))
+    for number, outcome in enumerate(markov.OUTCOMES):
+        ends = {key : float(key == outcome) for key in markov.OUTCOMES}
+        for outs in range(3):
+            for bases in range(8):
+                src = outs * 8 + bases
+                for prob, new_outs, moved, scored in markov.slot_moves(
+                        outs, bases, ends):
+                    dst = 24 if new_outs == 3 else new_outs * 8 + moved
+                    moves[number, src, dst] += prob
+                    runs[number, src] += prob * scored
+    return moves, runs
+
+def base_mask(field):
+    """Returns (int) the runners on a Field or BitField as a base mask."""
+    mask = getattr(field, "mask", None)
+    if mask is None:
+        mask = 0
+        for base in field.bases.values():
+            if base:
+                mask |= 1 << (base - 1)
+    return mask
+
+class OptimalPolicy:
+    """
+    Class to solve and play the run-maximizing swing/watch choices.
+
+    Attributes:
+        names (lst): Batter names in batting order.
+        swing (array): Shape (batters, 3, 8, 4, 3); True to swing by slot,
+                       outs, base mask, balls and strikes.
+        values (array): Shape (batters, 3, 8); expected runs for the rest of
+                        the inning with each slot up in each situation.
+        iterations (int): Rounds of dynamic programming until it settled.
+        fallback (func): Engine policy for batters not in the order, such
+                         as the other team's when an Engine with an
+                         opponent_team gives them the same policy.
+    """
+
+    def __init__(self, batters, ball_odds=0.5, tol=1e-10, rounds=1000,
+                 fallback=always_swing):
+        """
+        Constructor for OptimalPolicy class.
+
+        Parameters:
+            batters (lst): Batter objects in batting order, e.g.
+                           Engine.order.
+            ball_odds (float): Chance a watched pitch is a ball, as in
+                               Pitcher.ball_odds.
+            tol (float): Largest change in run expectancy to stop at.
+            rounds (int): Most rounds of dynamic programming.
+            fallback (func): Policy for batters it was not solved for.
+        """
+        self.fallback = fallback
+        self.names = [batter.name for batter in batters]
+        self.slots = {name : slot for slot, name in enumerate(self.names)}
+        odds = [batter.odds for batter in batters]
+        strike = np.array([row["K"] / row["SWING"] for row in odds])
+        contact = np.array([[row[key] / row["SWING"] for key in CONTACT]
+                            for row in odds])
+        moves, runs = outcome_matrices()
+        order = [markov.OUTCOMES.index(key) for key in CONTACT]
+        k, bb = markov.OUTCOMES.index("K"), markov.OUTCOMES.index("BB")
+        size = len(batters)
+        values = np.zeros((size, 24))
+        swing = np.zeros((size, 24, 4, 3), dtype=bool)
+        for iteration in range(1, rounds + 1):
+            # Value of each ending for the batter, given the next one up.
+            after = np.concatenate([np.roll(values, -1, axis=0),
+                                    np.zeros((size, 1))], axis=1)
+            ending = runs[None] + np.einsum("osd,nd->nos", moves, after)
+            hit = np.einsum("no,nos->ns", contact, ending[:, order])
+            count = {}
+            for balls in (3, 2, 1, 0):
+                for strikes in (2, 1, 0):
+                    called = ending[:, k] if strikes == 2 else \
+                        count[balls, strikes + 1]
+                    ball = ending[:, bb] if balls == 3 else \
+                        count[balls + 1, strikes]
+                    swung = strike[:, None] * called + hit
+                    watched = ball_odds * ball + (1 - ball_odds) * called
+                    swing[:, :, balls, strikes] = swung >= watched
+                    count[balls, strikes] = np.maximum(swung, watched)
+            change = np.abs(count[0, 0] - values).max()
+            values = count[0, 0]
+            if change < tol:
+                break
+        self.iterations = iteration
+        self.values = values.reshape(size, 3, 8)
+        self.swing = swing.reshape(size, 3, 8, 4, 3)
+
+    def __call__(self, atbat, field, scoreboard):
+        """Engine policy: returns 's' or 'w' for the pitch coming up."""
+        slot = self.slots.get(atbat.batter.name)
+        if slot is None:
+            return self.fallback(atbat, field, scoreboard)
+        if self.swing[slot, scoreboard.outs, base_mask(field), atbat.balls,
+                      atbat.strikes]:
+            return 's'
+        return 'w'
+
+    def solver(self, slot):
+        """
+        Returns (func) the choices of one slot as a markov solver policy,
+        called as policy(balls, strikes, outs, bases).
+        """
+        table = self.swing[slot]
+
+        def policy(balls, strikes, outs, bases):
+            return 's' if table[outs, bases, balls, strikes] else 'w'
+
+        return policy
+
+def count_policy(policy):
+    """
+    Turns a markov solver policy into an Engine policy.
+
+    Parameters:
+        policy (func): Called as policy(balls, strikes, outs, bases).
+
+    Returns:
+        (func): Called as policy(atbat, field, scoreboard).
+    """
+
+    def engine_policy(atbat, field, scoreboard):
+        return policy(atbat.balls, atbat.strikes, scoreboard.outs,
+                      base_mask(field))
+
+    return engine_policy
+
+def plan(policy, batters):
+    """
+    Tabulates a policy's choice in every slot, situation and count.
+
+    Parameters:
+        policy (obj): OptimalPolicy, always_swing, always_watch, a markov
+                      solver policy (balls, strikes, outs, bases), or an
+                      Engine policy that only looks at atbat.batter,
+                      atbat.balls, atbat.strikes, scoreboard.outs and the
+                      field's bases.
+        batters (lst): Batter objects in batting order.
+
+    Returns:
+        (array): Shape (9, 3, 8, 12) of True to swing, by slot, outs, base
+        mask and count code, ready for batch.play_games().
+    """
+    table = np.zeros((9, 3, 8, 4, 3), dtype=bool)
+    if isinstance(policy, OptimalPolicy):
+        fallback = plan(policy.fallback, batters).reshape(9, 3, 8, 4, 3)
+        for slot, batter in enumerate(batters):
+            known = policy.slots.get(batter.name)
+            table[slot] = fallback[slot] if known is None else \
+                policy.swing[known]
+    elif policy is always_swing or policy is always_watch:
+        table[:] = policy is always_swing
+    elif len(inspect.signature(policy).parameters) == 4:
+        for index in np.ndindex(3, 8, 4, 3):
+            outs, bases, balls, strikes = index
+            table[(slice(None),) + index] = \
+                policy(balls, strikes, outs, bases) == 's'
+    else:
+        for slot, batter in enumerate(batters):
+            for outs, bases, balls, strikes in np.ndindex(3, 8, 4, 3):
+                field = SimpleNamespace(mask=bases)
+                atbat = SimpleNamespace(batter=batter, balls=balls,
+                                        strikes=strikes)
+                scoreboard = SimpleNamespace(outs=outs)
+                table[slot, outs, bases, balls, strikes] = \
+                    policy(atbat, field, scoreboard) == 's'
+    return table.reshape(9, 3, 8, 12)
+
+def evaluate(batters, policies, table, games=20000, innings=9, seed=0,
+             ball_odds=0.5):
+    """
+    Compares policies over many games played at once.
+
+    Every policy plays the same games on the same random numbers, so the
+    differences between them are not just noise.
+
+    Parameters:
+        batters (lst): Batter objects in batting order, as views of table.
+        policies (dict): Name to anything plan() accepts.
+        table (obj): RosterTable the batters' rows point into, e.g.
+                     Files.table.
+        games (int): Games per policy; both halves of each game bat.
+        innings (int): Innings per game, with no extra innings.
+        seed (int): Seed for the random numbers.
+        ball_odds (float): Chance a watched pitch is a ball.
+
+    Returns:
+        (dict): Name to "runs" per game, its "error" (standard error) and
+        the "plate_appearances" played.
+    """
+    thresholds = sampler.table_thresholds(table)
+    lineup = [batter.row for batter in batters]
+    results = {}
+    for name, policy in policies.items():
+        choices = plan(policy, batters)
+        played = batch.play_games(thresholds, [lineup], [(0, 0)] * games,
+                                  streams.as_generator(seed), innings,
+                                  walk_off=False, extras=False,
+                                  swing=choices[None], ball_odds=ball_odds)
+        runs = np.concatenate([played["runs"], played["opponent_runs"]])
+        results[name] = {"runs" : float(runs.mean()),
+                         "error" : float(runs.std() / np.sqrt(len(runs))),
+                         "plate_appearances" :
+                             int(played["plate_appearances"].sum())}
+    return results
+
+def main():
+    """Command line entry point; compares policies for a team's lineup."""
+    parser = argparse.ArgumentParser(description="Solve and compare " +
+                                     "swing/watch policies for a team.")
+    parser.add_argument("team", help="Team name, without the city.")
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ball-odds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    files = Files()
+    engine = Engine(team=args.team, policy=always_swing, files=files)
+    optimal = OptimalPolicy(engine.order, args.ball_odds)
+    policies = {"always swing" : always_swing,
+                "always watch" : always_watch, "optimal" : optimal}
+    results = evaluate(engine.order, policies, files.table, args.games,
+                       engine.innings, args.seed, args.ball_odds)
+    print("Solved in " + str(optimal.iterations) + " rounds; expected " +
+          "{:.3f} runs in an inning led off by ".format(
+              optimal.values[0, 0, 0]) + optimal.names[0] + ".")
+    for name, result in results.items():
+        print('{:<14s}{:>8.3f} runs/game (+/- {:.3f}), {:,} PA'.format(
+              name, result["runs"], result["error"],
+              result["plate_appearances"]))
+    print("\nOptimal choices with the bases empty and no outs " +
+          "(balls across, strikes down):")
+    for slot, name in enumerate(optimal.names):
+        rows = [''.join('s' if optimal.swing[slot, 0, 0, balls, strikes]
+                        else 'w' for balls in range(4))
+                for strikes in range(3)]
+        print('{:<24s}'.format(name) + " ".join(rows))
+
+if __name__ == "__main__":
+    main()
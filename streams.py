@@ -0,0 +1,148 @@
+"""
+Independent, reproducible random number streams for simulated games.
+
+Every game in a batch gets its own stream, spawned from one root seed with
+NumPy's SeedSequence. Streams for different game numbers are statistically
+independent, so batches can be split across processes in any way, and any
+single game can be replayed exactly from its (root seed, game number).
+
+StreamRandom is a random.Random, so the game code calls random(),
+uniform(), randrange() and choice() on it as it would on the random
+module. The numbers come from a PCG64 generator, drawn in blocks for speed.
+
+NumPy is only imported once a stream is made, so the game can be imported
+without it.
+"""
+import random
+
+# Numbers drawn from the generator at a time.
+BLOCK = 4096
+
+class StreamRandom(random.Random):
+    """
+    random.Random that draws its numbers from a NumPy bit generator.
+
+    Attributes:
+        generator (obj): numpy.random.Generator the numbers come from.
+        values (lst): The current block of numbers in [0, 1).
+        position (int): Index of the next number in values.
+        block_state (dict): Bit generator state the block was drawn from.
+    """
+
+    def __init__(self, generator, block=BLOCK):
+        """
+        Constructor for StreamRandom class.
+
+        Parameters:
+            generator (obj): numpy.random.Generator, e.g. one made from a
+                             spawned SeedSequence.
+            block (int): Numbers to draw from the generator at a time.
+        """
+        self.generator = generator
+        self.block = block
+        self.values = []
+        self.position = 0
+        self.block_state = None
+        super().__init__()
+
+    def seed(self, *args, **kwargs):
+        """Streams are seeded through their generator, never reseeded."""
+        pass
+
+    def random(self):
+        """Returns (float) the next number in [0, 1)."""
+        position = self.position
+        if position == len(self.values):
+            self.refill()
+            position = 0
+        self.position = position + 1
+        return self.values[position]
+
+    def refill(self):
+        """Draws the next block of numbers from the generator."""
+        self.block_state = self.generator.bit_generator.state
+        self.values = self.generator.random(self.block).tolist()
+        self.position = 0
+
+    def getstate(self):
+        """Returns (tup) the block's generator state and the position."""
+        return (self.block_state, self.position, self.block)
+
+    def __reduce__(self):
+        """Pickles the stream as its generator plus getstate()."""
+        return (StreamRandom, (self.generator, self.block), self.getstate())
+
+    def setstate(self, state):
+        """Restores a state from getstate(), redrawing the same block."""
+        block_state, position, self.block = state
+        if block_state is None:
+            self.values = []
+        else:
+            self.generator.bit_generator.state = block_state
+            self.refill()
+        self.position = position
+
+def game_sequence(root, index):
+    """Returns (obj) the SeedSequence for one game of a batch."""
+    import numpy as np
+    return np.random.SeedSequence(root, spawn_key=(index,))
+
+def game_rng(root, index, block=BLOCK):
+    """
+    Makes the random stream for one game of a batch.
+
+    Parameters:
+        root (int): Root seed of the whole batch.
+        index (int): Game number within the batch.
+        block (int): Numbers to draw at a time; smaller blocks use less
+                     memory when many streams are alive at once.
+
+    Returns:
+        (obj): StreamRandom for that game; the same pair always gives the
+        same numbers.
+    """
+    import numpy as np
+    bits = np.random.PCG64(game_sequence(root, index))
+    return StreamRandom(np.random.Generator(bits), block)
+
+def as_random(rng):
+    """
+    Turns what the caller passed as a random source into a random.Random.
+
+    Parameters:
+        rng (obj): None (the random module), an int seed, a
+                   numpy.random.Generator, or anything with random(),
+                   uniform(), randrange() and choice().
+
+    Returns:
+        (obj): An object with the random module's methods.
+    """
+    if rng is None:
+        return random
+    if rng is random or isinstance(rng, random.Random):
+        return rng
+    import numpy as np
+    if isinstance(rng, (int, np.integer)):
+        return StreamRandom(np.random.default_rng(int(rng)))
+    if isinstance(rng, np.random.Generator):
+        return StreamRandom(rng)
+    return rng
+
+def as_generator(rng):
+    """
+    Turns what the caller passed as a random source into a NumPy
+    Generator, for the batched samplers.
+
+    Parameters:
+        rng (obj): None, an int seed, a numpy.random.Generator or a
+                   StreamRandom (whose generator is used).
+
+    Returns:
+        (obj): A numpy.random.Generator.
+    """
+    if isinstance(rng, StreamRandom):
+        return rng.generator
+    import numpy as np
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(rng)
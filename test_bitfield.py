@@ -0,0 +1,41 @@
+"""Differential tests: BitField plays exactly the games Field does."""
+import pytest
+
+from Smith_BaseballSim import BitField, Engine, Field, Files, always_swing, \
+    always_watch
+from strategy import base_mask
+
+FILES = Files()
+
+def situational(atbat, field, scoreboard):
+    """Policy that swings with runners in scoring position or two
+    strikes, and otherwise takes until it has a ball."""
+    if base_mask(field) & 6 or atbat.strikes == 2:
+        return 's'
+    return 'w' if atbat.balls == 0 else 's'
+
+def names(engine):
+    """Returns (lst) the names in an engine's dugout, next up first."""
+    return [batter.name for batter in engine.field.dugout]
+
+@pytest.mark.parametrize("policy", [always_swing, always_watch,
+                                    situational])
+@pytest.mark.parametrize("options", [
+    {}, {"opponent_team" : "Yankees"},
+    # One inning ties often, so many games go to extra innings.
+    {"opponent_team" : "Cubs", "innings" : 1, "order" : [8, 7, 6, 5, 4]}])
+def test_bitfield_plays_the_same_games(policy, options):
+    engines = [Engine(team="Red Sox", policy=policy, files=FILES,
+                      field_type=field_type, **options)
+               for field_type in (Field, BitField)]
+    extras = 0
+    for game in range(150):
+        field, bits = [engine.simulate(1, seed=21, first=game)[0]
+                       for engine in engines]
+        assert bits == field
+        extras += field["innings"] > engines[0].innings
+        assert names(engines[1]) == names(engines[0])
+        if engines[0].visitors is not None:
+            assert names(engines[1].visitors) == names(engines[0].visitors)
+    if options.get("innings") == 1:
+        assert extras
@@ -0,0 +1,78 @@
+"""Tests for fastloop.py."""
+import tracemalloc
+
+import pytest
+
+import streams
+from fastloop import FastGame
+from Smith_BaseballSim import BitField, Engine, Files, always_swing, \
+    always_watch
+from strategy import base_mask
+
+FILES = Files()
+
+# Most a StreamRandom refill holds at once: the new block as an array and
+# a list of floats, the old list until it is replaced, and the generator
+# state saved with the block.
+REFILL = streams.BLOCK * (8 + 2 * (8 + 24)) + 4096
+
+def mixed(atbat, field, scoreboard):
+    """Policy that swings or watches depending on the situation."""
+    if (atbat.balls + atbat.strikes + scoreboard.outs + base_mask(field)) \
+            % 3:
+        return 's'
+    return 'w'
+
+@pytest.mark.parametrize("options", [
+    {"policy" : always_swing}, {"policy" : always_watch},
+    {"policy" : mixed}, {"policy" : mixed, "field_type" : BitField},
+    {"policy" : always_swing, "opponent_team" : "Yankees"},
+    {"policy" : mixed, "opponent_team" : "Cubs", "innings" : 5}])
+def test_same_results_as_engine(options):
+    engine = Engine(team="Red Sox", files=FILES, **options)
+    fast = FastGame(Engine(team="Red Sox", files=FILES, **options))
+    assert fast.simulate(300, seed=9) == engine.simulate(300, seed=9)
+
+def test_memory_stays_flat():
+    engine = Engine(team="Red Sox", policy=always_swing, files=FILES,
+                    rng=streams.game_rng(4, 0))
+    game = FastGame(engine)
+    for number in range(20):
+        game.play()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    for number in range(300):
+        game.play()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # No more than a refill of the stream and one game's results.
+    assert peak - start < REFILL + 4096
+
+def half_innings(engine, game, count):
+    """Plays count half innings of the home team, clearing up after each."""
+    for number in range(count):
+        game.half_inning()
+        game.clear_bases()
+        engine.scoreboard.runs = 0
+
+@pytest.mark.parametrize("policy", [always_swing, always_watch, mixed])
+def test_pitches_only_allocate_refills(policy):
+    engine = Engine(team="Red Sox", policy=policy, files=FILES,
+                    rng=streams.game_rng(4, 0))
+    game = FastGame(engine)
+    game.play()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    half_innings(engine, game, 1000)
+    first, first_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    # Ten times the pitches, over 40,000, so even 1 byte a pitch shows.
+    half_innings(engine, game, 9000)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Only the stream's block refills allocate, and each one replaces the
+    # last: however many pitches are thrown, one block is held and the
+    # peak is one refill.
+    assert first_peak - start < REFILL
+    assert peak - start < REFILL
+    assert current - first < 4096
@@ -0,0 +1,77 @@
+"""Tests for gamelog.py."""
+import json
+
+import pytest
+
+from gamelog import GameLog, GameLogSink, TOP
+from Smith_BaseballSim import Engine, Files, always_swing
+
+FILES = Files()
+
+def lines(batters):
+    """Returns (lst) name, hits, at bats and RBIs of Batter objects."""
+    return [{"name" : batter.name, "hits" : batter.hits,
+             "atbats" : batter.atbats, "rbis" : batter.rbis}
+            for batter in batters]
+
+def play_logged(path, **options):
+    """Plays 30 logged games; returns (lst) their results."""
+    with GameLogSink(path) as sink:
+        engine = Engine(team="Red Sox", policy=always_swing, files=FILES,
+                        sink=sink, **options)
+        return engine.simulate(30, seed=11)
+
+def test_replay_matches_the_games(tmp_path):
+    path = str(tmp_path / "games.bin")
+    results = play_logged(path)
+    log = GameLog(path)
+    assert len(log) == len(results)
+    for game, result in enumerate(results):
+        scoreboard, batters, opponent_batters = log.replay(game)
+        assert scoreboard.runs == result["runs"]
+        assert scoreboard.opponentruns == result["opponent_runs"]
+        assert lines(batters) == result["batters"]
+        assert opponent_batters == []
+
+def test_replay_includes_the_opponent(tmp_path):
+    path = str(tmp_path / "games.bin")
+    results = play_logged(path, opponent_team="Yankees")
+    log = GameLog(path)
+    assert (log.column("half") == TOP).any()
+    for game, result in enumerate(results):
+        scoreboard, batters, opponent_batters = log.replay(game)
+        assert scoreboard.runs == result["runs"]
+        assert scoreboard.opponentruns == result["opponent_runs"]
+        assert scoreboard.max == result["innings"]
+        assert lines(batters) == result["batters"]
+        assert lines(opponent_batters) == result["opponent_batters"]
+        records = log.game(game)
+        top = records[records["half"] == TOP]
+        assert set(top["inning"]) <= set(range(1, result["innings"] + 1))
+        # The visitors' runs column ends on their final score.
+        assert max(top["runs"], default=0) == result["opponent_runs"]
+
+def test_old_logs_are_refused(tmp_path):
+    path = str(tmp_path / "games.bin")
+    play_logged(path)
+    with open(path + ".json") as file:
+        meta = json.load(file)
+    meta["version"] = 1
+    with open(path + ".json", "w") as file:
+        json.dump(meta, file)
+    with pytest.raises(ValueError):
+        GameLog(path)
+
+def test_short_games_list_every_batter(tmp_path):
+    # One inning rarely reaches the whole batting order.
+    path = str(tmp_path / "games.bin")
+    with GameLogSink(path) as sink:
+        engine = Engine(team="Red Sox", policy=always_swing, files=FILES,
+                        sink=sink, innings=1, opponent_team="Yankees")
+        results = engine.simulate(20, seed=3)
+    log = GameLog(path)
+    assert any(result["batters"][-1]["atbats"] == 0 for result in results)
+    for game, result in enumerate(results):
+        scoreboard, batters, opponent_batters = log.replay(game)
+        assert lines(batters) == result["batters"]
+        assert lines(opponent_batters) == result["opponent_batters"]
@@ -0,0 +1,88 @@
+"""Tests for ingest.py's Store."""
+import os
+
+import pytest
+
+import ingest
+import roster_cache
+from ingest import Store
+
+pytest.importorskip("pandas")
+
+def events(path, rows):
+    """Writes an event file of (player, team, season, event) rows."""
+    with open(path, "w") as file:
+        file.write("player,team,season,event\n")
+        file.writelines(",".join(row) + "\n" for row in rows)
+    return str(path)
+
+def totals(store):
+    """Returns (dict) each key's counts, leaving out all-zero ones."""
+    (players, teams, seasons), counts = store.totals.arrays()
+    return {key : row.tolist() for key, row in
+            zip(zip(players.tolist(), teams.tolist(), seasons.tolist()),
+                counts) if row.any()}
+
+A = [("Ortiz", "Red Sox", "2014", "single"), ("Ortiz", "Red Sox", "2014",
+                                              "home_run")]
+B = [("Ortiz", "Red Sox", "2014", "strikeout"), ("Jeter", "Yankees", "2014",
+                                                 "walk")]
+
+def test_totals_and_manifest_are_replaced_together(tmp_path, monkeypatch):
+    first = events(tmp_path / "a.csv", A)
+    second = events(tmp_path / "b.csv", B)
+    folder = str(tmp_path / "store")
+    store = Store(folder)
+    store.update([first])
+    replace = os.replace
+
+    def crash(source, target):
+        # Dies just after the first file in the store itself is replaced.
+        replace(source, target)
+        if os.path.dirname(target) == folder:
+            raise KeyboardInterrupt
+    monkeypatch.setattr(ingest.os, "replace", crash)
+    with pytest.raises(KeyboardInterrupt):
+        store.update([second])
+    monkeypatch.undo()
+    # Whatever got saved, the totals are the files the manifest lists.
+    again = Store(folder)
+    assert list(again.manifest) == [os.path.abspath(first),
+                                    os.path.abspath(second)]
+    assert totals(again) == {("Ortiz", "Red Sox", "2014") :
+                             [1, 0, 0, 1, 0, 1, 0, 0],
+                             ("Jeter", "Yankees", "2014") :
+                             [0, 0, 0, 0, 1, 0, 0, 0]}
+    assert not os.path.exists(os.path.join(folder, "manifest.json"))
+
+def test_touched_files_are_not_hashed_again(tmp_path, monkeypatch):
+    path = events(tmp_path / "a.csv", A)
+    folder = str(tmp_path / "store")
+    Store(folder).update([path])
+    info = os.stat(path)
+    os.utime(path, ns=(info.st_atime_ns, info.st_mtime_ns + 10 ** 9))
+    assert Store(folder).update([path])["files"] == 0
+    entry = Store(folder).manifest[os.path.abspath(path)]
+    assert entry["mtime_ns"] == os.stat(path).st_mtime_ns
+
+    def fail(path):
+        raise AssertionError("hashed again")
+    monkeypatch.setattr(roster_cache, "file_hash", fail)
+    assert Store(folder).update([path])["files"] == 0
+
+def test_deleted_files_are_taken_away(tmp_path):
+    first = events(tmp_path / "a.csv", A)
+    second = events(tmp_path / "b.csv", B)
+    folder = str(tmp_path / "store")
+    store = Store(folder)
+    store.update([first, second])
+    parts = os.listdir(os.path.join(folder, "parts"))
+    assert len(parts) == 2
+    os.remove(second)
+    summary = Store(folder).update([first])
+    assert summary["removed"] == 1
+    store = Store(folder)
+    assert totals(store) == {("Ortiz", "Red Sox", "2014") :
+                             [1, 0, 0, 1, 0, 0, 0, 0]}
+    assert list(store.manifest) == [os.path.abspath(first)]
+    assert len(os.listdir(os.path.join(folder, "parts"))) == 1
@@ -0,0 +1,123 @@
+"""Tests for result_cache.py."""
+import os
+import pickle
+
+import numpy as np
+
+from Smith_BaseballSim import Engine, Files, Pitcher, always_swing
+from result_cache import ResultCache, policy_key, roster_key
+
+FILES = Files()
+
+def head_to_head():
+    """Returns (obj) a headless engine against a real opponent."""
+    return Engine(team="Red Sox", policy=always_swing, files=FILES,
+                  opponent_team="Yankees")
+
+def test_generator_seed_is_passed_through():
+    cache = ResultCache(None)
+    first = cache.simulate_batch(head_to_head(), 200,
+                                 np.random.default_rng(5))
+    second = cache.simulate_batch(head_to_head(), 200,
+                                  np.random.default_rng(5))
+    assert np.array_equal(first["runs"], second["runs"])
+    # A Generator can't be keyed, so both were played.
+    assert cache.misses == 2 and cache.hits == 0
+
+def test_integer_seeds_are_cached():
+    cache = ResultCache(None)
+    first = cache.simulate_batch(head_to_head(), 200, np.int64(5))
+    second = cache.simulate_batch(head_to_head(), 200, 5)
+    assert np.array_equal(first["runs"], second["runs"])
+    assert cache.misses == 1 and cache.hits == 1
+
+def test_opponent_pitcher_is_in_the_key():
+    cache = ResultCache(None)
+    engine = head_to_head()
+    before = cache.simulate_batch(engine, 200, 5, swing=False)
+    # Only the pitcher the visitors face changes.
+    reliever = Pitcher("Reliever", engine.visitors.field, ball_odds=0.3)
+    engine.visitors.field.change_pitcher(reliever)
+    after = cache.simulate_batch(engine, 200, 5, swing=False)
+    assert cache.misses == 2 and cache.hits == 0
+    assert not np.array_equal(before["opponent_runs"],
+                              after["opponent_runs"])
+
+def test_editing_a_policy_changes_its_key():
+    def make(choice):
+        # Same module and name each time, different body.
+        namespace = {"__name__" : __name__}
+        exec("def policy(atbat, field, scoreboard):\n"
+             "    return " + repr(choice) + "\n", namespace)
+        return namespace["policy"]
+    assert policy_key(make("s")) == policy_key(make("s"))
+    assert policy_key(make("s")) != policy_key(make("w"))
+
+class Patient:
+    """Policy object that swings once it has seen enough balls."""
+
+    def __init__(self, balls):
+        self.balls = balls
+
+    def choose(self, atbat, field, scoreboard):
+        return 's' if atbat.balls >= self.balls else 'w'
+
+class KeyedPatient(Patient):
+    """Patient that tells the cache what its choices depend on."""
+
+    def cache_key(self):
+        return str(self.balls)
+
+def test_bound_methods_need_a_cache_key():
+    assert policy_key(Patient(1).choose) is None
+    assert policy_key(KeyedPatient(1).choose) == \
+        policy_key(KeyedPatient(1).choose)
+    assert policy_key(KeyedPatient(1).choose) != \
+        policy_key(KeyedPatient(2).choose)
+    cache = ResultCache(None)
+    for balls in (1, 2):
+        engine = Engine(team="Red Sox", policy=Patient(balls).choose,
+                        files=FILES)
+        cache.simulate(engine, 20, seed=4)
+    assert cache.misses == 2 and cache.hits == 0
+
+def test_disk_tier_is_shared_across_instances(tmp_path):
+    folder = str(tmp_path / "cache")
+    played = ResultCache(folder, files=FILES).simulate(head_to_head(), 20,
+                                                       seed=4)
+    cache = ResultCache(folder, files=FILES)
+    assert cache.simulate(head_to_head(), 20, seed=4) == played
+    assert cache.disk_hits == 1 and cache.misses == 0
+    # Now it is in memory too.
+    assert cache.simulate(head_to_head(), 20, seed=4) == played
+    assert cache.hits == 1
+
+def test_least_recently_used_results_leave_memory_first():
+    result = list(range(100))
+    size = len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+    cache = ResultCache(None, max_bytes=2 * size)
+    cache.put("a", result)
+    cache.put("b", result)
+    assert cache.get("a") == result
+    # Over max_bytes: b was used least recently, so it goes.
+    cache.put("c", result)
+    assert cache.size == 2 * size
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.get("b") is None
+    # Too big to keep in memory at all.
+    cache.put("d", list(range(1000)))
+    assert "d" not in cache.entries
+
+def test_other_rosters_results_are_deleted(tmp_path):
+    folder = tmp_path / "cache"
+    stale = folder / "0123456789abcdef"
+    stale.mkdir(parents=True)
+    (stale / "old.pkl").write_bytes(b"")
+    played = ResultCache(str(folder), files=FILES).simulate(head_to_head(),
+                                                            20, seed=4)
+    cache = ResultCache(str(folder), files=FILES)
+    assert not stale.exists()
+    assert os.listdir(folder) == [roster_key(FILES)]
+    # The current roster's results are kept.
+    assert cache.simulate(head_to_head(), 20, seed=4) == played
+    assert cache.disk_hits == 1
@@ -0,0 +1,59 @@
+"""Tests for roster_cache.py."""
+import builtins
+import os
+
+import numpy as np
+import pytest
+
+import roster_cache
+
+pytest.importorskip("pandas")
+
+def workbook(tmp_path):
+    """Returns (str) a small .csv of batter odds."""
+    path = tmp_path / "odds.csv"
+    path.write_text("Name,Team,HR%\nOrtiz,Red Sox,0.05\nJeter,Yankees,0.02\n")
+    return str(path)
+
+def same(columns, other):
+    """Returns (bool) True if two column dictionaries hold the same data."""
+    return list(columns) == list(other) and \
+        all(np.array_equal(columns[name], other[name]) for name in columns)
+
+def touch(path):
+    """Moves a file's modification time on without changing it."""
+    info = os.stat(path)
+    os.utime(path, ns=(info.st_atime_ns, info.st_mtime_ns + 10 ** 9))
+
+def test_touched_workbook_remembers_its_time(tmp_path):
+    path = workbook(tmp_path)
+    columns = roster_cache.load(path)
+    touch(path)
+    assert same(roster_cache.load(path), columns)
+    meta = roster_cache.read_meta(roster_cache.cache_folder(path))
+    assert meta["mtime_ns"] == os.stat(path).st_mtime_ns
+    assert not [name for name in os.listdir(roster_cache.cache_folder(path))
+                if ".tmp" in name]
+
+def test_touched_workbook_with_read_only_cache(tmp_path, monkeypatch):
+    path = workbook(tmp_path)
+    columns = roster_cache.load(path)
+    touch(path)
+
+    def read_only(file, mode="r", *args, **kwargs):
+        if "w" in mode:
+            raise PermissionError("read-only")
+        return builtins.open(file, mode, *args, **kwargs)
+    monkeypatch.setattr(roster_cache, "open", read_only, raising=False)
+    assert same(roster_cache.load(path), columns)
+
+def test_cache_replaced_while_written(tmp_path, monkeypatch):
+    path = workbook(tmp_path)
+    write = roster_cache.write
+
+    def raced(folder, columns, stamp):
+        # Another process removes the cache just after this one writes it.
+        write(folder, columns, stamp)
+        os.remove(os.path.join(folder, "meta.json"))
+    monkeypatch.setattr(roster_cache, "write", raced)
+    assert same(roster_cache.load(path), roster_cache.read_source(path))
@@ -0,0 +1,76 @@
+"""Statistical tests that sampler.py plays at bats like AtBat does.
+
+Both the batched sampler and the scalar AtBat.swing()/watch() path are
+checked against the exact chance of each way an at bat ends, on fixed
+seeds. A rate passes if it is within TOLERANCE standard errors.
+"""
+import numpy as np
+
+import sampler
+from Smith_BaseballSim import AtBat, Field, Files, Pitcher
+from sampler import STATUSES
+
+FILES = Files()
+BATTER = FILES.team_roster("Red Sox")[0]
+TOLERANCE = 5
+# Chance of 4 balls before 3 strikes when every pitch is a ball half
+# the time: the fourth ball comes on pitch 4, 5 or 6.
+WALK_ODDS = 0.5 ** 4 * (1 + 4 * 0.5 + 10 * 0.25)
+
+def swing_rates(batter):
+    """Returns (dict) status to its exact chance when always swinging."""
+    odds = batter.odds
+    strike = odds["K"] / odds["SWING"]
+    # Contact can come on the first, second or third swing.
+    reach = 1 + strike + strike ** 2
+    rates = {"Strike out" : strike ** 3}
+    for key, status in (("OIP", "Out in play"), ("HR", "Home run"),
+                        ("1B", "Single"), ("2B", "Double"),
+                        ("3B", "Triple")):
+        rates[status] = odds[key] / odds["SWING"] * reach
+    return rates
+
+def check(counts, rates):
+    """Asserts each status's share of counts is close to its rate."""
+    total = sum(counts.values())
+    assert total
+    for status, rate in rates.items():
+        share = counts.get(status, 0) / total
+        error = np.sqrt(rate * (1 - rate) / total)
+        assert abs(share - rate) <= TOLERANCE * error + 1e-12, status
+
+def batched(swing, games=200000, seed=2):
+    """Returns (dict) status counts from sampler.sample_at_bats()."""
+    table = sampler.swing_table([BATTER])
+    status = sampler.sample_at_bats(table, np.zeros(games, dtype=np.int64),
+                                    np.random.default_rng(seed),
+                                    swing=np.full(sampler.COUNTS, swing))[0]
+    return {STATUSES[code] : int(count) for code, count in
+            enumerate(np.bincount(status, minlength=len(STATUSES)))}
+
+def scalar(swing, games=20000, seed=3):
+    """Returns (dict) status counts from AtBat, one pitch at a time."""
+    field = Field(verbose=False, rng=seed)
+    pitcher = Pitcher("Pitcher", field, ball_odds=0.5)
+    counts = {}
+    for game in range(games):
+        field.dugout.append(BATTER)
+        atbat = AtBat(BATTER, field)
+        while atbat.status == "Batting":
+            if swing:
+                atbat.swing()
+            else:
+                atbat.watch(pitcher.throw_pitch(atbat))
+        counts[atbat.status] = counts.get(atbat.status, 0) + 1
+    return counts
+
+def test_batched_swing_rates():
+    check(batched(True), swing_rates(BATTER))
+
+def test_scalar_swing_rates():
+    check(scalar(True), swing_rates(BATTER))
+
+def test_watch_rates():
+    rates = {"Walk" : WALK_ODDS, "Strike out" : 1 - WALK_ODDS}
+    check(batched(False), rates)
+    check(scalar(False), rates)
@@ -0,0 +1,45 @@
+"""Tests for server.py."""
+import asyncio
+
+from server import PROMPT, Server, load_test
+from Smith_BaseballSim import Files
+
+FILES = Files()
+
+async def started(server):
+    """Returns (tuple) the serve() task and the port it listens on."""
+    ready = asyncio.get_running_loop().create_future()
+    task = asyncio.create_task(server.serve(port=0, ready=ready))
+    return task, await ready
+
+def test_games_play_to_the_end():
+    async def run():
+        server = Server(FILES, seed=3)
+        task, port = await started(server)
+        result = await load_test("127.0.0.1", port, sessions=4,
+                                 concurrency=2, innings=2)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return server, result
+
+    server, result = asyncio.run(run())
+    assert server.finished == 4
+    assert result["prompts"] > 4 * 5
+
+def test_stopping_closes_sessions():
+    async def run():
+        server = Server(FILES, seed=3)
+        task, port = await started(server)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await reader.readuntil(PROMPT.encode())
+        assert server.active == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        rest = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return server, rest
+
+    server, rest = asyncio.run(run())
+    assert b"shutting down" in rest
+    assert server.active == 0
+    assert not server.tasks
@@ -0,0 +1,46 @@
+"""Tests for shared.py."""
+import numpy as np
+import pytest
+
+from shared import SharedTables, attach, attach_files, share_files
+from Smith_BaseballSim import Engine, Files, RosterTable, RowCuts, \
+    always_swing
+
+FILES = Files()
+
+def test_attached_files_match():
+    with share_files(FILES) as tables:
+        files = attach_files(tables.handle)
+        table = files.table
+        assert table.names == FILES.table.names
+        for name in ("odds", "swing", "thresholds"):
+            assert np.array_equal(getattr(table, name),
+                                  getattr(FILES.table, name))
+        assert list(files.columns) == list(FILES.columns)
+        for name, column in FILES.columns.items():
+            assert np.array_equal(files.columns[name],
+                                  np.asarray(column).astype(
+                                      files.columns[name].dtype))
+        # The same games come out of the shared tables.
+        assert Engine(team="Red Sox", policy=always_swing, files=files,
+                      opponent_team="Cubs").simulate(20, seed=6) == \
+            Engine(team="Red Sox", policy=always_swing, files=FILES,
+                   opponent_team="Cubs").simulate(20, seed=6)
+
+def test_attached_views_are_read_only():
+    with SharedTables({"odds" : np.arange(12.0).reshape(3, 4)}) as tables:
+        odds = attach(tables.handle)["odds"]
+        assert np.array_equal(odds, np.arange(12.0).reshape(3, 4))
+        with pytest.raises(ValueError):
+            odds[0, 0] = 1.0
+    with pytest.raises(ValueError):
+        SharedTables({"names" : np.array(["a", None], dtype=object)})
+
+def test_row_cuts_match_the_list():
+    table = FILES.table
+    lazy = RowCuts(table)
+    listed = RosterTable.from_arrays(table.names, table.odds, table.swing,
+                                     table.thresholds)
+    listed.make_cuts()
+    assert len(lazy) == len(listed.cuts)
+    assert [lazy[row] for row in range(len(lazy))] == listed.cuts
@@ -0,0 +1,51 @@
+"""Tests for snapshot.py."""
+import numpy as np
+import pytest
+
+import snapshot
+from matchup import Matchups, PitcherTable, league_odds
+from Smith_BaseballSim import Engine, Files, Pitcher, always_watch
+
+FILES = Files()
+
+def engine():
+    """Returns (obj) a headless engine that always watches, so the
+    pitcher's ball odds decide every at bat."""
+    return Engine(team="Red Sox", policy=always_watch, files=FILES,
+                  opponent_team="Yankees")
+
+def names(engine):
+    """Returns (lst) the names in the engine's bullpen, in order."""
+    return [pitcher.name for pitcher in engine.field.bullpen]
+
+def test_bullpen_is_restored():
+    played = engine()
+    played.simulate(3, seed=5)
+    reliever = Pitcher("Reliever", played.field, ball_odds=0.8)
+    played.field.change_pitcher(reliever)
+    Pitcher("Closer", played.visitors.field, ball_odds=0.3)
+    data = snapshot.save(played)
+    loaded = engine()
+    snapshot.load(loaded, data)
+    assert names(loaded) == ["Reliever", "Benny 'The Jet' Rodriguez"]
+    assert loaded.field.bullpen[0].ball_odds == 0.8
+    assert names(loaded.visitors) == names(played.visitors)
+    assert loaded.simulate(20) == played.simulate(20)
+
+def test_matchup_pitcher_is_restored():
+    league = league_odds(FILES)
+    matchups = Matchups(FILES, PitcherTable(
+        ["Ace", "Mop-up"], np.vstack([league * 0.8, league * 1.2]),
+        ball_odds=[0.35, 0.6]))
+    played = engine()
+    matchups.pitcher("Mop-up", played.field)
+    matchups.pitcher("Ace", played.field, start=True)
+    played.simulate(2, seed=8)
+    data = snapshot.save(played)
+    with pytest.raises(ValueError):
+        snapshot.load(engine(), data)
+    loaded = engine()
+    snapshot.load(loaded, data, matchups)
+    assert names(loaded) == ["Ace", "Benny 'The Jet' Rodriguez", "Mop-up"]
+    assert loaded.field.bullpen[0].table is matchups.table("Ace")
+    assert loaded.simulate(20) == played.simulate(20)
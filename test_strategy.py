@@ -0,0 +1,29 @@
+"""Tests for strategy.py."""
+import numpy as np
+
+from Smith_BaseballSim import Engine, Files, always_swing
+from strategy import OptimalPolicy, plan
+
+FILES = Files()
+
+def test_optimal_policy_plays_both_teams():
+    home = Engine(team="Red Sox", policy=always_swing, files=FILES)
+    policy = OptimalPolicy(home.order)
+    engine = Engine(team="Red Sox", policy=policy, files=FILES,
+                    opponent_team="Cubs")
+    results = engine.simulate(20, seed=1)
+    assert all(sum(batter["atbats"] for batter in game["opponent_batters"])
+               for game in results)
+    # The visitors, who weren't solved for, just swing.
+    other = Engine(team="Red Sox", policy=policy, files=FILES,
+                   opponent_team="Cubs")
+    other.visitors.policy = always_swing
+    assert other.simulate(20, seed=1) == results
+
+def test_plan_uses_the_fallback_for_unknown_batters():
+    home = Engine(team="Red Sox", policy=always_swing, files=FILES)
+    visitors = Engine(team="Cubs", policy=always_swing, files=FILES)
+    policy = OptimalPolicy(home.order)
+    assert np.array_equal(plan(policy, home.order)[:len(home.order)],
+                          policy.swing.reshape(-1, 3, 8, 12))
+    assert plan(policy, visitors.order)[:len(visitors.order)].all()